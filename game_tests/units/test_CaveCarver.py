@@ -0,0 +1,32 @@
+from unittest import TestCase
+
+import numpy
+import opensimplex
+
+from mcpython.world.worldgen.CaveCarver import MIN_Y, CaveCarver, upsample
+
+
+class TestCaveCarver(TestCase):
+    def test_upsample(self):
+        x, y, z = numpy.meshgrid(
+            numpy.arange(3), numpy.arange(4), numpy.arange(2), indexing="ij"
+        )
+        result = upsample(x * 2.0 + y - z * 3.0, 4)
+
+        assert result.shape == (8, 12, 4)
+        x, y, z = numpy.meshgrid(
+            numpy.arange(8) / 4,
+            numpy.arange(12) / 4,
+            numpy.arange(4) / 4,
+            indexing="ij",
+        )
+        assert numpy.allclose(result, x * 2.0 + y - z * 3.0)
+
+    def test_mask(self):
+        carver = CaveCarver(opensimplex.OpenSimplex(1), opensimplex.OpenSimplex(2))
+        masks = [carver.get_mask(cx, -5, 61) for cx in range(4)]
+
+        assert masks[0].shape == (16, 61, 16)
+        assert any(mask.any() for mask in masks)
+        assert not any(mask[:, :MIN_Y].any() for mask in masks)
+        assert (masks[3] == carver.get_mask(3, -5, 61)).all()
@@ -0,0 +1,193 @@
+import itertools
+from unittest import TestCase
+
+from mcpython.world.ChunkStorage import (
+    ChunkBlockStorage,
+    ChunkHeightmaps,
+    HeightmapType,
+    PaletteEntry,
+)
+
+
+class FakeChunk:
+    def __init__(self, position):
+        self.position = position
+
+
+class FakeBlock:
+    NAME = "test:block"
+    STATELESS = False
+    RANDOM_TICKS = False
+    NO_COLLISION = False
+
+    def __init__(self, position):
+        self.position = position
+        self.chunk = None
+        self.state = "a"
+
+    def get_block_state(self):
+        return {"state": self.state}
+
+    def set_block_state(self, state):
+        self.state = state["state"]
+
+    def is_solid(self, face):
+        return True
+
+
+class TestChunkStorage(TestCase):
+    def test_palette_entries_are_interned(self):
+        assert PaletteEntry.of(FakeBlock) is PaletteEntry.of(FakeBlock, {"state": "a"})
+        assert PaletteEntry.of(FakeBlock, {"state": "b"}) is not PaletteEntry.of(
+            FakeBlock
+        )
+
+    def test_lazy_instances(self):
+        chunk = FakeChunk((-1, 2))
+        storage = ChunkBlockStorage(chunk)
+        pos = (-3, 17, 40)
+
+        storage.set(pos, PaletteEntry.of(FakeBlock, {"state": "b"}))
+        assert pos in storage
+        assert len(storage) == 1
+        assert list(storage) == [pos]
+        assert storage.instance_at(pos) is None
+        assert storage.peek(pos).state == "b"
+        assert storage.instance_at(pos) is None
+
+        instance = storage.get(pos)
+        assert instance.position == pos
+        assert instance.chunk is chunk
+        assert instance.state == "b"
+        assert storage.get(pos) is instance
+
+        instance.state = "c"
+        storage.refresh(instance)
+        assert storage.get_entry(pos) is PaletteEntry.of(FakeBlock, {"state": "c"})
+
+        entry, popped = storage.pop(pos)
+        assert popped is instance
+        assert pos not in storage
+        assert len(storage) == 0
+        assert not storage.sections
+
+    def test_stateless_blocks_are_shared(self):
+        class StatelessBlock(FakeBlock):
+            STATELESS = True
+
+        storage = ChunkBlockStorage(FakeChunk((0, 0)))
+        storage.set((0, 0, 0), PaletteEntry.of(StatelessBlock))
+        storage.set((1, 0, 0), PaletteEntry.of(StatelessBlock))
+
+        assert storage.get((0, 0, 0)) is storage.get((1, 0, 0))
+        assert storage.get((0, 0, 0)).position is None
+        assert not storage.get_section(0).instances
+
+    def test_palette_compaction(self):
+        storage = ChunkBlockStorage(FakeChunk((0, 0)))
+        for i in range(100):
+            storage.set((0, 0, 0), PaletteEntry.of(FakeBlock, {"state": str(i)}))
+        storage.set((1, 0, 0), PaletteEntry.of(FakeBlock))
+
+        section = storage.get_section(0)
+        assert len(section.palette) == 102
+        section.compact_palette()
+        assert len(section.palette) == 3
+        assert storage.get_entry((0, 0, 0)).state == {"state": "99"}
+        assert storage.get_entry((1, 0, 0)) is PaletteEntry.of(FakeBlock)
+        assert storage.get_entry((2, 0, 0)) is None
+
+    def test_uniform_sections(self):
+        storage = ChunkBlockStorage(FakeChunk((0, 0)))
+        entry = PaletteEntry.of(FakeBlock)
+        for pos in itertools.product(range(16), repeat=3):
+            storage.set(pos, entry)
+
+        section = storage.get_section(0)
+        assert section.uniform is entry
+        assert section.blocks is None
+        assert len(storage) == 16**3
+        assert len(list(storage.iter_section(section, boundary_only=True))) == (
+            16**3 - 14**3
+        )
+
+        storage.set((3, 4, 5), PaletteEntry.of(FakeBlock, {"state": "b"}))
+        assert section.uniform is None
+        assert storage.get_entry((3, 4, 5)).state == {"state": "b"}
+        assert storage.get_entry((3, 4, 6)) is entry
+
+        storage.pop((3, 4, 5))
+        assert len(storage) == 16**3 - 1
+
+    def test_heightmaps(self):
+        class NonSolidBlock(FakeBlock):
+            NO_COLLISION = True
+
+            def is_solid(self, face):
+                return False
+
+        storage = ChunkBlockStorage(FakeChunk((0, 0)))
+        heightmaps = ChunkHeightmaps(storage)
+
+        def set_block(position, entry):
+            if entry is None:
+                storage.pop(position)
+            else:
+                storage.set(position, entry)
+            heightmaps.update(position, entry)
+
+        for y in range(40):
+            set_block((1, y, 2), PaletteEntry.of(FakeBlock))
+        set_block((1, 40, 2), PaletteEntry.of(NonSolidBlock))
+
+        assert heightmaps.get(HeightmapType.SOLID, 1, 2) == 39
+        assert heightmaps.get(HeightmapType.MOTION_BLOCKING, 1, 2) == 39
+        assert heightmaps.get(HeightmapType.NON_AIR, 1, 2) == 40
+        assert heightmaps.get(HeightmapType.NON_AIR, 2, 2) is None
+
+        set_block((1, 39, 2), None)
+        set_block((1, 38, 2), PaletteEntry.of(NonSolidBlock))
+        assert heightmaps.get(HeightmapType.SOLID, 1, 2) == 37
+        assert heightmaps.get(HeightmapType.NON_AIR, 1, 2) == 40
+
+        expected = heightmaps.get_array()
+        heightmaps.recalculate()
+        assert (heightmaps.get_array() == expected).all()
+
+        # only the given columns are rebuilt, the others keep their heights
+        storage.set((1, 60, 2), PaletteEntry.of(FakeBlock))
+        storage.set((5, 70, 5), PaletteEntry.of(FakeBlock))
+        heightmaps.recalculate(slice(0, 2), slice(2, 3))
+        assert heightmaps.get(HeightmapType.SOLID, 1, 2) == 60
+        assert heightmaps.get(HeightmapType.SOLID, 5, 5) is None
+
+    def test_section_snapshot(self):
+        storage = ChunkBlockStorage(FakeChunk((0, 0)))
+        storage.set((1, 2, 3), PaletteEntry.of(FakeBlock))
+        section = storage.get_section(0)
+
+        snapshot = section.snapshot()
+        storage.set((1, 2, 3), PaletteEntry.of(FakeBlock, {"state": "b"}))
+        storage.set((4, 5, 6), PaletteEntry.of(FakeBlock))
+
+        assert snapshot.get(1, 2, 3) is PaletteEntry.of(FakeBlock)
+        assert snapshot.get(4, 5, 6) is None
+        assert snapshot.block_count == 1
+        assert not snapshot.instances
+
+    def test_section_fill(self):
+        storage = ChunkBlockStorage(FakeChunk((0, 0)))
+        section = storage.get_or_create_section(0)
+        entry = PaletteEntry.of(FakeBlock)
+
+        section.fill((2, slice(3, 10), 4), entry)
+        assert section.block_count == 7
+        assert storage.get_entry((2, 9, 4)) is entry
+        assert storage.get_entry((2, 10, 4)) is None
+
+        section.fill((2, slice(0, 5), 4), None)
+        assert section.block_count == 5
+
+        section.fill((slice(None), slice(None), slice(None)), entry)
+        assert section.uniform is entry
+        assert section.block_count == 16**3
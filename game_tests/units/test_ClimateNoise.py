@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+import numpy
+import opensimplex
+
+from mcpython.world.worldgen.ClimateNoise import ClimateNoise, GRID_STEP
+
+
+class TestClimateNoise(TestCase):
+    def test_interpolation(self):
+        generator = opensimplex.OpenSimplex(7)
+        noise = ClimateNoise(generator, 200)
+
+        for cx, cz in ((0, 0), (-1, 5), (13, -7)):
+            values = noise.get_chunk(cx, cz)
+            assert values.shape == (16, 16)
+
+            for dx in range(16):
+                for dz in range(16):
+                    x, z = cx * 16 + dx, cz * 16 + dz
+                    exact = generator.noise2(x / 200, z / 200)
+                    if dx % GRID_STEP == 0 and dz % GRID_STEP == 0:
+                        assert numpy.isclose(values[dx, dz], exact)
+                    else:
+                        assert abs(values[dx, dz] - exact) < 0.01
+
+    def test_cache_is_bounded(self):
+        noise = ClimateNoise(opensimplex.OpenSimplex(7), 200, cache_size=2)
+        noise.get_samples(0, 0)
+        noise.get_samples(1, 0)
+        noise.get_samples(0, 0)
+        noise.get_samples(2, 0)
+
+        assert list(noise.regions) == [(0, 0), (2, 0)]
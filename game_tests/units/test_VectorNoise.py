@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+import numpy
+import opensimplex
+
+from mcpython.world.worldgen import VectorNoise
+
+
+class TestVectorNoise(TestCase):
+    def setUp(self):
+        self.generator = opensimplex.OpenSimplex(1234)
+        rng = numpy.random.default_rng(5)
+        # random points and points on the lattice, hitting all branches
+        self.points = numpy.concatenate(
+            [
+                rng.uniform(-40, 40, (2000, 3)),
+                rng.integers(-40, 40, (500, 3)) / 4,
+            ]
+        )
+
+    def test_noise2_is_bit_identical(self):
+        x, y = self.points[:, 0], self.points[:, 1]
+        values = VectorNoise.noise2(self.generator, x, y)
+
+        for i in range(len(x)):
+            assert values[i] == self.generator.noise2(x[i], y[i])
+
+    def test_noise3_is_bit_identical(self):
+        x, y, z = self.points.T
+        values = VectorNoise.noise3(self.generator, x, y, z)
+
+        for i in range(len(x)):
+            assert values[i] == self.generator.noise3(x[i], y[i], z[i])
+
+    def test_broadcasting(self):
+        values = VectorNoise.noise3(
+            self.generator, numpy.arange(4)[:, None], 0.5, numpy.arange(3)
+        )
+
+        assert values.shape == (4, 3)
+        assert values[2, 1] == self.generator.noise3(2, 0.5, 1)
@@ -0,0 +1,93 @@
+import ctypes
+import math
+from unittest import TestCase
+
+import numpy
+
+from mcpython.rendering import VertexMath
+
+
+class FakeVertexList:
+    def __init__(self, count: int):
+        self.position = (ctypes.c_float * (3 * count))()
+        self.tex_coords = (ctypes.c_float * (2 * count))()
+
+
+class TestVertexMath(TestCase):
+    def test_cube_faces_point_in_their_direction(self):
+        vertices = VertexMath.cube_vertices((1, 2, 3), (0.5, 1, 2))
+
+        assert vertices.shape == (6, 6, 3)
+        for face, direction in zip(
+            vertices - (1, 2, 3), VertexMath.CUBE_FACE_DIRECTIONS
+        ):
+            assert numpy.allclose(face @ direction, abs(direction) @ (0.5, 1, 2))
+
+    def test_rotation(self):
+        # counter-clockwise around y turns +x into -z
+        matrix = VertexMath.rotation(math.pi / 2, (0, 1, 0))
+        assert numpy.allclose(VertexMath.transform(matrix, (1, 0, 0)), (0, 0, -1))
+
+        matrix = VertexMath.euler_rotation((math.pi / 2, math.pi / 2, 0))
+        assert numpy.allclose(
+            matrix,
+            VertexMath.rotation(math.pi / 2, (1, 0, 0))
+            @ VertexMath.rotation(math.pi / 2, (0, 1, 0)),
+        )
+
+    def test_transform(self):
+        matrix = VertexMath.translation((1, 2, 3)) @ VertexMath.scale((2, 2, 2))
+        points = numpy.array([(0, 0, 0), (1, 1, 1)])
+
+        assert numpy.allclose(
+            VertexMath.transform(matrix, points), [(1, 2, 3), (3, 4, 5)]
+        )
+        assert numpy.allclose(
+            VertexMath.transform_directions(matrix, points), [(0, 0, 0), (2, 2, 2)]
+        )
+
+    def test_write_vertex_data(self):
+        vertex_list = FakeVertexList(2)
+        VertexMath.write_vertex_data(
+            vertex_list,
+            position=numpy.arange(6, dtype=numpy.float64).reshape(2, 3),
+            tex_coords=numpy.ones((2, 2)),
+        )
+
+        assert list(vertex_list.position) == [0, 1, 2, 3, 4, 5]
+        assert list(vertex_list.tex_coords) == [1, 1, 1, 1]
+        with self.assertRaises(ValueError):
+            VertexMath.write_vertex_data(vertex_list, position=numpy.zeros(3))
+
+        VertexMath.write_vertex_data(FakeVertexList(0), position=numpy.zeros(0))
+
+    def test_quantize_vertices(self):
+        origin = (160, 64, -32)
+        position = numpy.array([(160.5, 70.25, -31.0), (175.5, 79.5, -16.5)])
+        tex_coords = numpy.array([(0.25, 0.5), (16, 3)])
+        tex_regions = numpy.array([(0, 0, 0, 0), (0.5, 0.25, 0.125, 0.125)])
+        colors = numpy.array([(1, 1, 1, 1), (145 / 255, 189 / 255, 89 / 255, 1)])
+
+        compact = VertexMath.quantize_vertices(
+            origin, position, tex_coords, tex_regions, colors
+        )
+        assert [array.dtype for array in compact] == [
+            numpy.int16,
+            numpy.uint16,
+            numpy.uint16,
+            numpy.uint8,
+        ]
+        assert numpy.allclose(compact[0] / VertexMath.POSITION_SCALE + origin, position)
+        # coordinates of repeated textures are stored as fraction of the maximum
+        assert numpy.allclose(
+            compact[1] / (2**16 - 1), [(0.25, 0.5), (1, 3 / 16)], atol=1e-4
+        )
+        assert compact[3].tolist() == [[255, 255, 255, 255], [145, 189, 89, 255]]
+
+        # too far away from the origin
+        assert (
+            VertexMath.quantize_vertices(
+                (0, 0, 0), position, tex_coords, tex_regions, colors
+            )
+            is None
+        )
@@ -0,0 +1,47 @@
+import types
+from unittest import TestCase
+
+
+def create_world(test: TestCase, seed: int = 1234):
+    """
+    Creates a world generating chunks on the calling thread, skipping 'test'
+    where the world can't be set up
+    """
+    try:
+        # needs a display and the game assets for the block models
+        from mcpython.world.World import World
+    except Exception as e:
+        test.skipTest(f"world not available: {e}")
+
+    from mcpython.world.blocks.AbstractBlock import BLOCK_REGISTRY
+    from mcpython.world.items.AbstractItem import ITEM_REGISTRY
+    from mcpython.world.worldgen.WorldgenManager import WorldgenService
+    import mcpython.world.helpers
+
+    ITEM_REGISTRY.run_registrations()
+    BLOCK_REGISTRY.run_registrations()
+
+    window = types.SimpleNamespace(invalidate_focused_block=lambda: None)
+    world = World(window, seed=seed, debug_world=False)
+    world.worldgen.shutdown()
+    world.worldgen = WorldgenService(world, 0)
+    test.addCleanup(world.close)
+    return world
+
+
+class TestWorld(TestCase):
+    def test_unload_chunk(self):
+        world = create_world(self)
+        chunk = world.get_or_create_chunk_by_coord((100, 0))
+        neighbor = world.get_or_create_chunk_by_coord((101, 0))
+        assert chunk.neighbors[1, 0] is neighbor
+        assert neighbor.neighbors[-1, 0] is chunk
+
+        assert world.peek_chunk((1600, 0, 0)) is chunk
+        world.unload_chunk(chunk)
+
+        assert (100, 0) not in world.chunks
+        assert chunk.neighbors == {}
+        assert neighbor.neighbors == {}
+        assert world._last_chunk is None
+        assert world.peek_chunk((1600, 0, 0)) is None
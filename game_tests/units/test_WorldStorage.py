@@ -0,0 +1,86 @@
+import pathlib
+import tempfile
+import types
+from unittest import TestCase
+
+from game_tests.units.test_World import create_world
+from mcpython.world.serialization.DataBuffer import WriteBuffer
+from mcpython.world.serialization.WorldStorage import WorldStorage
+from mcpython.world.worldgen.WorldgenManager import GENERATOR_VERSION
+
+
+class TestWorldStorage(TestCase):
+    def test_seed_is_saved(self):
+        assert WorldStorage(-1).seed == 2**64 - 1
+
+        with tempfile.TemporaryDirectory() as folder:
+            folder = pathlib.Path(folder) / "world"
+            WorldStorage(1234).save_world(folder, [])
+
+            storage = WorldStorage()
+            storage.load_world(folder)
+            assert storage.seed == 1234
+
+    def test_delta_chunk_of_other_generator_version(self):
+        with tempfile.TemporaryDirectory() as folder:
+            folder = pathlib.Path(folder) / "world"
+            storage = WorldStorage(1234)
+            storage.save_world(folder, [])
+
+            writer = WriteBuffer()
+            writer.write_uint16(GENERATOR_VERSION + 1)
+            storage.get_chunk_file((-1, 2), ".delta").parent.mkdir()
+            storage.get_chunk_file((-1, 2), ".delta").write_bytes(writer.get_data())
+
+            storage = WorldStorage()
+            storage.load_world(folder)
+            assert storage.saved_chunks == {(-1, 2)}
+            with self.assertRaises(RuntimeError):
+                storage.load_chunk(types.SimpleNamespace(position=(-1, 2)))
+
+    def test_delta_chunk_keeps_blocks_outside_of_the_terrain(self):
+        world = create_world(self)
+
+        chunk = world.get_or_create_chunk_by_coord((0, 0))
+        world.worldgen.request(chunk)
+        chunk.add_block((3, 300, 3), "minecraft:stone", immediate=False)
+        chunk.add_block((4, -5, 4), "minecraft:stone", immediate=False)
+        sections = sorted(chunk.blocks.sections)
+        assert -1 in sections and 18 in sections
+
+        with tempfile.TemporaryDirectory() as folder:
+            folder = pathlib.Path(folder) / "world"
+            storage = WorldStorage(1234, True)
+            storage.save_world(folder, [chunk])
+            assert storage.get_chunk_file((0, 0), ".delta").exists()
+
+            world.unload_chunk(chunk)
+            world.storage.load_world(folder)
+            chunk = world.get_or_create_chunk_by_coord((0, 0))
+            world.storage.load_chunk(chunk)
+
+        assert sorted(chunk.blocks.sections) == sections
+        assert chunk.blocks.get((3, 300, 3)).NAME == "minecraft:stone"
+        assert chunk.blocks.get((4, -5, 4)).NAME == "minecraft:stone"
+
+    def test_loading_replaces_the_blocks_of_a_shown_chunk(self):
+        world = create_world(self)
+
+        chunk = world.get_or_create_chunk_by_coord((0, 0))
+        world.worldgen.request(chunk)
+
+        with tempfile.TemporaryDirectory() as folder:
+            folder = pathlib.Path(folder) / "world"
+            world.storage.save_world(folder, [chunk])
+
+            chunk.add_block((3, 300, 3), "minecraft:stone", immediate=False)
+            chunk.shown = True
+            chunk.section_meshes[18] = []
+            shown = []
+            world.show_section = lambda c, index, immediate=True: shown.append(index)
+            world.storage.load_world(folder)
+            world.storage.load_chunk(chunk)
+
+        assert 18 not in chunk.blocks.sections
+        assert chunk.blocks.get((3, 300, 3)) is None
+        assert shown == sorted(set(chunk.blocks.sections) | {18})
@@ -0,0 +1,154 @@
+import concurrent.futures
+import os
+import types
+from unittest import TestCase
+
+import numpy
+
+from mcpython.world.worldgen.WorldgenManager import (
+    ORE_VEINS,
+    TERRAIN_PALETTE,
+    ChunkStatus,
+    FeatureWriter,
+    OakTree,
+    StructureTemplate,
+    WorldgenService,
+    _dilate,
+    chunk_random,
+    chunk_rng,
+    generate_terrain,
+)
+
+
+class TestWorldgenManager(TestCase):
+    def test_terrain_is_deterministic(self):
+        first = generate_terrain(42, 3, -2)
+        second = generate_terrain(42, 3, -2)
+
+        assert first.position == (3, -2)
+        assert (first.blocks == second.blocks).all()
+        assert (first.trees == second.trees).all()
+        assert first.blocks.shape[0] == first.blocks.shape[2] == 16
+        assert first.blocks.max() < len(TERRAIN_PALETTE)
+        assert (first.blocks[:, 0] == TERRAIN_PALETTE.index("minecraft:bedrock")).all()
+
+        other_seed = generate_terrain(43, 3, -2)
+        assert (
+            other_seed.blocks.shape != first.blocks.shape
+            or (other_seed.blocks != first.blocks).any()
+        )
+
+    def test_chunk_random(self):
+        assert chunk_random(1, 2, 3).random() == chunk_random(1, 2, 3).random()
+        assert chunk_random(1, 2, 3).random() != chunk_random(1, 3, 2).random()
+        assert chunk_random(1, 2, 3).random() != chunk_random(1, 2, 3, "x").random()
+
+    def test_chunk_rng(self):
+        assert chunk_rng(1, -2, 3).random() == chunk_rng(1, -2, 3).random()
+        assert chunk_rng(1, -2, 3).random() != chunk_rng(1, 3, -2).random()
+        assert chunk_rng(1, -2, 3).random() != chunk_rng(1, -2, 3, "x").random()
+
+    def test_dilate(self):
+        mask = numpy.zeros((5, 5, 5), dtype=bool)
+        mask[0, 0, 0] = mask[2, 2, 2] = True
+        result = _dilate(mask, 1)
+
+        assert result.sum() == 4 + 7
+        assert result[1, 2, 2] and result[2, 2, 3] and not result[1, 1, 2]
+        assert result[1, 0, 0] and not result[1, 1, 0]
+
+    def test_ores_and_trees(self):
+        terrain = generate_terrain(42, 0, 0)
+        ores = range(len(TERRAIN_PALETTE) - len(ORE_VEINS), len(TERRAIN_PALETTE))
+        grass = TERRAIN_PALETTE.index("minecraft:grass_block")
+
+        y = numpy.nonzero(numpy.isin(terrain.blocks, ores))[1]
+        assert len(y) > 0
+        assert y.min() >= min(vein.min_y for vein in ORE_VEINS) - 1
+
+        for x, y, z in terrain.trees.tolist():
+            assert terrain.blocks[x, y - 1, z] == grass
+            assert terrain.blocks[x, y, z] == 0
+
+    def test_structure_template(self):
+        template = StructureTemplate.compile(
+            {(0, 0, 0): ("a", True), (1, 2, 3): ("b", False), (0, 1, 0): ("a", True)}
+        )
+        assert template.palette == ("a", "b")
+        assert template.blocks.tolist() == [0, 1, 0]
+        assert template.replace.tolist() == [True, False, True]
+
+        assert template.get_variant(1).offsets[1].tolist() == [-3, 2, 1]
+        assert template.get_variant(0, mirror=True).offsets[1].tolist() == [-1, 2, 3]
+        assert template.get_variant(4) is template
+        assert template.get_variant(1).get_variant(3) is template.get_variant(3)
+
+    def test_oak_tree_template(self):
+        tree = OakTree("log", "leaves")
+        template = tree.get_template(5, 3, 1, 3)
+        assert tree.get_template(5, 3, 1, 3) is template
+
+        blocks = {
+            tuple(offset): (template.palette[block], replace)
+            for offset, block, replace in zip(
+                template.offsets.tolist(), template.blocks, template.replace
+            )
+        }
+        assert len(blocks) == len(template.offsets)
+        assert all(blocks[0, y, 0] == ("log", True) for y in range(5))
+        assert blocks[3, 4, 0] == ("leaves", False)
+        assert blocks[0, 5, 0] == ("leaves", False)
+
+    def test_failed_chunk_can_be_requested_again(self):
+        chunk = types.SimpleNamespace(position=(0, 0), status=ChunkStatus.EMPTY)
+        world = types.SimpleNamespace(chunks={(0, 0): chunk})
+        service = WorldgenService(world, 0)
+
+        future = concurrent.futures.Future()
+        future.set_exception(ValueError("worker failed"))
+        service.pending[(0, 0)] = 42, future
+        service.process()
+
+        assert service.pending == {}
+        assert chunk.status == ChunkStatus.EMPTY
+
+    def test_crashed_worker_is_replaced(self):
+        chunk = types.SimpleNamespace(position=(0, 0), status=ChunkStatus.EMPTY)
+        world = types.SimpleNamespace(chunks={(0, 0): chunk})
+        service = WorldgenService(world, 1)
+        executor = service.executor
+
+        try:
+            service.pending[(0, 0)] = 42, executor.submit(os._exit, 1)
+            service.pending[(1, 0)] = 42, concurrent.futures.Future()
+            concurrent.futures.wait([service.pending[(0, 0)][1]])
+            service.process()
+
+            assert service.pending == {}
+            assert chunk.status == ChunkStatus.EMPTY
+            assert service.executor is not executor
+            assert service.executor.submit(abs, -1).result() == 1
+        finally:
+            service.shutdown()
+
+    def test_buffered_blocks_of_chunks_never_generated_are_dropped(self):
+        world = types.SimpleNamespace(chunks={})
+        for position in ((0, 0), (2, 0)):
+            world.chunks[position] = types.SimpleNamespace(
+                position=position, status=ChunkStatus.FINALIZED
+            )
+        writer = FeatureWriter(world, {})
+
+        # trees at the borders, reaching into chunks never generated
+        writer.set_block((16, 70, 3), "minecraft:oak_leaves")
+        writer.set_block((-1, 70, 3), "minecraft:oak_leaves")
+        assert set(writer.buffered) == {(1, 0), (-1, 0)}
+
+        # (1, 0) is still next to a loaded chunk
+        del world.chunks[0, 0]
+        writer.on_chunk_unloaded((0, 0))
+        assert set(writer.buffered) == {(1, 0)}
+
+        del world.chunks[2, 0]
+        writer.on_chunk_unloaded((2, 0))
+        assert writer.buffered == {}
@@ -25,7 +25,7 @@ def execute_info_tags(player, results):
 def execute_block_info(player, results):
     vector = player.get_sight_vector()
     pos, *_ = player.hit_test(player.position, vector)
-    instance = player.world.get_or_create_chunk_by_position(pos).blocks.get(pos)
+    instance = None if pos is None else player.world.get_block(*pos)
 
     if instance is None:
         player.chat.submit_text("<NO BLOCK>")
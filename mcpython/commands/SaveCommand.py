@@ -15,10 +15,7 @@ save_command.construct().then(save_world).then(load_world)
 @save_world_name.on_execute
 def execute_save_world(player, entries):
     name = entries[-1][1]
-    player.world.storage.load_world(TMP / "worlds" / name)
-
-    for chunk in player.world.chunks.values():
-        player.world.storage.save_chunk(chunk)
+    player.world.storage.save_world(TMP / "worlds" / name, player.world.chunks.values())
 
 
 @load_world_name.on_execute
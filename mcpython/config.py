@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import math
+import os
 import pathlib
 
 TICKS_PER_SEC = 20
@@ -11,6 +12,17 @@ MAX_JUMP_HEIGHT = 1.0  # About the height of a block.
 JUMP_SPEED = math.sqrt(2 * GRAVITY * MAX_JUMP_HEIGHT)
 TERMINAL_VELOCITY = 50
 PLAYER_HEIGHT = 2
+# merge equal neighbouring block faces into bigger quads in chunk meshes
+GREEDY_MESHING = True
+# upload chunk meshes with quantized positions relative to the section,
+# texture coordinates and colors, about a third of the size of the float layout
+COMPACT_BLOCK_VERTICES = False
+# threads building chunk meshes in the background, 0 builds them on the main thread
+MESH_WORKERS = 2
+# processes generating chunk terrain, 0 generates on the main thread
+WORLDGEN_WORKERS = max((os.cpu_count() or 1) - 1, 1)
+# save chunks only as their differences to the regenerated terrain
+DELTA_CHUNKS = False
 
 TMP = pathlib.Path(__file__).parent.parent.joinpath("cache/temp")
 TMP.mkdir(parents=True, exist_ok=True)
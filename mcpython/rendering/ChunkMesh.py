@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+import sys
+import traceback
+import typing
+
+import numpy
+import pyglet.graphics
+from pyglet.gl import GL_TRIANGLES
+
+from mcpython import config
+from mcpython.rendering import VertexMath
+from mcpython.rendering.util import (
+    COMPACT_BLOCK_GROUP,
+    COMPACT_BLOCK_SHADER,
+    DEFAULT_BLOCK_GROUP,
+    DEFAULT_BLOCK_SHADER,
+)
+
+if typing.TYPE_CHECKING:
+    from mcpython.world.ChunkStorage import ChunkSection
+    from mcpython.world.World import Chunk
+
+
+class MeshData:
+    """
+    Vertex data of many blocks, in the layout of the block shader.
+    Filled by BlockStateFile.add_to_mesh() and uploaded as a single vertex list.
+
+    The data is collected as float32 arrays, one per attribute and added part,
+    with 'tex_regions' holding per vertex the atlas region (x, y, width, height)
+    the texture coordinates are wrapped into, or zeros for plain atlas coordinates.
+
+    When 'compact' is set, the vertex list is created in the compact layout of
+    VertexMath.quantize_vertices(), relative to 'origin'
+    """
+
+    def __init__(self, origin: tuple[int, int, int] = (0, 0, 0), compact=False):
+        self.origin = origin
+        self.compact = compact
+        self.count = 0
+        self.position: list[numpy.ndarray] = []
+        self.tex_coords: list[numpy.ndarray] = []
+        self.tex_regions: list[numpy.ndarray] = []
+        self.colors: list[numpy.ndarray] = []
+
+    def add(
+        self,
+        position: numpy.ndarray,
+        tex_coords: numpy.ndarray,
+        tex_regions: numpy.ndarray,
+        colors: numpy.ndarray,
+    ):
+        """Appends (n, 3) positions, (n, 2) texture coordinates and (n, 4) regions and colors"""
+        self.count += len(position)
+        self.position.append(position)
+        self.tex_coords.append(tex_coords)
+        self.tex_regions.append(tex_regions)
+        self.colors.append(colors)
+
+    def mark(self) -> tuple[int, int]:
+        return self.count, len(self.position)
+
+    def rollback(self, mark: tuple[int, int]):
+        """Drops everything added after mark() returned 'mark'"""
+        self.count, parts = mark
+        del self.position[parts:]
+        del self.tex_coords[parts:]
+        del self.tex_regions[parts:]
+        del self.colors[parts:]
+
+    def get_arrays(
+        self,
+    ) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Returns the flat float32 position, tex_coords, tex_regions and colors data"""
+        return tuple(
+            (
+                numpy.concatenate(parts, dtype=numpy.float32).ravel()
+                if parts
+                else numpy.zeros(0, dtype=numpy.float32)
+            )
+            for parts in (self.position, self.tex_coords, self.tex_regions, self.colors)
+        )
+
+    def create_vertex_list(
+        self, batch: pyglet.graphics.Batch
+    ) -> pyglet.graphics.vertexdomain.VertexList | None:
+        if self.count == 0:
+            return None
+
+        position, tex_coords, tex_regions, colors = self.get_arrays()
+        if self.compact:
+            quantized = VertexMath.quantize_vertices(
+                self.origin, position, tex_coords, tex_regions, colors
+            )
+            # meshes not fitting into the compact layout use the default one
+            if quantized is not None:
+                vertex_list = COMPACT_BLOCK_SHADER.vertex_list(
+                    self.count,
+                    GL_TRIANGLES,
+                    batch,
+                    SectionOriginGroup(self.origin, COMPACT_BLOCK_GROUP),
+                    position="h",
+                    tex_coords="Hn",
+                    tex_regions="Hn",
+                    colors="Bn",
+                )
+                VertexMath.write_vertex_data(
+                    vertex_list,
+                    position=quantized[0],
+                    tex_coords=quantized[1],
+                    tex_regions=quantized[2],
+                    colors=quantized[3],
+                )
+                return vertex_list
+
+        vertex_list = DEFAULT_BLOCK_SHADER.vertex_list(
+            self.count,
+            GL_TRIANGLES,
+            batch,
+            DEFAULT_BLOCK_GROUP,
+            position="f",
+            tex_coords="f",
+            tex_regions="f",
+            colors="f",
+        )
+        VertexMath.write_vertex_data(
+            vertex_list,
+            position=position,
+            tex_coords=tex_coords,
+            tex_regions=tex_regions,
+            colors=colors,
+        )
+        return vertex_list
+
+
+class SectionOriginGroup(pyglet.graphics.Group):
+    """Sets the origin of the compact block shader for the meshes of a section"""
+
+    def __init__(self, origin: tuple[int, int, int], parent: pyglet.graphics.Group):
+        super().__init__(parent=parent)
+        self.origin = origin
+
+    def set_state(self):
+        self.parent.program["origin"] = self.origin
+
+    def __eq__(self, other):
+        return (
+            self.__class__ is other.__class__
+            and self.origin == other.origin
+            and self.parent == other.parent
+        )
+
+    def __hash__(self):
+        return hash((self.origin, self.parent))
+
+
+class GreedyMesher:
+    """
+    Collects axis aligned full-block faces and merges equal neighbouring
+    faces in the same plane into bigger quads on flush().
+
+    Two faces are equal when they have the same vertex layout, texture and
+    colors. Merged quads repeat the texture once per block by wrapping the
+    texture coordinates into the atlas region of the texture in the shader.
+    """
+
+    def __init__(self):
+        # (mesh, axis, plane, layout) -> {(a, b): (region, colors)}
+        self.planes: dict[
+            tuple[MeshData, int, float, tuple],
+            dict[tuple[int, int], tuple[tuple[float, ...], tuple[float, ...]]],
+        ] = {}
+        self.faces: list[tuple] = []
+
+    def mark(self) -> int:
+        return len(self.faces)
+
+    def rollback(self, mark: int):
+        """Drops all faces added after mark() returned 'mark'"""
+        del self.faces[mark:]
+
+    @staticmethod
+    def describe_face(
+        vertices: typing.Sequence[tuple[float, float, float]],
+        tex_coords: typing.Sequence[float],
+    ) -> tuple[int, float, tuple, tuple[float, float, float, float]]:
+        """
+        Precomputes the position independent data add_face() needs for a face
+        of a full block; 'vertices' are the six corners relative to the block
+        center, each coordinate being +-0.5
+        """
+        axis = next(i for i in range(3) if len({vertex[i] for vertex in vertices}) == 1)
+        a_axis, b_axis = (i for i in range(3) if i != axis)
+
+        us = tex_coords[0::2]
+        vs = tex_coords[1::2]
+        u_low, v_low = min(us), min(vs)
+
+        layout = tuple(
+            (
+                vertex[a_axis] > 0,
+                vertex[b_axis] > 0,
+                u != u_low,
+                v != v_low,
+            )
+            for vertex, u, v in zip(vertices, us, vs)
+        )
+        region = (u_low, v_low, max(us) - u_low, max(vs) - v_low)
+        return axis, vertices[0][axis], layout, region
+
+    def add_face(
+        self,
+        mesh: MeshData,
+        position: tuple[int, int, int],
+        face: tuple[int, float, tuple, tuple[float, float, float, float]],
+        colors: tuple[float, ...],
+    ):
+        """Adds a face created by describe_face() of the block at 'position'"""
+        axis, offset, layout, region = face
+        a_axis, b_axis = (i for i in range(3) if i != axis)
+
+        self.faces.append(
+            (
+                (mesh, axis, position[axis] + offset, layout),
+                (position[a_axis], position[b_axis]),
+                (region, colors),
+            )
+        )
+
+    def flush(self):
+        """Merges the collected faces and appends the quads to their meshes"""
+        planes = self.planes
+        for key, cell, value in self.faces:
+            planes.setdefault(key, {})[cell] = value
+        self.faces.clear()
+        # mesh -> the position, tex_coords, tex_regions and colors of its quads
+        quads: dict[MeshData, tuple[list, list, list, list]] = {}
+
+        for (mesh, axis, plane, layout), cells in planes.items():
+            position, tex_coords, tex_regions, colors = quads.setdefault(
+                mesh, ([], [], [], [])
+            )
+            a_axis, b_axis = (i for i in range(3) if i != axis)
+
+            # the texture axis which runs along the 'a' axis of the plane
+            u_along_a = all(
+                u_high == a_high for a_high, _, u_high, __ in layout
+            ) or all(u_high != a_high for a_high, _, u_high, __ in layout)
+
+            for a, b in sorted(cells, key=lambda cell: (cell[1], cell[0])):
+                value = cells.pop((a, b), None)
+                if value is None:
+                    continue
+
+                width = 1
+                while cells.get((a + width, b)) == value:
+                    del cells[a + width, b]
+                    width += 1
+
+                height = 1
+                while all(
+                    cells.get((a + i, b + height)) == value for i in range(width)
+                ):
+                    for i in range(width):
+                        del cells[a + i, b + height]
+                    height += 1
+
+                region, face_colors = value
+                u_size, v_size = (width, height) if u_along_a else (height, width)
+
+                for a_high, b_high, u_high, v_high in layout:
+                    vertex = [plane, plane, plane]
+                    vertex[a_axis] = a - 0.5 + (width if a_high else 0)
+                    vertex[b_axis] = b - 0.5 + (height if b_high else 0)
+                    position.extend(vertex)
+                    tex_coords.extend(
+                        (u_size if u_high else 0.0, v_size if v_high else 0.0)
+                    )
+                    tex_regions.extend(region)
+                colors.extend(face_colors)
+
+        planes.clear()
+
+        for mesh, data in quads.items():
+            if data[0]:
+                mesh.add(
+                    *(
+                        numpy.array(values, dtype=numpy.float32).reshape(-1, size)
+                        for values, size in zip(data, (3, 2, 4, 4))
+                    )
+                )
+
+
+class SectionSnapshot:
+    """
+    Everything build_section_mesh() needs to know about a section, copied on
+    the main thread so the mesh can be built on a worker thread while the
+    world keeps changing
+    """
+
+    def __init__(self, chunk: Chunk, section: ChunkSection):
+        # makes sure the occlusion, which depends on the neighbour sections, is copied
+        chunk.world.get_occlusion(chunk, section)
+
+        self.origin = chunk.position[0] * 16, section.index * 16, chunk.position[1] * 16
+        self.section = section.snapshot()
+        # the tint of blocks with an own instance, all others use their prototype
+        self.tint_colors = {
+            position: instance.get_tint_colors()
+            for position, instance in section.instances.items()
+        }
+
+
+def build_section_mesh(snapshot: SectionSnapshot) -> tuple[MeshData, MeshData]:
+    """
+    Collects all exposed blocks of the snapshot section into one mesh for opaque
+    and one mesh for transparent blocks.
+
+    Only reads the snapshot and the (immutable) palette entries,
+    so this is safe to call off the main thread
+    """
+    opaque = MeshData(snapshot.origin, config.COMPACT_BLOCK_VERTICES)
+    translucent = MeshData(snapshot.origin, config.COMPACT_BLOCK_VERTICES)
+    greedy = GreedyMesher()
+
+    section = snapshot.section
+    occlusion = section.occlusion
+    dx, dy, dz = snapshot.origin
+    entry_tint_colors = {}
+
+    for x, y, z in section.local_positions(exposed_only=True):
+        entry = section.get(x, y, z)
+        block_type = entry.block_type
+        position = x + dx, y + dy, z + dz
+
+        if position in snapshot.tint_colors:
+            tint_colors = snapshot.tint_colors[position]
+        elif entry in entry_tint_colors:
+            tint_colors = entry_tint_colors[entry]
+        else:
+            tint_colors = entry_tint_colors[entry] = entry.prototype.get_tint_colors()
+
+        mesh = translucent if block_type.TRANSPARENT else opaque
+        mark = mesh.mark()
+        greedy_mark = greedy.mark()
+
+        try:
+            block_type.STATE_FILE.add_to_mesh(
+                mesh,
+                position,
+                entry.state_key,
+                tint_colors=tint_colors,
+                occlusion=int(occlusion[x, y, z]),
+                greedy=(
+                    greedy
+                    if config.GREEDY_MESHING and block_type.GREEDY_MESHING
+                    else None
+                ),
+            )
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            print(entry, position, file=sys.stderr)
+            traceback.print_exc()
+            mesh.rollback(mark)
+            greedy.rollback(greedy_mark)
+
+    greedy.flush()
+    return opaque, translucent
@@ -3,20 +3,26 @@ from __future__ import annotations
 import abc
 import copy
 import functools
+import itertools
 import math
 import random
 import sys
 import traceback
 import typing
 
+import numpy
 import pyglet.graphics
 from pyglet.gl import GL_TRIANGLES
-from pyglet.math import Vec3, Vec2, Mat4, Vec4
 
+from mcpython.rendering import VertexMath
 from mcpython.resources.ResourceManager import ResourceManager
 from mcpython.rendering.TextureAtlas import TextureAtlas, AtlasReference
+from mcpython.world.ChunkStorage import FACE_BITS
 from mcpython.world.util import Facing
 
+if typing.TYPE_CHECKING:
+    from mcpython.rendering.ChunkMesh import MeshData, GreedyMesher
+
 _TEXTURE_ATLAS = TextureAtlas()
 STAGES = [
     _TEXTURE_ATLAS.add_image_from_path("minecraft:block/destroy_stage_0"),
@@ -35,28 +41,29 @@ STAGES = [
 class BreakingTextureProvider:
     def __init__(self):
         from mcpython.rendering.util import (
-            COLORED_BLOCK_SHADER,
-            COLORED_BLOCK_GROUP,
+            DEFAULT_BLOCK_SHADER,
+            DEFAULT_BLOCK_GROUP,
         )
-        from mcpython.rendering.util import cube_vertices
 
-        vertex_data = cube_vertices(Vec3(0, 0, 0), Vec3(1, 1, 1) * 1.005 / 2)
-        vertex_data = sum(vertex_data, ())
-        vertex_data = sum(map(tuple, vertex_data), ())
         texture_data = _textured_cube(STAGES[0])
 
         self.batch = pyglet.graphics.Batch()
         self.vertex_list: pyglet.graphics.vertexdomain.VertexList = (
-            COLORED_BLOCK_SHADER.vertex_list(
+            DEFAULT_BLOCK_SHADER.vertex_list(
                 36,
                 GL_TRIANGLES,
                 self.batch,
-                COLORED_BLOCK_GROUP,
-                position=("f", vertex_data),
+                DEFAULT_BLOCK_GROUP,
+                position="f",
                 tex_coords=("f", texture_data),
+                tex_regions=("f", (0.0,) * 4 * 36),
                 colors=("f", (1, 1, 1, 0.5) * 36),
             )
         )
+        VertexMath.write_vertex_data(
+            self.vertex_list,
+            position=VertexMath.cube_vertices((0, 0, 0), (1.005 / 2,) * 3),
+        )
 
         self.texture_variants = [_textured_cube(STAGES[i]) for i in range(len(STAGES))]
         self.old_state = 0
@@ -81,6 +88,13 @@ def _parse_stringfieid_blockstate(string: str) -> dict[str, str]:
     )
 
 
+def _state_key(
+    state: dict[str, str] | tuple[tuple[str, str], ...],
+) -> tuple[tuple[str, str], ...]:
+    """The canonical form of a block state, as in PaletteEntry.state_key"""
+    return state if isinstance(state, tuple) else tuple(sorted(state.items()))
+
+
 def _try_resolve_texture(model: Model, element: dict, face: Facing) -> str | None:
     if face.name.lower() not in element["faces"]:
         return
@@ -109,13 +123,193 @@ FACE_ORDER_UV = [
     Facing.SOUTH,
 ]
 
+FACE_BY_OFFSET = {face.offset: face for face in Facing}
+
 AXIS_LOOKUP = {
-    "x": Vec3(1, 0, 0),
-    "y": Vec3(0, 1, 0),
-    "z": Vec3(0, 0, 1),
+    "x": numpy.array((1.0, 0.0, 0.0)),
+    "y": numpy.array((0.0, 1.0, 0.0)),
+    "z": numpy.array((0.0, 0.0, 1.0)),
 }
 
 
+class BlockGeometry:
+    """
+    The baked vertex data of a model (or of all parts of a multipart state) in
+    a fixed rotation, as float32 arrays relative to the block position.
+
+    Create instances with BlockGeometry.create() so that equal geometry of
+    different models and states is shared, including the caches below
+    """
+
+    _INSTANCES: dict[tuple[bytes, ...], BlockGeometry] = {}
+
+    @classmethod
+    def create(
+        cls,
+        positions: numpy.ndarray,
+        tex_coords: numpy.ndarray,
+        tints: numpy.ndarray,
+        cull_bits: numpy.ndarray,
+        greedy_faces: list[tuple | None],
+    ) -> BlockGeometry:
+        positions = numpy.asarray(positions, dtype=numpy.float32).reshape(-1, 3)
+        tex_coords = numpy.asarray(tex_coords, dtype=numpy.float32).reshape(-1, 2)
+        tints = numpy.asarray(tints, dtype=numpy.int8).reshape(-1)
+        cull_bits = numpy.asarray(cull_bits, dtype=numpy.uint8).reshape(-1)
+        if not (
+            len(positions) == len(tex_coords) == len(tints) == 6 * len(cull_bits)
+            and len(cull_bits) == len(greedy_faces)
+        ):
+            raise ValueError(
+                f"inconsistent geometry: {len(positions)} vertices, {len(tex_coords)}"
+                f" texture coordinates and {len(cull_bits)} faces"
+            )
+
+        key = (
+            positions.tobytes(),
+            tex_coords.tobytes(),
+            tints.tobytes(),
+            cull_bits.tobytes(),
+            bytes(face is not None for face in greedy_faces),
+        )
+        if key not in cls._INSTANCES:
+            cls._INSTANCES[key] = cls(
+                positions, tex_coords, tints, cull_bits, greedy_faces
+            )
+        return cls._INSTANCES[key]
+
+    @classmethod
+    def combine(cls, geometries: typing.Sequence[BlockGeometry]) -> BlockGeometry:
+        if len(geometries) == 1:
+            return geometries[0]
+
+        return cls.create(
+            numpy.concatenate([geometry.positions for geometry in geometries]),
+            numpy.concatenate([geometry.tex_coords for geometry in geometries]),
+            numpy.concatenate([geometry.tints for geometry in geometries]),
+            numpy.concatenate([geometry.cull_bits for geometry in geometries]),
+            sum((geometry.greedy_faces for geometry in geometries), []),
+        )
+
+    def __init__(
+        self,
+        positions: numpy.ndarray,
+        tex_coords: numpy.ndarray,
+        tints: numpy.ndarray,
+        cull_bits: numpy.ndarray,
+        greedy_faces: list[tuple | None],
+    ):
+        # (n, 3) vertex positions, (n, 2) atlas coordinates, and per vertex the
+        # index into the tint colors of the block, or -1 for untinted faces
+        self.positions = positions
+        self.tex_coords = tex_coords
+        self.tints = tints
+        # per face (6 vertices) the FACE_BITS bit of the neighbour hiding it,
+        # and the GreedyMesher.describe_face() of it, or None for faces which
+        # cannot be merged with neighbouring blocks
+        self.cull_bits = cull_bits
+        self.greedy_faces = greedy_faces
+        self.tinted = bool((tints >= 0).any())
+
+        # (occlusion, greedy, tint colors) -> the arrays add_to_mesh() appends
+        self.parts_cache: dict[tuple, tuple] = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def get_colors(
+        self, tint_colors: typing.Sequence[tuple[float, ...]] | None
+    ) -> numpy.ndarray:
+        """Returns the (n, 4) vertex colors when tinted with 'tint_colors'"""
+        if not self.tinted or tint_colors is None:
+            return numpy.ones((len(self.positions), 4), dtype=numpy.float32)
+
+        palette = numpy.array([(1.0, 1.0, 1.0, 1.0), *tint_colors], dtype=numpy.float32)
+        if self.tints.max() >= len(palette) - 1:
+            raise IndexError(
+                f"tint index {self.tints.max()} out of range for {len(tint_colors)} colors"
+            )
+        return palette[self.tints + 1]
+
+    def get_parts(
+        self,
+        occlusion: int,
+        greedy: bool,
+        tint_colors: typing.Sequence[tuple[float, ...]] | None,
+    ) -> tuple[
+        numpy.ndarray,
+        numpy.ndarray,
+        numpy.ndarray,
+        numpy.ndarray,
+        list[tuple[tuple, tuple[float, ...]]],
+    ]:
+        """
+        Returns the positions, texture coordinates, texture regions and colors
+        of the visible faces not going through the greedy mesher, and the
+        (face, colors) of those going through it
+        """
+        tint_key = tuple(tint_colors) if self.tinted and tint_colors else None
+        key = occlusion, greedy, tint_key
+        parts = self.parts_cache.get(key)
+        if parts is not None:
+            return parts
+
+        visible = (self.cull_bits & occlusion) == 0
+        greedy_faces = []
+        if greedy:
+            for face, description in enumerate(self.greedy_faces):
+                if description is None or not visible[face]:
+                    continue
+                visible[face] = False
+
+                tint = self.tints[face * 6]
+                greedy_faces.append(
+                    (
+                        description,
+                        (
+                            tuple(tint_colors[tint]) * 6
+                            if tint >= 0 and tint_key is not None
+                            else (1.0,) * 24
+                        ),
+                    )
+                )
+
+        vertices = numpy.repeat(visible, 6)
+        positions = self.positions[vertices]
+        self.parts_cache[key] = parts = (
+            positions,
+            self.tex_coords[vertices],
+            numpy.zeros((len(positions), 4), dtype=numpy.float32),
+            self.get_colors(tint_key)[vertices],
+            greedy_faces,
+        )
+        return parts
+
+    def add_to_mesh(
+        self,
+        mesh: MeshData,
+        position: tuple[int, int, int],
+        tint_colors: typing.Sequence[tuple[float, ...]] | None = None,
+        occlusion: int = 0,
+        greedy: GreedyMesher = None,
+    ):
+        """See Model.add_to_mesh()"""
+        positions, tex_coords, tex_regions, colors, greedy_faces = self.get_parts(
+            occlusion, greedy is not None, tint_colors
+        )
+
+        for face, face_colors in greedy_faces:
+            greedy.add_face(mesh, position, face, face_colors)
+
+        if len(positions):
+            mesh.add(
+                positions + numpy.array(position, dtype=numpy.float32),
+                tex_coords,
+                tex_regions,
+                colors,
+            )
+
+
 class Model:
     _MODEL_CACHE: dict[str, Model] = {"minecraft:builtin/generated": None}
 
@@ -146,6 +340,10 @@ class Model:
                 model.elements = copy.deepcopy(model.parent.elements.copy())
                 # this is a 'basic' copy to share the cache entries
                 model.vertex_data_cache = model.parent.vertex_data_cache.copy()
+                model.element_cullfaces = model.parent.element_cullfaces.copy()
+                model.cull_bits_cache = model.parent.cull_bits_cache.copy()
+                # depends on the textures, so cannot be shared
+                model.greedy_face_cache = [{} for _ in model.elements]
                 model.texture_table.update(model.parent.texture_table)
 
         if "textures" in data:
@@ -188,8 +386,8 @@ class Model:
 
         if "elements" in data:
             for element in data["elements"]:
-                from_coord = Vec3(*element["from"]) / 16
-                to_coord = Vec3(*element["to"]) / 16
+                from_coord = numpy.array(element["from"], dtype=numpy.float64) / 16
+                to_coord = numpy.array(element["to"], dtype=numpy.float64) / 16
 
                 _faces = [
                     _try_resolve_texture(model, element, face) for face in FACE_ORDER
@@ -227,29 +425,29 @@ class Model:
                     for face in FACE_ORDER
                 )
 
-                base_matrix = Mat4()
+                base_matrix = VertexMath.IDENTITY
                 if "rotation" in element:
-                    origin = Vec3(*element["rotation"].get("origin", (0, 0, 0))) - Vec3(
-                        0.5, 0.5, 0.5
+                    origin = (
+                        numpy.array(element["rotation"].get("origin", (0, 0, 0))) - 0.5
                     )
                     axis = element["rotation"]["axis"]
                     angle = element["rotation"]["angle"] / 180 * math.pi
-                    base_matrix @= (
-                        Mat4.from_translation(origin)
-                        @ Mat4.from_rotation(angle, AXIS_LOOKUP[axis])
-                        @ Mat4.from_translation(-origin)
+                    base_matrix = base_matrix @ (
+                        VertexMath.translation(origin)
+                        @ VertexMath.rotation(angle, AXIS_LOOKUP[axis])
+                        @ VertexMath.translation(-origin)
                     )
 
                     if element["rotation"].get("rescale"):
-                        scale_vector = Vec3(1, 1, 1) - AXIS_LOOKUP[axis]
-                        base_matrix @= Mat4.from_scale(
+                        scale_vector = 1 - AXIS_LOOKUP[axis]
+                        base_matrix = base_matrix @ VertexMath.scale(
                             (scale_vector / math.cos(angle / 180 * math.pi))
                             + AXIS_LOOKUP[axis]
                         )
 
                 model.elements.append(
                     (
-                        (from_coord + to_coord) / 2 - Vec3(0.5, 0.5, 0.5),
+                        (from_coord + to_coord) / 2 - 0.5,
                         (to_coord - from_coord),
                         faces,
                         tuple(face is not None for face in _faces),
@@ -258,6 +456,15 @@ class Model:
                     )
                 )
                 model.vertex_data_cache.append({})
+                model.element_cullfaces.append(
+                    tuple(
+                        element["faces"][face.name.lower()].get("cullface")
+                        for face in FACE_ORDER
+                        if _faces[FACE_ORDER.index(face)] is not None
+                    )
+                )
+                model.cull_bits_cache.append({})
+                model.greedy_face_cache.append({})
 
         return model
 
@@ -266,20 +473,30 @@ class Model:
         self.parent: Model | None = None
         self.texture_table: dict[str, str] = {}
 
+        # (center, size, textures, enabled faces, tint indices, transformation)
         self.elements: list[
             tuple[
-                Vec3,
-                Vec3,
+                numpy.ndarray,
+                numpy.ndarray,
                 list[float | None] | list[AtlasReference | str | None],
                 tuple[bool, ...],
                 tuple[int, ...] | None,
-                Mat4,
+                numpy.ndarray,
             ]
         ] = []
         self.name = name
         self.texture_coordinates = None
         self.was_baked = False
-        self.vertex_data_cache: list[dict[tuple[float, float, float], list[Vec3]]] = []
+        self.vertex_data_cache: list[
+            dict[tuple[float, float, float], numpy.ndarray]
+        ] = []
+        # the "cullface" of each enabled face of each element
+        self.element_cullfaces: list[tuple[str | None, ...]] = []
+        self.cull_bits_cache: list[
+            dict[tuple[float, float, float], tuple[int, ...]]
+        ] = []
+        self.greedy_face_cache: list[dict[tuple[float, float, float], list | None]] = []
+        self.geometry_cache: dict[tuple[float, float, float], BlockGeometry] = {}
         self.item_layer_count = 0
         self.item_layers: list[pyglet.image.AbstractImage] = []
 
@@ -328,6 +545,169 @@ class Model:
             )
             self.item_layers.append(texture.get_texture())
 
+    def get_element_vertices(
+        self, i: int, rotation: tuple[float, float, float]
+    ) -> numpy.ndarray:
+        """
+        Returns the (n, 3) vertices of the enabled faces of element 'i',
+        relative to the block position
+        """
+        vertex_cache = self.vertex_data_cache[i]
+        if rotation in vertex_cache:
+            return vertex_cache[rotation]
+
+        center, size, _, enabled, __, base_matrix = self.elements[i]
+        matrix = base_matrix @ VertexMath.euler_rotation(rotation)
+
+        # the vertices are transformed as directions (w = 0), so the
+        # translation part of the element rotation does not move them
+        vertex_data = VertexMath.transform_directions(
+            matrix, VertexMath.cube_vertices(center, size / 2)[list(enabled)]
+        ).reshape(-1, 3)
+        vertex_cache[rotation] = vertex_data
+        return vertex_data
+
+    def get_element_cull_bits(
+        self, i: int, rotation: tuple[float, float, float]
+    ) -> tuple[int, ...]:
+        """
+        Returns for each enabled face of element 'i' the FACE_BITS bit of the
+        neighbour hiding it, or 0 if it has no "cullface"
+        """
+        cache = self.cull_bits_cache[i]
+        if rotation in cache:
+            return cache[rotation]
+
+        faces = [
+            (
+                None
+                if cullface is None
+                else getattr(
+                    Facing, "DOWN" if cullface == "bottom" else cullface.upper(), None
+                )
+            )
+            for cullface in self.element_cullfaces[i]
+        ]
+        # cull faces are given in the model space, rotate them with the model
+        directions = VertexMath.transform_directions(
+            VertexMath.euler_rotation(rotation),
+            VertexMath.CUBE_FACE_DIRECTIONS[
+                [FACE_ORDER.index(face) for face in faces if face is not None]
+            ],
+        )
+        offsets = iter(map(tuple, numpy.rint(directions).astype(int).tolist()))
+
+        bits = []
+        for face in faces:
+            if face is not None:
+                face = FACE_BY_OFFSET.get(next(offsets))
+            bits.append(0 if face is None else FACE_BITS[face])
+
+        cache[rotation] = bits = tuple(bits)
+        return bits
+
+    def get_element_greedy_faces(
+        self, i: int, rotation: tuple[float, float, float]
+    ) -> list[tuple] | None:
+        """
+        Returns GreedyMesher.describe_face() of each enabled face of element 'i',
+        or None if the element is no full, axis aligned cube and so cannot be
+        merged with neighbouring blocks
+        """
+        cache = self.greedy_face_cache[i]
+        if rotation in cache:
+            return cache[rotation]
+
+        from mcpython.rendering.ChunkMesh import GreedyMesher
+
+        center, size, textures, _, __, base_matrix = self.elements[i]
+        if (
+            center.any()
+            or (size != 1).any()
+            or not numpy.array_equal(base_matrix, VertexMath.IDENTITY)
+            or not all(
+                abs(angle - round(angle / (math.pi / 2)) * (math.pi / 2)) < 1e-6
+                for angle in rotation
+            )
+        ):
+            cache[rotation] = None
+            return None
+
+        vertex_data = (
+            numpy.rint(self.get_element_vertices(i, rotation) * 2) / 2
+        ).tolist()
+        cache[rotation] = faces = [
+            GreedyMesher.describe_face(
+                vertex_data[face : face + 6],
+                textures[face * 2 : face * 2 + 12],
+            )
+            for face in range(0, len(vertex_data), 6)
+        ]
+        return faces
+
+    def get_geometry(
+        self, rotation: tuple[float, float, float] = (0, 0, 0)
+    ) -> BlockGeometry:
+        """Returns the geometry of all elements of this model in 'rotation'"""
+        geometry = self.geometry_cache.get(rotation)
+        if geometry is not None:
+            return geometry
+
+        if not self.was_baked:
+            self.bake()
+
+        positions = [numpy.zeros((0, 3))]
+        tex_coords = []
+        tints = []
+        cull_bits = []
+        greedy_faces = []
+
+        for i, (_, __, textures, enabled, tint_indices, ___) in enumerate(
+            self.elements
+        ):
+            vertex_data = self.get_element_vertices(i, rotation)
+            faces = len(vertex_data) // 6
+
+            positions.append(vertex_data)
+            tex_coords.extend(textures)
+            tints.extend(
+                tint
+                for face, tint in enumerate(tint_indices or (-1,) * 6)
+                if enabled[face]
+            )
+            cull_bits.extend(self.get_element_cull_bits(i, rotation))
+            greedy_faces.extend(
+                self.get_element_greedy_faces(i, rotation) or (None,) * faces
+            )
+
+        self.geometry_cache[rotation] = geometry = BlockGeometry.create(
+            numpy.concatenate(positions),
+            tex_coords,
+            numpy.repeat(numpy.array(tints, dtype=numpy.int8), 6),
+            cull_bits,
+            greedy_faces,
+        )
+        return geometry
+
+    def add_to_mesh(
+        self,
+        mesh: MeshData,
+        position: tuple[int, int, int],
+        rotation: tuple[float, float, float] = (0, 0, 0),
+        tint_colors: list[tuple[float, float, float, float]] = None,
+        occlusion: int = 0,
+        greedy: GreedyMesher = None,
+    ):
+        """
+        Appends the vertices of this model at 'position' to 'mesh', leaving out
+        faces whose "cullface" is covered according to the 'occlusion' mask.
+        When 'greedy' is given, faces of full cube elements go through it so
+        they can be merged with equal faces of neighbouring blocks
+        """
+        self.get_geometry(rotation).add_to_mesh(
+            mesh, position, tint_colors=tint_colors, occlusion=occlusion, greedy=greedy
+        )
+
     def get_rendering_data(
         self,
         extra: list[pyglet.graphics.vertexdomain.VertexList],
@@ -336,90 +716,11 @@ class Model:
         rotation: tuple[float, float, float] = (0, 0, 0),
         flat_batch=None,
         tint_colors: list[tuple[int, int, int]] = None,
-    ) -> tuple[int, list[float], list[float]]:
-        v = Vec3(*position)
-        count = 0
-        vertex = []
-        texture = []
-
-        from mcpython.rendering.util import cube_vertices
-
-        for i, (
-            center,
-            size,
-            textures,
-            enabled,
-            tint_indices,
-            base_matrix,
-        ) in enumerate(self.elements):
-            vertex_cache = self.vertex_data_cache[i]
-
-            if rotation not in vertex_cache:
-                rotation_matrix = base_matrix
-
-                if rotation != (0, 0, 0):
-                    rotation_matrix @= Mat4.from_rotation(rotation[0], Vec3(1, 0, 0))
-                    rotation_matrix @= Mat4.from_rotation(rotation[1], Vec3(0, 1, 0))
-                    rotation_matrix @= Mat4.from_rotation(rotation[2], Vec3(0, 0, 1))
-
-                vertex_data = cube_vertices(center, size / 2)
-                vertex_data = sum(
-                    (
-                        [
-                            Vec3(
-                                (e := rotation_matrix @ Vec4(*element))[0],
-                                e[1],
-                                e[2],
-                            )
-                            for element in x
-                        ]
-                        for i, x in enumerate(vertex_data)
-                        if enabled[i]
-                    ),
-                    [],
-                )
-                vertex_cache[rotation] = vertex_data
-            else:
-                vertex_data = vertex_cache[rotation]
-
-            if tint_indices is None or tint_colors is None:
-                count += 6 * enabled.count(True)
-                vertex_data = [vertex + v for vertex in vertex_data]
-                vertex += sum(map(tuple, vertex_data), ())
-                texture.extend(textures)
-            else:
-                from mcpython.rendering.util import (
-                    COLORED_BLOCK_SHADER,
-                    COLORED_BLOCK_GROUP,
-                )
-                from mcpython.rendering.util import (
-                    DEFAULT_BLOCK_SHADER,
-                    DEFAULT_BLOCK_GROUP,
-                )
-
-                tinting = sum(
-                    (
-                        (tint_colors[x] * 6) if x >= 0 else ((1,) * (4 * 6))
-                        for i, x in enumerate(tint_indices)
-                        if enabled[i]
-                    ),
-                    (),
-                )
-
-                extra.append(
-                    COLORED_BLOCK_SHADER.vertex_list(
-                        6 * enabled.count(True),
-                        GL_TRIANGLES,
-                        batch,
-                        COLORED_BLOCK_GROUP,
-                        position=(
-                            "f",
-                            sum(map(tuple, [vertex + v for vertex in vertex_data]), ()),
-                        ),
-                        tex_coords=("f", textures),
-                        colors=("f", tinting),
-                    )
-                )
+    ) -> tuple[int, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        geometry = self.get_geometry(rotation)
+        positions = geometry.positions + numpy.array(position, dtype=numpy.float32)
+        # untinted faces are white, so all faces share one vertex list
+        colors = geometry.get_colors(tint_colors)
 
         if flat_batch and self.item_layer_count:
             for i in range(self.item_layer_count):
@@ -428,7 +729,7 @@ class Model:
                 sprite = pyglet.sprite.Sprite(self.item_layers[i], batch=flat_batch)
                 extra.append(sprite)
 
-        return count, vertex, texture
+        return len(geometry), positions, geometry.tex_coords, colors
 
     def create_vertex_list(
         self,
@@ -446,21 +747,29 @@ class Model:
             self.bake()
 
         extra = []
-        count, vertex_data, texture_data = self.get_rendering_data(
+        count, vertex_data, texture_data, color_data = self.get_rendering_data(
             extra, batch, position, flat_batch=flat_batch, tint_colors=tint_colors
         )
 
         try:
-            return [
-                DEFAULT_BLOCK_SHADER.vertex_list(
-                    count,
-                    GL_TRIANGLES,
-                    batch,
-                    DEFAULT_BLOCK_GROUP,
-                    position=("f", vertex_data),
-                    tex_coords=("f", texture_data),
-                )
-            ] + extra
+            vertex_list = DEFAULT_BLOCK_SHADER.vertex_list(
+                count,
+                GL_TRIANGLES,
+                batch,
+                DEFAULT_BLOCK_GROUP,
+                position="f",
+                tex_coords="f",
+                tex_regions="f",
+                colors="f",
+            )
+            VertexMath.write_vertex_data(
+                vertex_list,
+                position=vertex_data,
+                tex_coords=texture_data,
+                tex_regions=numpy.zeros(4 * count),
+                colors=color_data,
+            )
+            return [vertex_list] + extra
 
         except ValueError:
             print(vertex_data, file=sys.stderr)
@@ -491,12 +800,22 @@ class BlockState:
         self, models: list[tuple[str, Model | None, int, int, int, bool, int]]
     ):
         self.models = models
+        # the geometry of each model in its rotation, set by bake()
+        self.geometries: list[BlockGeometry] = []
 
         if len(models) == 1:
             self.get_model = lambda _: self.models[0]
+            self.get_geometry = lambda _: self.geometries[0]
         else:
-            weights = [m[-1] for m in self.models]
-            self.get_model = lambda _: random.choices(self.models, weights, k=1)[0]
+            # pick the variant based on the position, so it stays the same
+            # when the mesh containing the block gets rebuilt
+            cum_weights = list(itertools.accumulate(m[-1] for m in self.models))
+            self.get_model = lambda position: random.Random(hash(position)).choices(
+                self.models, cum_weights=cum_weights, k=1
+            )[0]
+            self.get_geometry = lambda position: random.Random(hash(position)).choices(
+                self.geometries, cum_weights=cum_weights, k=1
+            )[0]
 
     def get_required_models(self) -> list[str]:
         return list(map(lambda e: e[0], self.models))
@@ -506,6 +825,9 @@ class BlockState:
     ) -> tuple[str, Model | None, int, int, int, bool, int]:
         raise RuntimeError
 
+    def get_geometry(self, position: tuple[int, int, int]) -> BlockGeometry:
+        raise RuntimeError
+
     def bake(self):
         self.models = [
             (name, model or Model.by_name(name), x, y, z, uvlock, weight)
@@ -514,16 +836,28 @@ class BlockState:
         for _, model, *__ in self.models:
             model.bake()
 
-    def get_rendering_data(
+    def bake_geometry(self):
+        self.geometries = [
+            model.get_geometry((x, y, z)) for _, model, x, y, z, *__ in self.models
+        ]
+
+    def add_to_mesh(
         self,
-        extra: list[pyglet.graphics.vertexdomain.VertexList],
-        batch: pyglet.graphics.Batch | None,
+        mesh: MeshData,
         position: tuple[int, int, int],
-        tint_colors: list[tuple[int, int, int]] = None,
-    ) -> tuple[int, list[float], list[float]]:
-        name, model, x, y, z, uvlock, _ = self.get_model(position)
-        return model.get_rendering_data(
-            extra, batch, position, (x, y, z), tint_colors=tint_colors
+        tint_colors: list[tuple[float, float, float, float]] = None,
+        occlusion: int = 0,
+        greedy: GreedyMesher = None,
+    ):
+        if not self.geometries:
+            self.bake_geometry()
+
+        self.get_geometry(position).add_to_mesh(
+            mesh,
+            position,
+            tint_colors=tint_colors,
+            occlusion=occlusion,
+            greedy=greedy,
         )
 
 
@@ -550,12 +884,28 @@ class BlockStateFile:
     @classmethod
     def bake_all(cls):
         from mcpython.rendering.util import update_texture_atlas_references
+        from mcpython.world.blocks.AbstractBlock import BLOCK_REGISTRY
 
         for file in cls._INSTANCES:
             file.bake()
 
         update_texture_atlas_references()
 
+        # the state tables and geometry of all known states, compiled last as
+        # the geometry depends on the final atlas layout
+        for block in BLOCK_REGISTRY:
+            if block.STATE_FILE is None:
+                continue
+
+            for state in block.BLOCk_STATE_LISTING:
+                try:
+                    block.STATE_FILE.get_geometries(state, (0, 0, 0))
+                except (KeyboardInterrupt, SystemExit):
+                    raise
+                except:
+                    print(block.NAME, state, file=sys.stderr)
+                    traceback.print_exc()
+
     @classmethod
     def by_name(cls, name: str) -> BlockStateFile:
         """
@@ -604,6 +954,12 @@ class BlockStateFile:
 
         self.variants: list[tuple[dict[str, str], BlockState]] = []
         self.multipart: list[tuple[AbstractBlockStateCondition, BlockState]] = []
+        # the canonical state -> the variant or multipart parts applying to it,
+        # and the geometry of all of them, or None if one depends on the position
+        self.state_table: dict[tuple[tuple[str, str], ...], tuple[BlockState, ...]] = {}
+        self.state_geometries: dict[
+            tuple[tuple[str, str], ...], BlockGeometry | None
+        ] = {}
 
     def bake(self):
         for _, state in self.variants:
@@ -612,66 +968,89 @@ class BlockStateFile:
         for _, state in self.multipart:
             state.bake()
 
-    def get_blockstates(self, state: dict[str, str]) -> typing.Iterator[BlockState]:
+    def get_blockstates(
+        self, state: dict[str, str] | tuple[tuple[str, str], ...]
+    ) -> tuple[BlockState, ...]:
+        """
+        Returns the variant or the multipart parts applying to 'state', given
+        as dict or canonical tuple; resolved once per state, then looked up
+        """
+        key = _state_key(state)
+        blockstates = self.state_table.get(key)
+        if blockstates is None:
+            blockstates = self.state_table[key] = self.resolve_blockstates(dict(key))
+        return blockstates
+
+    def resolve_blockstates(self, state: dict[str, str]) -> tuple[BlockState, ...]:
         if self.variants:
             for case, variant in self.variants:
                 if all(state.get(key) == value for key, value in case.items()):
-                    yield variant
-                    return
+                    return (variant,)
 
             raise KeyError(
                 f"block state: {self.name}, state: {state} (possible: {', '.join(map(lambda e: str(e[0]), self.variants))})"
             )
 
-        for case, variant in self.multipart:
-            if case is None or case.applies(state):
-                yield variant
+        return tuple(
+            variant
+            for case, variant in self.multipart
+            if case is None or case.applies(state)
+        )
 
-    def create_vertex_list(
+    def add_to_mesh(
         self,
-        batch: pyglet.graphics.Batch,
+        mesh: MeshData,
         position: tuple[int, int, int],
-        state: dict[str, str],
-        tint_colors: list[tuple[int, int, int]] = None,
+        state: dict[str, str] | tuple[tuple[str, str], ...],
+        tint_colors: list[tuple[float, float, float, float]] = None,
+        occlusion: int = 0,
+        greedy: GreedyMesher = None,
     ):
-        from mcpython.rendering.util import (
-            DEFAULT_BLOCK_SHADER,
-            DEFAULT_BLOCK_GROUP,
-        )
-
-        count = 0
-        vertex_data = []
-        texture_data = []
-        extra = []
+        """
+        Appends the vertices of the block in 'state' at 'position' to 'mesh'.
+        'occlusion' is the ChunkSection.occlusion mask of the position, used to
+        leave out hidden faces; 'greedy' optionally merges full block faces
+        """
+        for geometry in self.get_geometries(state, position):
+            geometry.add_to_mesh(
+                mesh,
+                position,
+                tint_colors=tint_colors,
+                occlusion=occlusion,
+                greedy=greedy,
+            )
 
-        for blockstate in self.get_blockstates(state):
-            c, v, t = blockstate.get_rendering_data(
-                extra, batch, position, tint_colors=tint_colors
+    def get_geometries(
+        self,
+        state: dict[str, str] | tuple[tuple[str, str], ...],
+        position: tuple[int, int, int],
+    ) -> list[BlockGeometry]:
+        """
+        Returns the geometry of the block in 'state' at 'position'; a single
+        combined one unless a part has multiple weighted models
+        """
+        key = _state_key(state)
+        if key not in self.state_geometries:
+            blockstates = self.get_blockstates(key)
+            for blockstate in blockstates:
+                if not blockstate.geometries:
+                    blockstate.bake_geometry()
+
+            self.state_geometries[key] = (
+                BlockGeometry.combine(
+                    [blockstate.geometries[0] for blockstate in blockstates]
+                )
+                if all(len(blockstate.geometries) == 1 for blockstate in blockstates)
+                else None
             )
-            count += c
-            vertex_data += v
-            texture_data += t
 
-        try:
-            return (
-                [
-                    DEFAULT_BLOCK_SHADER.vertex_list(
-                        count,
-                        GL_TRIANGLES,
-                        batch,
-                        DEFAULT_BLOCK_GROUP,
-                        position=("f", vertex_data),
-                        tex_coords=("f", texture_data),
-                    )
-                ]
-                if count > 0
-                else []
-            ) + extra
-        except ValueError:
-            print(vertex_data, file=sys.stderr)
-            print(texture_data, file=sys.stderr)
-            traceback.print_exc()
-            return []
+        geometry = self.state_geometries[key]
+        if geometry is not None:
+            return [geometry]
+
+        return [
+            blockstate.get_geometry(position) for blockstate in self.state_table[key]
+        ]
 
 
 class ItemModel:
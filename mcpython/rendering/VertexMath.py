@@ -0,0 +1,155 @@
+"""
+Vertex math for model baking on NumPy arrays: the faces of a cube as a
+template, and 4x4 transformation matrices applied to whole vertex arrays at
+once instead of to single Vec3's.
+
+Matrices act on column vectors, so 'a @ b' first applies 'b', then 'a'
+(like pyglet.math.Mat4).
+"""
+
+from __future__ import annotations
+
+import math
+import typing
+
+import numpy
+
+# the six faces of the cube from -1 to 1, two triangles each: top, bottom,
+# right (+x), front (+z), left (-x) and back (-z). Models map the faces of
+# their elements in FACE_ORDER onto them
+# fmt: off
+CUBE_FACES = numpy.array([
+    # Top
+    [(-1, 1, -1), (-1, 1, 1), (1, 1, 1), (-1, 1, -1), (1, 1, 1), (1, 1, -1)],
+    # Bottom
+    [(-1, -1, -1), (1, -1, -1), (1, -1, 1), (-1, -1, -1), (1, -1, 1), (-1, -1, 1)],
+    # Right
+    [(1, -1, 1), (1, -1, -1), (1, 1, -1), (1, -1, 1), (1, 1, -1), (1, 1, 1)],
+    # Front
+    [(-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, -1, 1), (1, 1, 1), (-1, 1, 1)],
+    # Left
+    [(-1, -1, -1), (-1, -1, 1), (-1, 1, 1), (-1, -1, -1), (-1, 1, 1), (-1, 1, -1)],
+    # Back
+    [(1, -1, -1), (-1, -1, -1), (-1, 1, -1), (1, -1, -1), (-1, 1, -1), (1, 1, -1)],
+], dtype=numpy.float64)
+# fmt: on
+
+# the direction each face of CUBE_FACES points in
+CUBE_FACE_DIRECTIONS = numpy.array(
+    [(0, 1, 0), (0, -1, 0), (1, 0, 0), (0, 0, 1), (-1, 0, 0), (0, 0, -1)],
+    dtype=numpy.float64,
+)
+
+IDENTITY = numpy.identity(4)
+
+
+def cube_vertices(
+    center: typing.Sequence[float], half_size: typing.Sequence[float]
+) -> numpy.ndarray:
+    """Returns the (6, 6, 3) vertices of the faces of the cube around 'center'"""
+    return CUBE_FACES * numpy.asarray(half_size, dtype=numpy.float64) + center
+
+
+def translation(offset: typing.Sequence[float]) -> numpy.ndarray:
+    matrix = numpy.identity(4)
+    matrix[:3, 3] = offset
+    return matrix
+
+
+def scale(factors: typing.Sequence[float]) -> numpy.ndarray:
+    return numpy.diag((*factors, 1.0))
+
+
+def rotation(angle: float, axis: typing.Sequence[float]) -> numpy.ndarray:
+    """The counter-clockwise rotation by 'angle' (in radians) around 'axis'"""
+    x, y, z = numpy.asarray(axis, dtype=numpy.float64) / numpy.linalg.norm(axis)
+    c, s = math.cos(angle), math.sin(angle)
+    t = 1 - c
+
+    matrix = numpy.identity(4)
+    # fmt: off
+    matrix[:3, :3] = (
+        (t * x * x + c,     t * x * y - s * z, t * x * z + s * y),
+        (t * x * y + s * z, t * y * y + c,     t * y * z - s * x),
+        (t * x * z - s * y, t * y * z + s * x, t * z * z + c),
+    )
+    # fmt: on
+    return matrix
+
+
+def euler_rotation(angles: typing.Sequence[float]) -> numpy.ndarray:
+    """The rotation around x, then y, then z axis as used by block states"""
+    matrix = IDENTITY
+    for angle, axis in zip(angles, numpy.identity(3)):
+        if angle:
+            matrix = matrix @ rotation(angle, axis)
+    return matrix
+
+
+def transform(matrix: numpy.ndarray, points: numpy.ndarray) -> numpy.ndarray:
+    """Applies 'matrix' to the (..., 3) array of 'points'"""
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def transform_directions(
+    matrix: numpy.ndarray, directions: numpy.ndarray
+) -> numpy.ndarray:
+    """Applies 'matrix' to the (..., 3) array of 'directions', ignoring the translation"""
+    return directions @ matrix[:3, :3].T
+
+
+def write_vertex_data(vertex_list, **data: numpy.ndarray):
+    """
+    Copies the arrays into the attributes of the same name of 'vertex_list',
+    converting them to the attribute type as a whole instead of value by value
+    """
+    for name, array in data.items():
+        region = numpy.ctypeslib.as_array(getattr(vertex_list, name))
+        if region.size != numpy.size(array):
+            raise ValueError(
+                f"invalid data size for '{name}': expected {region.size}, got"
+                f" {numpy.size(array)}"
+            )
+        region[:] = numpy.reshape(array, -1)
+
+
+# units per block of the quantized positions, relative to the section origin
+POSITION_SCALE = 256
+# how often merged faces repeat their texture at most (the size of a section),
+# their texture coordinates are quantized as fraction of it
+MAX_TEXTURE_REPEAT = 16
+
+
+def quantize_vertices(
+    origin: typing.Sequence[float],
+    position: numpy.ndarray,
+    tex_coords: numpy.ndarray,
+    tex_regions: numpy.ndarray,
+    colors: numpy.ndarray,
+) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray] | None:
+    """
+    Converts flat float vertex data into the compact layout: int16 positions
+    relative to 'origin', uint16 texture coordinates and regions normalized to
+    [0; 1], and uint8 colors. Returns None if the data does not fit into it
+    """
+    position = numpy.rint((numpy.reshape(position, (-1, 3)) - origin) * POSITION_SCALE)
+    tex_coords = numpy.reshape(tex_coords, (-1, 2)).astype(numpy.float64)
+    tex_regions = numpy.reshape(tex_regions, (-1, 4))
+
+    # texture coordinates of merged faces count the repetitions of the region
+    repeated = (tex_regions[:, 2:] != 0).any(axis=1)
+    tex_coords[repeated] /= MAX_TEXTURE_REPEAT
+
+    if (
+        (numpy.abs(position) > 2**15 - 1).any()
+        or (tex_coords < 0).any()
+        or (tex_coords > 1).any()
+    ):
+        return None
+
+    return (
+        position.astype(numpy.int16),
+        numpy.rint(tex_coords * (2**16 - 1)).astype(numpy.uint16),
+        numpy.rint(numpy.clip(tex_regions, 0, 1) * (2**16 - 1)).astype(numpy.uint16),
+        numpy.rint(numpy.clip(colors, 0, 1) * 255).astype(numpy.uint8),
+    )
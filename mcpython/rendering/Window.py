@@ -111,6 +111,10 @@ class Window(pyglet.window.Window):
         super().on_resize(width, height)
         return self.state_handler.handle_on_resize(width, height)
 
+    def on_close(self):
+        self.world.close()
+        super().on_close()
+
     def on_draw(self):
         """Called by pyglet to draw the canvas."""
         self.clear()
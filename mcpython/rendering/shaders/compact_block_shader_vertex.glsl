@@ -0,0 +1,37 @@
+#version 330 core
+// the default block shader for the compact vertex layout of chunk meshes:
+// positions are shorts in 1/256 blocks relative to the section origin, texture
+// coordinates and regions normalized unsigned shorts and colors normalized bytes
+in vec3 position;
+in vec2 render_offset;
+in vec2 tex_coords;
+in vec4 tex_regions;
+in vec4 colors;
+
+out vec2 texture_coords;
+out vec4 texture_region;
+out vec4 coloring;
+
+uniform WindowBlock
+{
+    mat4 projection;
+    mat4 view;
+} window;
+
+uniform mat4 model;
+uniform vec3 origin;
+
+// keep in sync with VertexMath.POSITION_SCALE and VertexMath.MAX_TEXTURE_REPEAT
+const float POSITION_SCALE = 256.0;
+const float MAX_TEXTURE_REPEAT = 16.0;
+
+void main()
+{
+    gl_Position = window.projection * model * window.view * vec4(position / POSITION_SCALE + origin, 1.0);
+    gl_Position.xy += render_offset; // Adding screen offset in pixels
+
+    // merged faces store how often they repeat the texture, scaled into [0; 1]
+    texture_coords = tex_regions.zw == vec2(0.0) ? tex_coords : tex_coords * MAX_TEXTURE_REPEAT;
+    texture_region = tex_regions;
+    coloring = colors;
+}
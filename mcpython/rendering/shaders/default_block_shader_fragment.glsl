@@ -1,10 +1,17 @@
 #version 330 core
 in vec2 texture_coords;
+in vec4 texture_region;
+in vec4 coloring;
 out vec4 final_colors;
 
 uniform sampler2D our_texture;
 
 void main()
 {
-    final_colors = (texture(our_texture, texture_coords));
+    // merged faces repeat their texture inside the atlas region (x, y, width, height),
+    // all other faces have an empty region and atlas coordinates
+    vec2 coords = texture_region.zw == vec2(0.0)
+        ? texture_coords
+        : texture_region.xy + fract(texture_coords) * texture_region.zw;
+    final_colors = (texture(our_texture, coords) * coloring);
 }
\ No newline at end of file
@@ -2,8 +2,12 @@
 in vec3 position;
 in vec2 render_offset;
 in vec2 tex_coords;
+in vec4 tex_regions;
+in vec4 colors;
 
 out vec2 texture_coords;
+out vec4 texture_region;
+out vec4 coloring;
 
 uniform WindowBlock
 {
@@ -19,4 +23,6 @@ void main()
     gl_Position.xy += render_offset; // Adding screen offset in pixels
 
     texture_coords = tex_coords;
+    texture_region = tex_regions;
+    coloring = colors;
 }
\ No newline at end of file
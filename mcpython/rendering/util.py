@@ -8,7 +8,6 @@ from pyglet.math import Vec3, Mat4, Vec4
 
 from mcpython.rendering.Models import _TEXTURE_ATLAS
 
-
 _GROUPS: list[pyglet.model.TexturedMaterialGroup] = []
 
 
@@ -20,10 +19,15 @@ def update_texture_atlas_references():
 
 def create_shader_group(
     name: str,
+    fragment_name: str = None,
 ) -> tuple[pyglet.graphics.shader.Shader, pyglet.model.TexturedMaterialGroup]:
+    """
+    Creates the shader from "<name>_vertex.glsl" and "<fragment_name>_fragment.glsl",
+    'fragment_name' defaulting to 'name'
+    """
     path = pathlib.Path(__file__).parent
     vertex_file = path.joinpath("shaders", f"{name}_vertex.glsl")
-    fragment_file = path.joinpath("shaders", f"{name}_fragment.glsl")
+    fragment_file = path.joinpath("shaders", f"{fragment_name or name}_fragment.glsl")
 
     shader = pyglet.gl.current_context.create_program(
         (vertex_file.read_text(), "vertex"), (fragment_file.read_text(), "fragment")
@@ -46,47 +50,18 @@ def create_shader_group(
     return shader, group
 
 
+# the shader of all block geometry: chunk meshes, items and the breaking overlay.
+# Untinted faces have white vertex colors, so tinted and untinted geometry
+# share vertex lists and draw calls
 DEFAULT_BLOCK_SHADER, DEFAULT_BLOCK_GROUP = create_shader_group("default_block_shader")
-COLORED_BLOCK_SHADER, COLORED_BLOCK_GROUP = create_shader_group("colored_block_shader")
+# the same for the compact vertex layout of chunk meshes (config.COMPACT_BLOCK_VERTICES)
+COMPACT_BLOCK_SHADER, COMPACT_BLOCK_GROUP = create_shader_group(
+    "compact_block_shader", "default_block_shader"
+)
 COLORED_LINE_SHADER, COLORED_LINE_GROUP = create_shader_group("colored_outline_shader")
 LAYERED_ITEM_SHADER, LAYERED_ITEM_GROUP = create_shader_group("item_layer_shader")
 
 
-def cube_vertices(
-    center: Vec3, size: Vec3
-) -> list[tuple[Vec3, Vec3, Vec3, Vec3, Vec3, Vec3]]:
-    x, y, z = center
-    nx, ny, nz = size
-    """Return the vertices of the cube at position x, y, z with size 2*n."""
-    # fmt: off
-    return [
-        # Top
-        (Vec3(x-nx, y+ny, z-nz), Vec3(x-nx, y+ny, z+nz), Vec3(x+nx, y+ny, z+nz),  # Triangle 1
-        Vec3(x-nx, y+ny, z-nz), Vec3(x+nx, y+ny, z+nz), Vec3(x+nx, y+ny, z-nz)),  # Triangle 2
-
-        # Bottom
-        (Vec3(x-nx, y-ny, z-nz), Vec3(x+nx, y-ny, z-nz), Vec3(x+nx, y-ny, z+nz),  # Triangle 1
-        Vec3(x-nx, y-ny, z-nz), Vec3(x+nx, y-ny, z+nz), Vec3(x-nx, y-ny, z+nz)),  # Triangle 2
-
-        # Right
-        (Vec3(x+nx, y-ny, z+nz), Vec3(x+nx, y-ny, z-nz), Vec3(x+nx, y+ny, z-nz),  # Triangle 1
-        Vec3(x+nx, y-ny, z+nz), Vec3(x+nx, y+ny, z-nz), Vec3(x+nx, y+ny, z+nz)),  # Triangle 2
-
-        # Front
-        (Vec3(x-nx, y-ny, z+nz), Vec3(x+nx, y-ny, z+nz), Vec3(x+nx, y+ny, z+nz),  # Triangle 1
-        Vec3(x-nx, y-ny, z+nz), Vec3(x+nx, y+ny, z+nz), Vec3(x-nx, y+ny, z+nz)),  # Triangle 2
-
-        # Left
-        (Vec3(x-nx, y-ny, z-nz), Vec3(x-nx, y-ny, z+nz), Vec3(x-nx, y+ny, z+nz),  # Triangle 1
-        Vec3(x-nx, y-ny, z-nz), Vec3(x-nx, y+ny, z+nz), Vec3(x-nx, y+ny, z-nz)),  # Triangle 2
-
-        # Back
-        (Vec3(x+nx, y-ny, z-nz), Vec3(x-nx, y-ny, z-nz), Vec3(x-nx, y+ny, z-nz),  # Triangle 1
-        Vec3(x+nx, y-ny, z-nz), Vec3(x-nx, y+ny, z-nz), Vec3(x+nx, y+ny, z-nz)),  # Triangle 2
-    ]
-    # fmt: on
-
-
 def cube_line_vertices(pos: Vec3, size: Vec3, scale: float = 1) -> list[Vec3]:
     """Return the vertices of the cube at position x, y, z with size 2*n."""
     x, y, z = pos + size / 2 - Vec3(0.5, 0.5, 0.5)
@@ -7,6 +7,7 @@ from mcpython.containers.AbstractContainer import CONTAINER_STACK
 from mcpython.rendering.Window import Window
 from mcpython.states.AbstractState import AbstractStatePart
 from mcpython.world.entity.PlayerEntity import PlayerEntity
+from mcpython.world.util import normalize
 
 
 class InventoryController(AbstractStatePart):
@@ -93,22 +94,16 @@ class InventoryController(AbstractStatePart):
     def draw_label(self):
         """Draw the label in the top left of the screen."""
         x, y, z = self.player.position
+        # outside of the loaded area, there is no chunk to count the blocks of
+        chunk = self.player.world.peek_chunk(normalize(self.player.position))
         self.label.text = "%02d (%.2f, %.2f, %.2f) %d (%d) %d" % (
             pyglet.clock.get_frequency(),
             x,
             y,
             z,
             len(self.player.world.chunks),
-            len(
-                self.player.world.get_or_create_chunk_by_position(
-                    self.player.position
-                ).blocks
-            ),
-            len(
-                self.player.world.get_or_create_chunk_by_position(
-                    self.player.position
-                ).entities
-            ),
+            0 if chunk is None else len(chunk.blocks),
+            0 if chunk is None else len(chunk.entities),
         )
         self.label.draw()
 
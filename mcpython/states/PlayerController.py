@@ -26,10 +26,8 @@ class PlayerController(AbstractStatePart):
         block, previous, block_raw, previous_real = self.player.hit_test(
             self.player.position, vector
         )
-        block_chunk = world.get_or_create_chunk_by_position(block) if block else None
-        previous_chunk = (
-            world.get_or_create_chunk_by_position(previous) if previous else None
-        )
+        block_chunk = world.peek_chunk(block) if block else None
+        previous_chunk = world.peek_chunk(previous) if previous else None
 
         if (
             block_chunk
@@ -51,7 +49,7 @@ class PlayerController(AbstractStatePart):
             (button == mouse.LEFT) and (modifiers & key.MOD_CTRL)
         ):
             # ON OSX, control + left click = right click.
-            if previous and not stack.is_empty():
+            if previous_chunk and not stack.is_empty():
                 old_block = previous_chunk.blocks.get(previous)
 
                 if old_block:
@@ -59,10 +57,11 @@ class PlayerController(AbstractStatePart):
                     if state2 is True:
                         pass  # todo: reduce stack amount
                 elif b := stack.item.create_block_to_be_placed(stack):
-                    world.add_block(previous, b)
+                    # for stateless blocks, this is the shared instance
+                    b = world.add_block(previous, b)
 
                     if b.on_block_placed(stack, block, block_raw) is False:
-                        world.remove_block(b)
+                        world.remove_block(previous)
                     else:
                         b.update_render_state()
 
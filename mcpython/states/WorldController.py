@@ -27,6 +27,7 @@ class WorldController(AbstractStatePart):
         self.last_tick = time.time()
 
         self.focused_block: AbstractBlock | None = None
+        self.focused_position: tuple[int, int, int] | None = None
         self.focused_box_vertex: pyglet.graphics.vertexdomain.VertexList | None = None
         self.focused_batch = pyglet.graphics.Batch()
 
@@ -44,7 +45,7 @@ class WorldController(AbstractStatePart):
                 from mcpython.rendering.Models import BreakingTextureProvider
 
                 window.player.breaking_block_provider = BreakingTextureProvider()
-            window.set_3d(offset=Vec3(*window.player.breaking_block.position))
+            window.set_3d(offset=Vec3(*window.player.breaking_block_target))
             window.player.breaking_block_provider.update(
                 1
                 - window.player.breaking_block_timer
@@ -65,21 +66,20 @@ class WorldController(AbstractStatePart):
         """
         vector = window.player.get_sight_vector()
         if block := window.player.hit_test(window.player.position, vector)[0]:
-            instance = self.world.get_or_create_chunk_by_position(block).blocks.get(
-                block
-            )
+            instance = self.world.get_block(*block)
             if instance is None:
                 return
 
-            if instance != self.focused_block:
+            if instance is not self.focused_block or block != self.focused_position:
                 self.focused_block = instance
+                self.focused_position = block
 
                 if self.focused_box_vertex:
                     self.focused_box_vertex.delete()
 
                 self.focused_box_vertex = (
                     instance.get_bounding_box().create_vertex_list(
-                        self.focused_batch, Vec3(*instance.position)
+                        self.focused_batch, Vec3(*block)
                     )
                 )
 
@@ -0,0 +1,98 @@
+"""
+Generates a square of chunks ahead of time and saves it as a world, so a server
+can start on a pre-built map instead of generating it under load:
+
+    python -m mcpython.tools.pregen --seed S --radius R --workers N
+
+The world is written to cache/temp/worlds/<name>, like the "save" command does.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import itertools
+import time
+
+import pyglet
+
+# no window is opened, the GL context is only needed while importing the game
+pyglet.options["headless"] = True
+
+from mcpython import config
+
+
+def main(args: list[str] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m mcpython.tools.pregen",
+        description="Generates the chunks around the world origin and saves them",
+    )
+    parser.add_argument("--seed", type=int, help="the world seed, random if not set")
+    parser.add_argument(
+        "--radius",
+        type=int,
+        default=8,
+        help="chunks from (-R, -R) to (R, R) are generated",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.WORLDGEN_WORKERS,
+        help="worldgen processes, 0 generates on the main thread",
+    )
+    parser.add_argument("--world", default="pregen", help="the name of the world")
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="only save the differences of the chunks to the regenerated terrain",
+    )
+    options = parser.parse_args(args)
+
+    config.WORLDGEN_WORKERS = options.workers
+    config.DELTA_CHUNKS = options.delta
+    # nothing is rendered
+    config.MESH_WORKERS = 0
+
+    from mcpython.world.blocks.AbstractBlock import BLOCK_REGISTRY
+    from mcpython.world.items.AbstractItem import ITEM_REGISTRY
+    from mcpython.world.World import World
+    import mcpython.world.helpers
+
+    ITEM_REGISTRY.run_registrations()
+    BLOCK_REGISTRY.run_registrations()
+
+    # only the requested chunks are generated and saved
+    world = World(None, seed=options.seed, debug_world=False)
+
+    radius = options.radius
+    positions = list(
+        itertools.product(range(-radius, radius + 1), range(-radius, radius + 1))
+    )
+    print(
+        f"[INFO] generating {len(positions)} chunks with seed {world.storage.seed}"
+        f" and {options.workers} workers"
+    )
+
+    start = time.perf_counter()
+    for position in positions:
+        world.worldgen.request(world.get_or_create_chunk_by_coord(position))
+
+    pending = world.worldgen.pending
+    while pending:
+        concurrent.futures.wait(
+            [future for _, future in pending.values()],
+            return_when=concurrent.futures.FIRST_COMPLETED,
+        )
+        world.worldgen.process()
+        print(f"[INFO] {len(positions) - len(pending)}/{len(positions)} chunks done")
+
+    world.close()
+    print(f"[INFO] generated in {time.perf_counter() - start:.2f} seconds")
+
+    folder = config.TMP / "worlds" / options.world
+    world.storage.save_world(folder, [world.chunks[position] for position in positions])
+    print(f"[INFO] saved to {folder}")
+
+
+if __name__ == "__main__":
+    main()
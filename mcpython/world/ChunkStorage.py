@@ -0,0 +1,675 @@
+from __future__ import annotations
+
+import collections.abc
+import enum
+import typing
+
+import numpy
+
+from mcpython.world.util import Facing
+
+if typing.TYPE_CHECKING:
+    from mcpython.world.World import Chunk
+    from mcpython.world.blocks.AbstractBlock import AbstractBlock
+
+
+SECTION_SIZE = 16
+
+_SECTION_VOLUME = SECTION_SIZE**3
+
+# palette indices are stored as uint16, index 0 is always air
+_MAX_PALETTE_SIZE = 1 << 16
+
+_BOUNDARY_MASK = numpy.ones((SECTION_SIZE,) * 3, dtype=bool)
+_BOUNDARY_MASK[1:-1, 1:-1, 1:-1] = False
+_ALL_POSITIONS = list(numpy.ndindex((SECTION_SIZE,) * 3))
+_BOUNDARY_POSITIONS = list(zip(*map(numpy.ndarray.tolist, _BOUNDARY_MASK.nonzero())))
+
+# bit of each face in the solid face and occlusion masks
+FACE_BITS = {face: 1 << i for i, face in enumerate(Facing)}
+ALL_FACES = (1 << len(FACE_BITS)) - 1
+
+# height stored for columns without any block of the heightmap type
+NO_HEIGHT = -(1 << 15)
+
+
+class HeightmapType(enum.IntEnum):
+    # highest block with a solid upper face
+    SOLID = 0
+    # highest block entities collide with
+    MOTION_BLOCKING = 1
+    # highest block at all
+    NON_AIR = 2
+
+
+class PaletteEntry:
+    """
+    A block type together with one of its block states.
+
+    Entries are interned, so the same (type, state) pair is represented
+    by the same object in every section of every chunk.
+    """
+
+    _INTERNED: dict[tuple[type, tuple[tuple[str, str], ...]], PaletteEntry] = {}
+    _DEFAULTS: dict[type, PaletteEntry] = {}
+
+    @classmethod
+    def of(
+        cls, block_type: type[AbstractBlock], state: dict[str, str] = None
+    ) -> PaletteEntry:
+        """
+        Returns the entry for 'block_type' in the given block 'state',
+        or in the state a freshly created instance would have if 'state' is None
+        """
+        if state is None:
+            entry = cls._DEFAULTS.get(block_type)
+            if entry is None:
+                entry = cls._DEFAULTS[block_type] = cls.of(
+                    block_type, block_type(None).get_block_state()
+                )
+            return entry
+
+        key = block_type, tuple(sorted(state.items()))
+        entry = cls._INTERNED.get(key)
+        if entry is None:
+            entry = cls._INTERNED[key] = cls(*key)
+        return entry
+
+    @classmethod
+    def of_instance(cls, instance: AbstractBlock) -> PaletteEntry:
+        return cls.of(type(instance), instance.get_block_state())
+
+    def __init__(
+        self, block_type: type[AbstractBlock], state_key: tuple[tuple[str, str], ...]
+    ):
+        self.block_type = block_type
+        self.state_key = state_key
+        self.state = dict(state_key)
+        self.stateless = block_type.STATELESS
+        self._prototype: AbstractBlock | None = None
+        self._opaque: bool | None = None
+        self._heightmap_flags: int | None = None
+        self._solid_faces: int | None = None
+
+    def __repr__(self):
+        return f"PaletteEntry({self.block_type.NAME}, {self.state})"
+
+    @property
+    def prototype(self) -> AbstractBlock:
+        """
+        A position-less instance in this state, shared by all blocks using this entry.
+
+        For STATELESS block types this is the flyweight instance handed out for
+        every position, for all others only use it for read-only queries like
+        is_solid() or NAME
+        """
+        if self._prototype is None:
+            self._prototype = self.create_instance(None)
+        return self._prototype
+
+    @property
+    def opaque(self) -> bool:
+        """If blocks of this entry are solid on all six sides"""
+        if self._opaque is None:
+            prototype = self.prototype
+            self._opaque = all(prototype.is_solid(face) for face in Facing)
+        return self._opaque
+
+    @property
+    def solid_faces(self) -> int:
+        """Mask of FACE_BITS the blocks of this entry are solid on"""
+        if self._solid_faces is None:
+            prototype = self.prototype
+            self._solid_faces = sum(
+                bit for face, bit in FACE_BITS.items() if prototype.is_solid(face)
+            )
+        return self._solid_faces
+
+    @property
+    def heightmap_flags(self) -> int:
+        """Bit mask of the HeightmapType's blocks of this entry count for"""
+        if self._heightmap_flags is None:
+            flags = 1 << HeightmapType.NON_AIR
+            if not self.block_type.NO_COLLISION:
+                flags |= 1 << HeightmapType.MOTION_BLOCKING
+            if self.prototype.is_solid(Facing.UP):
+                flags |= 1 << HeightmapType.SOLID
+            self._heightmap_flags = flags
+        return self._heightmap_flags
+
+    def create_instance(self, position: tuple[int, int, int] | None) -> AbstractBlock:
+        instance = self.block_type(position)
+        if self.state:
+            instance.set_block_state(dict(self.state))
+        return instance
+
+
+class ChunkSection:
+    """
+    A 16x16x16 cube of blocks, stored as indices into a section-local palette.
+
+    Sections completely filled with one palette entry don't allocate the index
+    array at all ('uniform' is set instead), so deep stone layers cost O(1).
+    Completely empty sections are not stored by the chunk at all.
+
+    Block instances are only kept for positions which need one, see
+    ChunkBlockStorage for when this is the case.
+
+    'occlusion' holds, for every position, the FACE_BITS of the sides covered
+    by a neighbour, see compute_occlusion(). It is None until first needed.
+    """
+
+    @classmethod
+    def filled(cls, index: int, entry: PaletteEntry) -> ChunkSection:
+        section = cls(index)
+        section.get_palette_index(entry)
+        section.blocks = None
+        section.uniform = entry
+        section.block_count = _SECTION_VOLUME
+        return section
+
+    @classmethod
+    def from_data(
+        cls,
+        index: int,
+        palette: list[PaletteEntry | None],
+        blocks: numpy.ndarray | None,
+    ) -> ChunkSection:
+        """
+        Creates a section from a palette (with air at index 0) and its index array,
+        or an uniform section if 'blocks' is None
+        """
+        if blocks is None:
+            return cls.filled(index, palette[1])
+
+        section = cls(index)
+        section.palette = palette
+        section.palette_lookup = {
+            entry: i for i, entry in enumerate(palette) if entry is not None
+        }
+        section.random_ticks = any(
+            entry is not None and entry.block_type.RANDOM_TICKS for entry in palette
+        )
+        section.blocks = blocks
+        section.block_count = int(numpy.count_nonzero(blocks))
+        section.check_uniform()
+        return section
+
+    def __init__(self, index: int):
+        self.index = index
+        self.palette: list[PaletteEntry | None] = [None]
+        self.palette_lookup: dict[PaletteEntry, int] = {}
+        self.blocks: numpy.ndarray | None = numpy.zeros(
+            (SECTION_SIZE,) * 3, dtype=numpy.uint16
+        )
+        self.uniform: PaletteEntry | None = None
+        self.instances: dict[tuple[int, int, int], AbstractBlock] = {}
+        self.block_count = 0
+        # if any palette entry wants random ticks
+        self.random_ticks = False
+        self.occlusion: numpy.ndarray | None = None
+
+    def __repr__(self):
+        if self.uniform is not None:
+            return f"ChunkSection({self.index}, uniform {self.uniform})"
+        return f"ChunkSection({self.index}, {self.block_count} blocks, {len(self.palette)} palette entries)"
+
+    def snapshot(self) -> ChunkSection:
+        """
+        Returns a copy of the blocks and occlusion of this section which is not
+        changed by later edits, e.g. for reading it from another thread.
+        The copy has no block instances.
+        """
+        section = ChunkSection(self.index)
+        section.palette = self.palette.copy()
+        section.palette_lookup = self.palette_lookup.copy()
+        section.blocks = None if self.blocks is None else self.blocks.copy()
+        section.uniform = self.uniform
+        section.block_count = self.block_count
+        section.random_ticks = self.random_ticks
+        section.occlusion = None if self.occlusion is None else self.occlusion.copy()
+        return section
+
+    def is_opaque(self) -> bool:
+        """If the section is completely filled with blocks solid on all sides"""
+        return self.uniform is not None and self.uniform.opaque
+
+    def get(self, x: int, y: int, z: int) -> PaletteEntry | None:
+        if self.uniform is not None:
+            return self.uniform
+        return self.palette[self.blocks[x & 15, y & 15, z & 15]]
+
+    def set(self, x: int, y: int, z: int, entry: PaletteEntry | None):
+        if self.uniform is not None:
+            if entry is self.uniform:
+                return
+            self.blocks = numpy.ones((SECTION_SIZE,) * 3, dtype=numpy.uint16)
+            self.uniform = None
+
+        index = 0 if entry is None else self.get_palette_index(entry)
+        local = x & 15, y & 15, z & 15
+
+        if self.blocks[local] == 0:
+            if index != 0:
+                self.block_count += 1
+        elif index == 0:
+            self.block_count -= 1
+
+        self.blocks[local] = index
+
+        if self.block_count == _SECTION_VOLUME:
+            self.check_uniform()
+
+    def fill(self, region: tuple, entry: PaletteEntry | None):
+        """
+        Sets all positions selected by 'region', an index into the local
+        [x, y, z] block array (e.g. (x, slice(y0, y1), z)), to 'entry'
+        """
+        if self.uniform is not None:
+            if entry is self.uniform:
+                return
+            self.blocks = numpy.ones((SECTION_SIZE,) * 3, dtype=numpy.uint16)
+            self.uniform = None
+
+        index = 0 if entry is None else self.get_palette_index(entry)
+        target = self.blocks[region]
+        self.block_count += (target.size if index else 0) - int(
+            numpy.count_nonzero(target)
+        )
+        self.blocks[region] = index
+        self.check_uniform()
+
+    def check_uniform(self):
+        """Drops the index array if the section is filled with a single entry"""
+        if self.uniform is not None or self.block_count != _SECTION_VOLUME:
+            return
+
+        first = self.blocks[0, 0, 0]
+        if (self.blocks == first).all():
+            entry = self.palette[first]
+            self.palette = [None, entry]
+            self.palette_lookup = {entry: 1}
+            self.random_ticks = entry.block_type.RANDOM_TICKS
+            self.blocks = None
+            self.uniform = entry
+
+    def get_palette_index(self, entry: PaletteEntry) -> int:
+        index = self.palette_lookup.get(entry)
+        if index is not None:
+            return index
+
+        if len(self.palette) >= _MAX_PALETTE_SIZE:
+            self.compact_palette()
+
+        index = self.palette_lookup[entry] = len(self.palette)
+        self.palette.append(entry)
+        self.random_ticks |= entry.block_type.RANDOM_TICKS
+        return index
+
+    def compact_palette(self):
+        """Drops all palette entries no longer referenced by any block"""
+        if self.uniform is not None:
+            return
+
+        used, inverse = numpy.unique(self.blocks, return_inverse=True)
+        if used[0] != 0:
+            used = numpy.concatenate(([0], used))
+            inverse += 1
+
+        self.palette = [self.palette[i] for i in used]
+        self.palette_lookup = {
+            entry: i for i, entry in enumerate(self.palette) if entry is not None
+        }
+        self.random_ticks = any(
+            entry is not None and entry.block_type.RANDOM_TICKS
+            for entry in self.palette
+        )
+        self.blocks = inverse.reshape(self.blocks.shape).astype(numpy.uint16)
+
+    def get_index_array(self) -> numpy.ndarray:
+        """Returns the palette index array, also for uniform sections"""
+        if self.uniform is not None:
+            return numpy.ones((SECTION_SIZE,) * 3, dtype=numpy.uint16)
+        return self.blocks
+
+    def get_solid_faces(self) -> numpy.ndarray:
+        """Returns the PaletteEntry.solid_faces of every position"""
+        if self.uniform is not None:
+            return numpy.full(
+                (SECTION_SIZE,) * 3, self.uniform.solid_faces, dtype=numpy.uint8
+            )
+
+        faces = numpy.array(
+            [0 if entry is None else entry.solid_faces for entry in self.palette],
+            dtype=numpy.uint8,
+        )
+        return faces[self.blocks]
+
+    def get_heightmap_flags(self) -> numpy.ndarray:
+        """Returns PaletteEntry.heightmap_flags for each palette index"""
+        return numpy.array(
+            [0 if entry is None else entry.heightmap_flags for entry in self.palette],
+            dtype=numpy.uint8,
+        )
+
+    def local_positions(
+        self, boundary_only=False, exposed_only=False
+    ) -> list[tuple[int, int, int]]:
+        """
+        Returns the local positions of all blocks in this section,
+        or only of those on the outer layer of the section if 'boundary_only' is set,
+        or only of those not occluded on all sides if 'exposed_only' is set
+        (which requires 'occlusion' to be calculated)
+        """
+        if self.uniform is not None and not exposed_only:
+            return _BOUNDARY_POSITIONS if boundary_only else _ALL_POSITIONS
+
+        if self.uniform is not None:
+            mask = self.occlusion != ALL_FACES
+        else:
+            mask = self.blocks != 0
+            if exposed_only:
+                mask &= self.occlusion != ALL_FACES
+        if boundary_only:
+            mask &= _BOUNDARY_MASK
+        return list(zip(*map(numpy.ndarray.tolist, mask.nonzero())))
+
+
+class ChunkBlockStorage(collections.abc.Mapping):
+    """
+    Block storage of a chunk, split into 16x16x16 palette-compressed sections.
+
+    Works as a read-only mapping from global block positions to block instances,
+    so 'chunk.blocks.get(position)' keeps working. For STATELESS block types, the
+    one shared instance of the palette entry is returned. For all others, instances
+    are created the first time a position is looked up this way and kept from there
+    on, blocks which are never accessed only cost their palette index.
+
+    Use get_entry() and peek() for queries which should not create instances.
+    """
+
+    def __init__(self, chunk: Chunk):
+        self.chunk = chunk
+        self.sections: dict[int, ChunkSection] = {}
+
+    def __repr__(self):
+        return f"ChunkBlockStorage({len(self.sections)} sections, {len(self)} blocks)"
+
+    def get_section(self, y: int) -> ChunkSection | None:
+        return self.sections.get(y >> 4)
+
+    def get_or_create_section(self, y: int) -> ChunkSection:
+        section = self.sections.get(y >> 4)
+        if section is None:
+            section = self.sections[y >> 4] = ChunkSection(y >> 4)
+        return section
+
+    def get_entry(self, position: tuple[int, int, int]) -> PaletteEntry | None:
+        section = self.sections.get(position[1] >> 4)
+        if section is None:
+            return None
+        return section.get(*position)
+
+    def instance_at(self, position: tuple[int, int, int]) -> AbstractBlock | None:
+        """Returns the instance at 'position', if one was created"""
+        section = self.sections.get(position[1] >> 4)
+        if section is None:
+            return None
+        return section.instances.get(position)
+
+    def peek(self, position: tuple[int, int, int]) -> AbstractBlock | None:
+        """
+        Returns the instance at 'position' if one exists, or the shared prototype
+        of its palette entry otherwise. Never creates a new instance.
+        """
+        section = self.sections.get(position[1] >> 4)
+        if section is None:
+            return None
+
+        instance = section.instances.get(position)
+        if instance is not None:
+            return instance
+
+        entry = section.get(*position)
+        return None if entry is None else entry.prototype
+
+    def get(self, position: tuple[int, int, int], default=None) -> AbstractBlock | None:
+        section = self.sections.get(position[1] >> 4)
+        if section is None:
+            return default
+
+        instance = section.instances.get(position)
+        if instance is not None:
+            return instance
+
+        entry = section.get(*position)
+        if entry is None:
+            return default
+
+        if entry.stateless:
+            return entry.prototype
+
+        instance = section.instances[position] = entry.create_instance(position)
+        instance.chunk = self.chunk
+        return instance
+
+    def __getitem__(self, position: tuple[int, int, int]) -> AbstractBlock:
+        instance = self.get(position)
+        if instance is None:
+            raise KeyError(position)
+        return instance
+
+    def __contains__(self, position) -> bool:
+        return self.get_entry(position) is not None
+
+    def __len__(self) -> int:
+        return sum(section.block_count for section in self.sections.values())
+
+    def __iter__(self) -> typing.Iterator[tuple[int, int, int]]:
+        for section in list(self.sections.values()):
+            yield from self.iter_section(section)
+
+    def iter_section(
+        self, section: ChunkSection, boundary_only=False, exposed_only=False
+    ) -> typing.Iterator[tuple[int, int, int]]:
+        """Iterates over the global positions of the blocks in 'section'"""
+        dx, dz = self.chunk.position[0] * 16, self.chunk.position[1] * 16
+        dy = section.index * 16
+
+        for x, y, z in section.local_positions(boundary_only, exposed_only):
+            yield x + dx, y + dy, z + dz
+
+    def instances(self) -> typing.Iterator[AbstractBlock]:
+        """Iterates over all block instances created so far"""
+        for section in list(self.sections.values()):
+            yield from list(section.instances.values())
+
+    def set(
+        self,
+        position: tuple[int, int, int],
+        entry: PaletteEntry,
+        instance: AbstractBlock = None,
+    ):
+        """
+        Stores 'entry' at 'position', replacing whatever was there before.
+        'instance' is kept for the position if given.
+        """
+        section = self.get_or_create_section(position[1])
+        section.set(*position, entry)
+
+        if instance is not None:
+            section.instances[position] = instance
+            instance.chunk = self.chunk
+        else:
+            section.instances.pop(position, None)
+
+    def pop(
+        self, position: tuple[int, int, int]
+    ) -> tuple[PaletteEntry | None, AbstractBlock | None]:
+        """Removes the block at 'position', returning its entry and instance, if any"""
+        section = self.sections.get(position[1] >> 4)
+        if section is None:
+            return None, None
+
+        entry = section.get(*position)
+        if entry is None:
+            return None, None
+
+        section.set(*position, None)
+        instance = section.instances.pop(position, None)
+
+        if section.block_count == 0:
+            del self.sections[section.index]
+
+        return entry, instance
+
+    def refresh(self, instance: AbstractBlock):
+        """Updates the palette entry of 'instance' after its block state changed"""
+        section = self.sections.get(instance.position[1] >> 4)
+        if section is None or section.instances.get(instance.position) is not instance:
+            return
+
+        section.set(*instance.position, PaletteEntry.of_instance(instance))
+
+
+def compute_occlusion(
+    section: ChunkSection, neighbors: dict[Facing, ChunkSection | None]
+) -> numpy.ndarray:
+    """
+    Calculates the occlusion mask of 'section': the bit of a face is set for a
+    position if the block next to it in that direction is solid on the side
+    facing the position (face.opposite).
+    'neighbors' are the sections next to 'section' (None where there is none)
+    """
+    padded = numpy.zeros((SECTION_SIZE + 2,) * 3, dtype=numpy.uint8)
+    padded[1:-1, 1:-1, 1:-1] = section.get_solid_faces()
+
+    for face, other in neighbors.items():
+        if other is None:
+            continue
+
+        # copy the layer of 'other' touching 'section' into the padding
+        source = tuple(
+            slice(0, 1) if d == 1 else slice(-1, None) if d == -1 else slice(None)
+            for d in face.offset
+        )
+        target = tuple(
+            slice(-1, None) if d == 1 else slice(0, 1) if d == -1 else slice(1, -1)
+            for d in face.offset
+        )
+        padded[target] = other.get_solid_faces()[source]
+
+    occlusion = numpy.zeros((SECTION_SIZE,) * 3, dtype=numpy.uint8)
+    for face, bit in FACE_BITS.items():
+        dx, dy, dz = face.offset
+        neighbor = padded[
+            1 + dx : SECTION_SIZE + 1 + dx,
+            1 + dy : SECTION_SIZE + 1 + dy,
+            1 + dz : SECTION_SIZE + 1 + dz,
+        ]
+        occlusion[(neighbor & FACE_BITS[face.opposite]) != 0] |= bit
+    return occlusion
+
+
+class ChunkHeightmaps:
+    """
+    The highest block of each HeightmapType in each column of a chunk,
+    or NO_HEIGHT if there is none.
+
+    Kept up to date by the chunk when blocks are added or removed, so
+    surface queries don't need to scan the column. The heights are plain
+    lists, as single element access on numpy arrays is too slow for the
+    per-block updates.
+    """
+
+    def __init__(self, storage: ChunkBlockStorage):
+        self.storage = storage
+        # indexed [heightmap][(x & 15) << 4 | (z & 15)]
+        self.heights: list[list[int]] = [
+            [NO_HEIGHT] * SECTION_SIZE**2 for _ in HeightmapType
+        ]
+
+    def get(self, heightmap: HeightmapType, x: int, z: int) -> int | None:
+        """Returns the y of the highest block in the column, or None if it is empty"""
+        height = self.heights[heightmap][(x & 15) << 4 | (z & 15)]
+        return None if height == NO_HEIGHT else height
+
+    def update(self, position: tuple[int, int, int], entry: PaletteEntry | None):
+        """Updates the column of 'position' after the block there changed to 'entry'"""
+        x, y, z = position
+        column = (x & 15) << 4 | (z & 15)
+        flags = 0 if entry is None else entry.heightmap_flags
+
+        for heightmap in HeightmapType:
+            heights = self.heights[heightmap]
+            if flags & (1 << heightmap):
+                if y > heights[column]:
+                    heights[column] = y
+            elif y == heights[column]:
+                heights[column] = self.find_height(heightmap, x, y - 1, z)
+
+    def find_height(
+        self, heightmap: HeightmapType, x: int, start_y: int, z: int
+    ) -> int:
+        """Scans down the column from 'start_y' for the highest matching block"""
+        bit = 1 << heightmap
+
+        for index in sorted(self.storage.sections, reverse=True):
+            if index > start_y >> 4:
+                continue
+
+            section = self.storage.sections[index]
+            top = min(SECTION_SIZE - 1, start_y - index * SECTION_SIZE)
+
+            if section.uniform is not None:
+                if section.uniform.heightmap_flags & bit:
+                    return index * SECTION_SIZE + top
+                continue
+
+            column = section.get_heightmap_flags()[
+                section.blocks[x & 15, : top + 1, z & 15]
+            ]
+            hits = (column & bit).nonzero()[0]
+            if len(hits):
+                return index * SECTION_SIZE + int(hits[-1])
+
+        return NO_HEIGHT
+
+    def recalculate(self, x: slice = slice(None), z: slice = slice(None)):
+        """
+        Rebuilds the heightmaps from the block storage, only the columns in
+        the local ranges 'x' and 'z' if given
+        """
+        all_heights = self.get_array()
+        # a view, so the other columns are kept
+        heights = all_heights[:, x, z]
+        heights[:] = NO_HEIGHT
+
+        # higher sections overwrite the results of lower ones
+        for index in sorted(self.storage.sections):
+            section = self.storage.sections[index]
+
+            if section.uniform is not None:
+                flags = section.uniform.heightmap_flags
+                for heightmap in HeightmapType:
+                    if flags & (1 << heightmap):
+                        heights[heightmap] = index * SECTION_SIZE + SECTION_SIZE - 1
+                continue
+
+            flags = section.get_heightmap_flags()[section.blocks[x, :, z]]
+            for heightmap in HeightmapType:
+                mask = (flags & (1 << heightmap)) != 0
+                found = mask.any(axis=1)
+                top = SECTION_SIZE - 1 - numpy.argmax(mask[:, ::-1, :], axis=1)
+                heights[heightmap][found] = index * SECTION_SIZE + top[found]
+
+        self.set_array(all_heights)
+
+    def get_array(self) -> numpy.ndarray:
+        """Returns the heights as an int16 array indexed [heightmap, x & 15, z & 15]"""
+        return numpy.array(self.heights, dtype=numpy.int16).reshape(
+            (len(HeightmapType), SECTION_SIZE, SECTION_SIZE)
+        )
+
+    def set_array(self, heights: numpy.ndarray):
+        self.heights = heights.reshape((len(HeightmapType), -1)).tolist()
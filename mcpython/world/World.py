@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import concurrent.futures
 import itertools
 import random
 import sys
@@ -8,10 +9,16 @@ import traceback
 import typing
 from collections import deque
 
+import numpy
 import pyglet
 from pyglet.math import Vec3
 
-from mcpython.config import TICKS_PER_SEC
+from mcpython.config import MESH_WORKERS, TICKS_PER_SEC
+from mcpython.rendering.ChunkMesh import (
+    MeshData,
+    SectionSnapshot,
+    build_section_mesh,
+)
 from mcpython.rendering.util import (
     FACES,
 )
@@ -20,23 +27,44 @@ from mcpython.world.serialization.DataBuffer import (
     ReadBuffer,
     WriteBuffer,
 )
+from mcpython.world.serialization.DataFixer import AbstractDataFixer
 from mcpython.world.serialization.IBufferSerializable import (
     IBufferSerializableWithVersion,
 )
 from mcpython.world.serialization.WorldStorage import WorldStorage
-from mcpython.world.util import normalize, sectorize, Facing
+from mcpython.world.ChunkStorage import (
+    ALL_FACES,
+    FACE_BITS,
+    compute_occlusion,
+    ChunkBlockStorage,
+    ChunkHeightmaps,
+    ChunkSection,
+    HeightmapType,
+    PaletteEntry,
+    SECTION_SIZE,
+)
+from mcpython.world.util import normalize, sectorize
 from mcpython.world.blocks.AbstractBlock import (
     AbstractBlock,
     BLOCK_REGISTRY,
 )
 from mcpython.world.worldgen.WorldgenManager import (
-    generate_chunk,
+    TERRAIN_PALETTE,
+    ChunkStatus,
+    ChunkTerrain,
+    WorldgenService,
     generate_debug_world_chunk,
     setup_debug_world_registry,
 )
 
+# the ways to name a block for the bulk methods of Chunk, None being air
+BulkBlock = typing.Union[type[AbstractBlock], PaletteEntry, str, None]
+
 
 class Chunk(IBufferSerializableWithVersion):
+    VERSION = 2
+    DATA_FIXERS: dict[int, AbstractDataFixer] = {}
+
     @classmethod
     def decode(cls, buffer: ReadBuffer):
         raise RuntimeError("use decode_instance() instead")
@@ -44,10 +72,24 @@ class Chunk(IBufferSerializableWithVersion):
     def __init__(self, world: World, position: tuple[int, int]):
         self.world = world
         self.position = position
-        self.blocks: dict[tuple[int, int, int], AbstractBlock] = {}
+        self.blocks = ChunkBlockStorage(self)
+        self.heightmaps = ChunkHeightmaps(self.blocks)
+        # the loaded chunks next to this one, keyed by their (dx, dz) offset
+        self.neighbors: dict[tuple[int, int], Chunk] = {}
+        # vertex lists of the sections currently shown, by section index
+        self.section_meshes: dict[
+            int, list[pyglet.graphics.vertexdomain.VertexList]
+        ] = {}
+        # counts the mesh requests per section index, so meshes finished by
+        # the workers can tell if they are outdated
+        self.mesh_revisions: dict[int, int] = {}
         self.block_tick_list: list[AbstractBlock] = []
         self.entities: list[AbstractEntity] = []
         self.shown = False
+        self.status = ChunkStatus.EMPTY
+        # the generated terrain of this chunk, which it can be saved as
+        # difference to (see encode_delta())
+        self.terrain: ChunkTerrain | None = None
 
     def tick(self):
         for block in self.block_tick_list:
@@ -55,13 +97,20 @@ class Chunk(IBufferSerializableWithVersion):
 
         cx, cz = self.position
         for _ in range(3):
-            pos = (
-                random.randrange(cx * 16, cx * 16 + 16),
-                random.randrange(0, 256),
-                random.randrange(cz * 16, cz * 16 + 16),
-            )
-            if block := self.blocks.get(pos):
-                block.on_random_update()
+            x, z = random.randrange(16), random.randrange(16)
+            # only up to the highest block, the air above never ticks
+            height = self.heightmaps.get(HeightmapType.NON_AIR, x, z)
+            if height is None or height < 0:
+                continue
+
+            pos = cx * 16 + x, random.randrange(0, height + 1), cz * 16 + z
+            section = self.blocks.get_section(pos[1])
+            if section is None or not section.random_ticks:
+                continue
+
+            entry = section.get(*pos)
+            if entry is not None and entry.block_type.RANDOM_TICKS:
+                self.blocks[pos].on_random_update()
 
         for entity in self.entities:
             entity.tick()
@@ -76,34 +125,277 @@ class Chunk(IBufferSerializableWithVersion):
             raise RuntimeError("wrong chunk")
 
         buffer = self.decode_datafixable(buffer, self)
-        count = buffer.read_uint32()
-        dx, dz = sector[0] * 16, sector[1] * 16
-        for _ in range(count):
-            px = buffer.read_uint8()
-            py = buffer.read_uint16()
-            pz = buffer.read_uint8()
-            pos = px + dx, py, pz + dz
-            block = AbstractBlock.decode(buffer)
 
-            if block is not None:
-                block.position = pos
-                self.blocks[pos] = block
+        self._clear_blocks()
+        for _ in range(buffer.read_uint16()):
+            index = buffer.read_int8()
+            palette = self._decode_palette(buffer)
+
+            if buffer.read_uint8():
+                blocks = None
+            else:
+                blocks = numpy.frombuffer(
+                    buffer.read_bytes(2 * SECTION_SIZE**3), dtype=">u2"
+                )
+                blocks = blocks.astype(numpy.uint16).reshape((SECTION_SIZE,) * 3)
+
+            section = self.blocks.sections[index] = ChunkSection.from_data(
+                index, palette, blocks
+            )
+            for block in self._decode_instances(buffer, index):
+                section.instances[block.position] = block
+
+        if buffer.read_uint8():
+            heights = numpy.frombuffer(
+                buffer.read_bytes(2 * len(HeightmapType) * 16 * 16), dtype=">i2"
+            )
+            self.heightmaps.set_array(heights.astype(numpy.int16))
+        else:
+            self.heightmaps.recalculate()
+
+        self._finish_loading()
+
+    def decode_delta(self, buffer: ReadBuffer, terrain: ChunkTerrain):
+        """Loads the chunk from the differences to 'terrain' written by encode_delta()"""
+        sector = buffer.read_int32(), buffer.read_int32()
+        if sector != self.position or terrain.position != self.position:
+            raise RuntimeError("wrong chunk")
+
+        buffer = self.decode_datafixable(buffer, self)
+        terrain_palette = self._resolve_blocks(TERRAIN_PALETTE)
+
+        changes = {}
+        for _ in range(buffer.read_uint16()):
+            index = buffer.read_int8()
+            palette = self._decode_palette(buffer)
+            count = buffer.read_uint16()
+            positions = numpy.frombuffer(buffer.read_bytes(2 * count), dtype=">u2")
+            blocks = numpy.frombuffer(buffer.read_bytes(2 * count), dtype=">u2")
+            instances = self._decode_instances(buffer, index)
+            changes[index] = palette, positions, blocks, instances
+
+        self._clear_blocks()
+        # sections outside of the terrain (like above y 255) only exist as changes
+        for index in sorted(set(range(16)) | set(changes)):
+            palette = list(terrain_palette)
+            blocks = self._terrain_section(terrain, index)
+
+            instances = ()
+            if index in changes:
+                changed, positions, indices, instances = changes[index]
+                remap = [
+                    0 if entry is None else self._palette_index(palette, entry)
+                    for entry in changed
+                ]
+                blocks.reshape(-1)[positions] = numpy.asarray(remap, numpy.uint16)[
+                    indices
+                ]
+
+            if blocks.any():
+                section = self.blocks.sections[index] = ChunkSection.from_data(
+                    index, palette, blocks
+                )
+                section.compact_palette()
+                for block in instances:
+                    section.instances[block.position] = block
+
+        self.heightmaps.recalculate()
+        self.terrain = terrain
+        self._finish_loading()
 
-        for block in self.blocks.values():
+    def _clear_blocks(self):
+        """Forgets all blocks and their instances before loading the chunk"""
+        self.blocks.sections.clear()
+        self.block_tick_list.clear()
+
+    def _finish_loading(self):
+        self.world.invalidate_neighbor_occlusion(self)
+
+        self.status = ChunkStatus.FINALIZED
+
+        for block in self.blocks.instances():
             block.on_block_loaded()
+            if block.SHOULD_TICK:
+                self.block_tick_list.append(block)
+
+        # the meshes of the blocks loaded over are outdated, the ones of
+        # sections which are empty now are removed
+        if self.shown:
+            for index in sorted(set(self.blocks.sections) | set(self.section_meshes)):
+                self.world.show_section(self, index, immediate=False)
 
     def encode(self, buffer: WriteBuffer):
         buffer.write_int32(self.position[0])
         buffer.write_int32(self.position[1])
         self.encode_datafixable(buffer)
-        buffer.write_uint32(len(self.blocks))
-        dx, dz = self.position[0] * 16, self.position[1] * 16
-        for pos, instance in self.blocks.items():
-            buffer.write_uint8(pos[0] - dx)
-            buffer.write_int16(pos[1])
-            buffer.write_uint8(pos[2] - dz)
+
+        # empty sections are never stored, so everything in here has blocks
+        buffer.write_uint16(len(self.blocks.sections))
+        for index, section in self.blocks.sections.items():
+            buffer.write_int8(index)
+
+            # makes sure the palette has no holes left by removed blocks
+            section.compact_palette()
+            self._encode_palette(buffer, section.palette)
+
+            if section.uniform is not None:
+                buffer.write_uint8(1)
+            else:
+                buffer.write_uint8(0)
+                buffer.write_bytes(section.blocks.astype(">u2").tobytes())
+
+            self._encode_instances(buffer, section)
+
+        buffer.write_uint8(1)
+        buffer.write_bytes(self.heightmaps.get_array().astype(">i2").tobytes())
+
+    def encode_delta(self, buffer: WriteBuffer, terrain: ChunkTerrain) -> bool:
+        """
+        Writes only the blocks differing from the generated 'terrain' of this
+        chunk, and the block instances, see decode_delta().
+
+        Returns False and writes nothing if that is not smaller than encode()
+        (e.g. for chunks not generated from 'terrain' at all)
+        """
+        terrain_palette = self._resolve_blocks(TERRAIN_PALETTE)
+        lookup = {
+            entry: i for i, entry in enumerate(terrain_palette) if entry is not None
+        }
+
+        changes = []
+        changed_blocks = 0
+        for index in sorted(set(range(16)) | set(self.blocks.sections)):
+            section = self.blocks.sections.get(index)
+            base = self._terrain_section(terrain, index)
+            if section is None:
+                positions = numpy.flatnonzero(base)
+                if len(positions):
+                    changes.append((index, [None], positions, None, None))
+                changed_blocks += len(positions)
+                continue
+
+            section.compact_palette()
+            current = section.get_index_array()
+            # the terrain palette index of each entry, or one matching no index
+            remap = numpy.array(
+                [
+                    0 if entry is None else lookup.get(entry, len(terrain_palette))
+                    for entry in section.palette
+                ],
+                dtype=numpy.uint16,
+            )
+            positions = numpy.flatnonzero(remap[current] != base)
+            if len(positions) or section.instances:
+                changes.append((index, section.palette, positions, current, section))
+            changed_blocks += len(positions)
+
+        # the position and palette index of a block, vs. 2 bytes per block
+        # in each non-uniform section
+        full_size = (
+            2
+            * SECTION_SIZE**3
+            * sum(section.uniform is None for section in self.blocks.sections.values())
+        )
+        if 4 * changed_blocks >= full_size:
+            return False
+
+        buffer.write_int32(self.position[0])
+        buffer.write_int32(self.position[1])
+        self.encode_datafixable(buffer)
+
+        buffer.write_uint16(len(changes))
+        for index, palette, positions, current, section in changes:
+            buffer.write_int8(index)
+            self._encode_palette(buffer, palette)
+            buffer.write_uint16(len(positions))
+            buffer.write_bytes(positions.astype(">u2").tobytes())
+            blocks = (
+                numpy.zeros(len(positions), dtype=numpy.uint16)
+                if current is None
+                else current.reshape(-1)[positions]
+            )
+            buffer.write_bytes(blocks.astype(">u2").tobytes())
+
+            if section is None:
+                buffer.write_uint16(0)
+            else:
+                self._encode_instances(buffer, section)
+
+        return True
+
+    @staticmethod
+    def _terrain_section(terrain: ChunkTerrain, index: int) -> numpy.ndarray:
+        """The TERRAIN_PALETTE indices of section 'index' of 'terrain'"""
+        blocks = numpy.zeros((SECTION_SIZE,) * 3, dtype=numpy.uint16)
+        if index < 0:
+            return blocks
+        layers = terrain.blocks[:, index * 16 :][:, :16]
+        blocks[:, : layers.shape[1]] = layers
+        return blocks
+
+    @staticmethod
+    def _palette_index(palette: list[PaletteEntry | None], entry: PaletteEntry) -> int:
+        try:
+            return palette.index(entry)
+        except ValueError:
+            palette.append(entry)
+            return len(palette) - 1
+
+    @staticmethod
+    def _encode_palette(buffer: WriteBuffer, palette: list[PaletteEntry | None]):
+        """Writes 'palette' without the air at index 0"""
+        buffer.write_uint16(len(palette) - 1)
+        for entry in palette[1:]:
+            buffer.write_string(entry.block_type.NAME)
+            buffer.write_uint16(len(entry.state))
+            for key, value in entry.state.items():
+                buffer.write_string(key)
+                buffer.write_string(value)
+
+    @staticmethod
+    def _decode_palette(buffer: ReadBuffer) -> list[PaletteEntry | None]:
+        palette: list[PaletteEntry | None] = [None]
+        for _ in range(buffer.read_uint16()):
+            block_type = BLOCK_REGISTRY.lookup(
+                buffer.read_string(), raise_on_error=True
+            )
+            state = {
+                buffer.read_string(): buffer.read_string()
+                for _ in range(buffer.read_uint16())
+            }
+            palette.append(PaletteEntry.of(block_type, state))
+        return palette
+
+    @staticmethod
+    def _encode_instances(buffer: WriteBuffer, section: ChunkSection):
+        instances = [
+            instance
+            for instance in section.instances.values()
+            if instance.KEEP_INSTANCE
+        ]
+        buffer.write_uint16(len(instances))
+        for instance in instances:
+            x, y, z = instance.position
+            buffer.write_uint16(((x & 15) << 8) | ((y & 15) << 4) | (z & 15))
             instance.encode(buffer)
 
+    def _decode_instances(self, buffer: ReadBuffer, index: int) -> list[AbstractBlock]:
+        """Reads the block instances of section 'index'"""
+        dx, dz = self.position[0] * 16, self.position[1] * 16
+        blocks = []
+        for _ in range(buffer.read_uint16()):
+            local = buffer.read_uint16()
+            pos = (
+                (local >> 8) + dx,
+                ((local >> 4) & 15) + index * 16,
+                (local & 15) + dz,
+            )
+            block = AbstractBlock.decode(buffer)
+            block.position = pos
+            block.chunk = self
+            blocks.append(block)
+        return blocks
+
     def __repr__(self):
         return f"Chunk({self.position[0]}, {self.position[1]}, {len(self.blocks)} blocks, visible={self.shown})"
 
@@ -113,9 +405,8 @@ class Chunk(IBufferSerializableWithVersion):
 
         self.shown = True
 
-        for position, instance in self.blocks.items():
-            if not instance.shown and self.world.exposed(position):
-                self.world.show_block(instance, immediate)
+        for index in list(self.blocks.sections):
+            self.world.show_section(self, index, immediate)
 
     def hide(self, immediate=True, force=False):
         if not self.shown and not force:
@@ -123,9 +414,8 @@ class Chunk(IBufferSerializableWithVersion):
 
         self.shown = False
 
-        for position, instance in self.blocks.items():
-            if instance.shown:
-                self.world.hide_block(instance, immediate)
+        for index in list(self.section_meshes):
+            self.world.hide_section(self, index, immediate)
 
     def add_block(
         self,
@@ -145,6 +435,9 @@ class Chunk(IBufferSerializableWithVersion):
         immediate : bool
             Whether or not to draw the block immediately.
 
+        Returns the block instance (the shared one for STATELESS blocks),
+        or None if the block is only stored in the chunk palette for now
+        (see AbstractBlock.KEEP_INSTANCE)
         """
         if position in self.blocks:
             self.remove_block(position, immediate, block_update=block_update)
@@ -152,29 +445,41 @@ class Chunk(IBufferSerializableWithVersion):
         if isinstance(block_type, AbstractBlock):
             instance = block_type
             instance.position = position
+            entry = PaletteEntry.of_instance(instance)
 
-        elif isinstance(block_type, str):
-            block_type = BLOCK_REGISTRY.lookup(block_type, raise_on_error=True)
-            instance = block_type(position)
+            if instance.STATELESS:
+                instance = entry.prototype
 
         else:
-            instance = block_type(position)
+            if isinstance(block_type, str):
+                block_type = BLOCK_REGISTRY.lookup(block_type, raise_on_error=True)
+
+            entry = PaletteEntry.of(block_type)
+            if block_type.STATELESS:
+                instance = entry.prototype
+            elif block_type.KEEP_INSTANCE:
+                instance = block_type(position)
+            else:
+                instance = None
 
-        self.blocks[position] = instance
-        instance.chunk = self
+        self.blocks.set(position, entry, None if entry.stateless else instance)
+        self.heightmaps.update(position, entry)
+        self.world.update_occlusion(self, position, entry)
 
-        instance.on_block_added()
+        if instance is not None:
+            instance.on_block_added()
 
+        self.world.mark_block_dirty(self, position)
         if immediate:
-            if self.shown and self.world.exposed(position):
-                self.world.show_block(instance)
-            self.world.check_neighbors(position)
+            self.world.rebuild_dirty_sections()
 
         if block_update:
-            instance.on_block_updated()
+            if entry.block_type.BLOCK_UPDATES:
+                instance = self.blocks[position]
+                instance.on_block_updated()
             self.world.send_block_update(position)
 
-        if instance.SHOULD_TICK:
+        if instance is not None and instance.SHOULD_TICK:
             self.block_tick_list.append(instance)
 
         return instance
@@ -198,17 +503,23 @@ class Chunk(IBufferSerializableWithVersion):
         if isinstance(position, AbstractBlock):
             position = position.position
 
-        if position not in self.blocks:
+        entry, instance = self.blocks.pop(position)
+        if entry is None:
             return
 
-        instance = self.blocks[position]
-        del self.blocks[position]
+        self.heightmaps.update(position, None)
+        self.world.update_occlusion(self, position, None)
 
-        if immediate:
-            if instance.shown:
-                self.world.hide_block(instance)
+        if instance is None:
+            if entry.stateless:
+                instance = entry.prototype
+            else:
+                instance = entry.create_instance(position)
+                instance.chunk = self
 
-            self.world.check_neighbors(position)
+        self.world.mark_block_dirty(self, position)
+        if immediate:
+            self.world.rebuild_dirty_sections()
 
         instance.on_block_removed()
         if block_update:
@@ -225,27 +536,398 @@ class Chunk(IBufferSerializableWithVersion):
 
         return instance
 
+    def set_section_array(
+        self,
+        palette: typing.Sequence[BulkBlock],
+        blocks: numpy.ndarray,
+        index: int = 0,
+        immediate=False,
+    ):
+        """Replaces whole sections at once, e.g. for world generation.
+
+        Parameters
+        ----------
+        palette :
+            The blocks 'blocks' refers to, as block types, their names or palette
+            entries. None (and so index 0) is air. Names are looked up once per call.
+        blocks : numpy.ndarray
+            Palette indices of the blocks, indexed by local [x, y, z], from the
+            bottom of section `index` upwards. Every section it reaches into is
+            replaced completely, missing layers of the topmost are air.
+        index : int
+            The index of the lowest section to replace
+        immediate : bool
+            Whether or not to rebuild the meshes of the sections immediately.
+
+        No per-block hooks are called. Blocks which keep an instance (see
+        AbstractBlock.KEEP_INSTANCE) get on_block_loaded() instead, like blocks
+        loaded from disk.
+        """
+        # one palette entry per distinct block, air is always at index 0
+        section_palette: list[PaletteEntry | None] = [None]
+        lookup: dict[PaletteEntry, int] = {}
+        remap = []
+        for block in self._resolve_blocks(palette):
+            if block is not None and block not in lookup:
+                lookup[block] = len(section_palette)
+                section_palette.append(block)
+            remap.append(0 if block is None else lookup[block])
+        blocks = numpy.asarray(remap, dtype=numpy.uint16)[blocks]
+
+        indices = range(index, index + (blocks.shape[1] + 15) // 16)
+        touched = {}
+        for index in indices:
+            section_blocks = numpy.zeros((SECTION_SIZE,) * 3, dtype=numpy.uint16)
+            layers = blocks[:, (index - indices.start) * 16 :][:, :16]
+            section_blocks[:, : layers.shape[1]] = layers
+
+            old = self.blocks.sections.pop(index, None)
+            if old is not None:
+                self._drop_instances(old.instances.values())
+
+            if section_blocks.any():
+                section = ChunkSection.from_data(
+                    index, section_palette.copy(), section_blocks
+                )
+                section.compact_palette()
+                self.blocks.sections[index] = section
+            # the whole section is replaced
+            touched[index] = (0, 0, 0), (SECTION_SIZE - 1,) * 3
+
+        self._finish_bulk_edit(touched, immediate)
+
+    def fill_column(
+        self,
+        x: int,
+        z: int,
+        fills: typing.Iterable[tuple[int, int, BulkBlock]],
+        immediate=False,
+    ):
+        """Sets ranges of blocks in the column (x, z) at once, e.g. for
+        world generation.
+
+        Parameters
+        ----------
+        x, z : int
+            The column, in block coordinates
+        fills :
+            (y0, y1, block) tuples, applied in order, setting y0 <= y < y1
+            to 'block' (a block type, its name, a palette entry or None for air)
+        immediate : bool
+            Whether or not to rebuild the meshes of the sections immediately.
+
+        Like set_section_array(), no per-block hooks are called.
+        """
+        entries: dict[BulkBlock, PaletteEntry | None] = {}
+        touched = {}
+
+        for y0, y1, block in fills:
+            if block not in entries:
+                entries[block] = self._resolve_blocks((block,))[0]
+            entry = entries[block]
+
+            for index in range(y0 >> 4, ((y1 - 1) >> 4) + 1):
+                if entry is None:
+                    section = self.blocks.sections.get(index)
+                    if section is None:
+                        continue
+                else:
+                    section = self.blocks.get_or_create_section(index * 16)
+
+                low = max(y0, index * 16)
+                high = min(y1, index * 16 + 16)
+                self._drop_instances(
+                    [
+                        section.instances.pop(position)
+                        for position in list(section.instances)
+                        if position[0] == x
+                        and position[2] == z
+                        and low <= position[1] < high
+                    ]
+                )
+                section.fill(
+                    (x & 15, slice(low - index * 16, high - index * 16), z & 15), entry
+                )
+
+                if section.block_count == 0:
+                    del self.blocks.sections[index]
+                self._extend_bounds(
+                    touched,
+                    index,
+                    x & 15,
+                    (low - index * 16, high - 1 - index * 16),
+                    z & 15,
+                )
+
+        self._finish_bulk_edit(touched, immediate)
+
+    def set_blocks(
+        self,
+        positions: numpy.ndarray,
+        palette: typing.Sequence[BulkBlock],
+        blocks: numpy.ndarray,
+        replace: numpy.ndarray = None,
+        immediate=False,
+    ):
+        """Sets scattered blocks at once, e.g. for placing structures.
+
+        Parameters
+        ----------
+        positions : numpy.ndarray
+            (n, 3) block positions in this chunk, each at most once
+        palette :
+            The blocks 'blocks' refers to, like for set_section_array()
+        blocks : numpy.ndarray
+            The palette index of the block for each position
+        replace : numpy.ndarray
+            Per position if the block replaces solid blocks, where False it is
+            only placed where no solid block is. All are replaced if None.
+        immediate : bool
+            Whether or not to rebuild the meshes of the sections immediately.
+
+        Like set_section_array(), no per-block hooks are called.
+        """
+        entries = self._resolve_blocks(palette)
+        dx, dz = self.position[0] * 16, self.position[1] * 16
+        sections = positions[:, 1] >> 4
+        touched = {}
+
+        for index in numpy.unique(sections).tolist():
+            selected = sections == index
+            section_positions = positions[selected]
+            section_blocks = blocks[selected]
+            x = section_positions[:, 0] - dx
+            y = section_positions[:, 1] - index * 16
+            z = section_positions[:, 2] - dz
+
+            section = self.blocks.sections.get(index)
+            if section is not None and replace is not None:
+                free = replace[selected] | (section.get_solid_faces()[x, y, z] == 0)
+                section_positions, section_blocks = (
+                    section_positions[free],
+                    section_blocks[free],
+                )
+                x, y, z = x[free], y[free], z[free]
+                if not free.any():
+                    continue
+
+            if section is None:
+                if all(entries[i] is None for i in numpy.unique(section_blocks)):
+                    continue
+                section = self.blocks.get_or_create_section(index * 16)
+            elif section.instances:
+                self._drop_instances(
+                    [
+                        section.instances.pop(position)
+                        for position in map(tuple, section_positions.tolist())
+                        if position in section.instances
+                    ]
+                )
+
+            for i in numpy.unique(section_blocks).tolist():
+                block = section_blocks == i
+                section.fill((x[block], y[block], z[block]), entries[i])
+
+            if section.block_count == 0:
+                del self.blocks.sections[index]
+            self._extend_bounds(touched, index, x, y, z)
+
+        self._finish_bulk_edit(touched, immediate)
+
+    def _resolve_blocks(
+        self, blocks: typing.Iterable[BulkBlock]
+    ) -> list[PaletteEntry | None]:
+        """Returns the palette entries of the blocks passed to the bulk methods"""
+        entries = []
+        for block in blocks:
+            if isinstance(block, str):
+                block = BLOCK_REGISTRY.lookup(block, raise_on_error=True)
+            if block is not None and not isinstance(block, PaletteEntry):
+                block = PaletteEntry.of(block)
+            entries.append(block)
+        return entries
+
+    def _drop_instances(self, instances: typing.Iterable[AbstractBlock]):
+        """Forgets block instances overwritten by the bulk methods"""
+        ticking = {id(instance) for instance in instances if instance.SHOULD_TICK}
+        if ticking:
+            self.block_tick_list = [
+                block for block in self.block_tick_list if id(block) not in ticking
+            ]
+
+    @staticmethod
+    def _extend_bounds(
+        touched: dict[int, tuple[tuple[int, int, int], tuple[int, int, int]]],
+        index: int,
+        x,
+        y,
+        z,
+    ):
+        """Extends the (lowest, highest) local corners of the blocks written
+        to section 'index' by the local coordinates (or arrays of them) x, y, z
+
+        """
+        low = int(numpy.min(x)), int(numpy.min(y)), int(numpy.min(z))
+        high = int(numpy.max(x)), int(numpy.max(y)), int(numpy.max(z))
+        if index in touched:
+            old_low, old_high = touched[index]
+            low = tuple(map(min, low, old_low))
+            high = tuple(map(max, high, old_high))
+        touched[index] = low, high
+
+    def _finish_bulk_edit(
+        self,
+        touched: dict[int, tuple[tuple[int, int, int], tuple[int, int, int]]],
+        immediate: bool,
+    ):
+        """Updates everything depending on the blocks written by the bulk
+        methods, 'touched' maps the section indices to the (lowest, highest)
+        local corners of the written blocks (see _extend_bounds()).
+
+        Only the sections the written blocks border on are remeshed: the ones
+        above and below if a written block is in the bottom or top layer, and
+        the ones in the chunks around if it is at that side of the chunk.
+        """
+        if not touched:
+            return
+
+        dx, dz = self.position[0] * 16, self.position[1] * 16
+        changed = set()
+        neighbor_changed: dict[tuple[int, int], set[int]] = {}
+
+        for index, (low, high) in touched.items():
+            changed.add(index)
+            if low[1] == 0:
+                changed.add(index - 1)
+            if high[1] == SECTION_SIZE - 1:
+                changed.add(index + 1)
+            for offset, at_border in (
+                ((-1, 0), low[0] == 0),
+                ((1, 0), high[0] == SECTION_SIZE - 1),
+                ((0, -1), low[2] == 0),
+                ((0, 1), high[2] == SECTION_SIZE - 1),
+            ):
+                if at_border:
+                    neighbor_changed.setdefault(offset, set()).add(index)
+
+            section = self.blocks.sections.get(index)
+            if section is None:
+                continue
+
+            # the deferred on_block_loaded() of the new blocks keeping an instance
+            for i, entry in enumerate(section.palette):
+                if entry is None or not entry.block_type.KEEP_INSTANCE:
+                    continue
+
+                for x, y, z in zip(*(section.get_index_array() == i).nonzero()):
+                    position = int(x) + dx, int(y) + index * 16, int(z) + dz
+                    if position in section.instances:
+                        continue
+
+                    instance = self.blocks.get(position)
+                    instance.on_block_loaded()
+                    if instance.SHOULD_TICK:
+                        self.block_tick_list.append(instance)
+
+        # only the columns written to
+        self.heightmaps.recalculate(
+            slice(
+                min(low[0] for low, _ in touched.values()),
+                max(high[0] for _, high in touched.values()) + 1,
+            ),
+            slice(
+                min(low[2] for low, _ in touched.values()),
+                max(high[2] for _, high in touched.values()) + 1,
+            ),
+        )
+
+        for index in sorted(changed):
+            section = self.blocks.sections.get(index)
+            if section is not None:
+                section.occlusion = None
+            if self.shown and (section is not None or index in self.section_meshes):
+                self.world.show_section(self, index, immediate)
+
+        for offset, indices in neighbor_changed.items():
+            neighbor = self.neighbors.get(offset)
+            if neighbor is None:
+                continue
+
+            for index in sorted(indices):
+                section = neighbor.blocks.sections.get(index)
+                if section is None:
+                    continue
+                section.occlusion = None
+                if neighbor.shown:
+                    self.world.show_section(neighbor, index, immediate)
+
+
+class ChunkHeightmapDataFixer(AbstractDataFixer):
+    """Version 1 chunks have no heightmaps stored, they are recalculated when loading"""
+
+    def apply(
+        self, read_buffer: ReadBuffer, write_buffer: WriteBuffer, context=None
+    ) -> int:
+        write_buffer.write_bytes(read_buffer.read_remaining())
+        write_buffer.write_uint8(0)
+        return 2
+
+
+ChunkHeightmapDataFixer.register(Chunk, 1)
+
 
 class World:
     INSTANCE: World = None
 
-    def __init__(self, window):
+    def __init__(self, window, seed: int = None, debug_world=True):
+        """
+        :param seed: the world seed, random if None
+        :param debug_world: if the debug world is placed and shown, False
+            starts without any chunks (e.g. for generating them ahead of time)
+        """
         World.INSTANCE = self
         self.window = window
 
-        self.storage = WorldStorage()
+        self.storage = WorldStorage(seed)
 
         # A Batch is a collection of vertex lists for batched rendering.
         self.batch = pyglet.graphics.Batch()
         self.alpha_batch = pyglet.graphics.Batch()
 
         self.chunks: dict[tuple[int, int], Chunk] = {}
+        # the chunk of the last peek_chunk() call
+        self._last_chunk: Chunk | None = None
 
         # Simple function queue implementation. The queue is populated with
-        # _show_block() and _hide_block() calls
+        # _show_section(), _submit_section() and _hide_section() calls
         self.queue = deque()
+        # sections of shown chunks whose mesh is outdated, rebuilt
+        # before anything else in the queue
+        self.dirty_sections: dict[tuple[Chunk, int], None] = {}
+
+        # builds section meshes from snapshots in the background, only
+        # the upload of the finished meshes happens in process_queue()
+        self.mesh_executor = (
+            concurrent.futures.ThreadPoolExecutor(
+                MESH_WORKERS, thread_name_prefix="mesher"
+            )
+            if MESH_WORKERS > 0
+            else None
+        )
+        # (chunk, index, revision, future) of the meshes being built
+        self.pending_meshes: deque[
+            tuple[Chunk, int, int, concurrent.futures.Future]
+        ] = deque()
+        self.worldgen = WorldgenService(self)
+
+        if debug_world:
+            self._initialize()
 
-        self._initialize()
+    def close(self):
+        """Stops the worldgen and mesh workers, called when the game exits"""
+        self.worldgen.shutdown()
+        if self.mesh_executor is not None:
+            self.mesh_executor.shutdown(cancel_futures=True)
 
     def tick(self):
         for chunk in self.chunks.values():
@@ -258,18 +940,73 @@ class World:
     def get_or_create_chunk_by_position(
         self, position: tuple[int, int, int] | tuple[int, int] | Vec3
     ) -> Chunk:
-        c = position[0] // 16, position[-1] // 16
+        c = int(position[0] // 16), int(position[-1] // 16)
         chunk = self.chunks.get(c)
         if chunk is None:
-            chunk = self.chunks[c] = Chunk(self, c)
+            chunk = self._create_chunk(c)
         return chunk
 
     def get_or_create_chunk_by_coord(self, coord: tuple[int, int]):
         chunk = self.chunks.get(coord)
         if chunk is None:
-            chunk = self.chunks[coord] = Chunk(self, coord)
+            chunk = self._create_chunk(coord)
+        return chunk
+
+    def peek_chunk(self, position: tuple[int, int, int]) -> Chunk | None:
+        """Returns the chunk containing the block `position`, or None if it is
+        not loaded. Unlike get_or_create_chunk_by_position(), this never
+        creates a chunk.
+
+        """
+        coord = position[0] >> 4, position[2] >> 4
+        chunk = self._last_chunk
+        if chunk is not None and chunk.position == coord:
+            return chunk
+
+        chunk = self.chunks.get(coord)
+        if chunk is not None:
+            self._last_chunk = chunk
+        return chunk
+
+    def get_block(self, x: int, y: int, z: int) -> AbstractBlock | None:
+        """Returns the block at the given position for read-only queries, or
+        None if there is none or its chunk is not loaded. Neither chunks nor
+        block instances are created by this, so for blocks without an instance
+        the shared one of their block state is returned (see ChunkBlockStorage.peek()).
+
+        """
+        chunk = self.peek_chunk((x, y, z))
+        if chunk is None:
+            return None
+        return chunk.blocks.peek((x, y, z))
+
+    def _create_chunk(self, coord: tuple[int, int]) -> Chunk:
+        chunk = self.chunks[coord] = Chunk(self, coord)
+
+        cx, cz = coord
+        for dx, dz in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            neighbor = self.chunks.get((cx + dx, cz + dz))
+            if neighbor is not None:
+                chunk.neighbors[dx, dz] = neighbor
+                neighbor.neighbors[-dx, -dz] = chunk
+
         return chunk
 
+    def unload_chunk(self, chunk: Chunk):
+        """Hides 'chunk' and removes it from the world"""
+        chunk.hide(force=True)
+        self.invalidate_neighbor_occlusion(chunk)
+
+        del self.chunks[chunk.position]
+        for (dx, dz), neighbor in chunk.neighbors.items():
+            del neighbor.neighbors[-dx, -dz]
+        chunk.neighbors.clear()
+
+        if self._last_chunk is chunk:
+            self._last_chunk = None
+
+        self.worldgen.writer.on_chunk_unloaded(chunk.position)
+
     def _initialize(self):
         """Initialize the world by placing all the blocks."""
 
@@ -283,7 +1020,8 @@ class World:
             generate_debug_world_chunk(self.get_or_create_chunk_by_coord((cx, cz)))
 
         # for cx, cz in itertools.product(range(-3, 4), range(-3, 4)):
-        #     generate_chunk(self.get_or_create_chunk_by_coord((cx, cz)))
+        #     self.worldgen.request(self.get_or_create_chunk_by_coord((cx, cz)))
+        # self.worldgen.wait()
 
         self.ensure_chunks_shown()
 
@@ -292,13 +1030,109 @@ class World:
         blocks, True otherwise.
 
         """
-        for face in Facing:
-            pos = face.position_offset(position)
-            block = self.get_or_create_chunk_by_position(pos).blocks.get(pos)
-            if not block or not block.is_solid(face):
-                return True
+        chunk = self.peek_chunk(position)
+        if chunk is None:
+            return True
+
+        section = chunk.blocks.get_section(position[1])
+        if section is None:
+            return True
+
+        occlusion = self.get_occlusion(chunk, section)
+        return (
+            occlusion[position[0] & 15, position[1] & 15, position[2] & 15] != ALL_FACES
+        )
+
+    def get_occlusion(self, chunk: Chunk, section: ChunkSection):
+        """Returns the occlusion mask of 'section', calculating it if needed"""
+        if section.occlusion is None:
+            neighbors = {}
+            for face in FACE_BITS:
+                dx, dy, dz = face.offset
+                other = chunk if dx == dz == 0 else chunk.neighbors.get((dx, dz))
+                neighbors[face] = (
+                    None
+                    if other is None
+                    else other.blocks.sections.get(section.index + dy)
+                )
+
+            section.occlusion = compute_occlusion(section, neighbors)
+        return section.occlusion
+
+    def update_occlusion(
+        self, chunk: Chunk, position: tuple[int, int, int], entry: PaletteEntry | None
+    ):
+        """Updates the occlusion masks around 'position' after the block there
+        changed to 'entry'.
+
+        """
+        x, y, z = position
+        section = chunk.blocks.sections.get(y >> 4)
+        # if the neighbours inside the section need to be updated
+        update_inner = section is not None and section.occlusion is not None
+        lx, ly, lz = x & 15, y & 15, z & 15
+        if not update_inner and 0 < lx < 15 and 0 < ly < 15 and 0 < lz < 15:
+            return
+
+        solid = 0 if entry is None else entry.solid_faces
+        for face in FACE_BITS:
+            dx, dy, dz = face.offset
+            if 0 <= lx + dx < 16 and 0 <= ly + dy < 16 and 0 <= lz + dz < 16:
+                if not update_inner:
+                    continue
+                other = section
+            elif dy:
+                other = chunk.blocks.sections.get((y + dy) >> 4)
+            else:
+                neighbor = chunk.neighbors.get((dx, dz))
+                if neighbor is None:
+                    continue
+                other = neighbor.blocks.sections.get(y >> 4)
+
+            if other is None or other.occlusion is None:
+                continue
+
+            # the neighbour sees this block in the opposite direction,
+            # covered by the side of this block facing it
+            opposite = FACE_BITS[face.opposite]
+            local = (x + dx) & 15, (y + dy) & 15, (z + dz) & 15
+            if solid & FACE_BITS[face]:
+                other.occlusion[local] |= opposite
+            else:
+                other.occlusion[local] &= ALL_FACES ^ opposite
 
-        return False
+    def invalidate_neighbor_occlusion(self, chunk: Chunk):
+        """Drops the occlusion masks of the chunks next to 'chunk', after its
+        blocks were replaced without going through add_block()
+
+        """
+        for neighbor in chunk.neighbors.values():
+            for section in neighbor.blocks.sections.values():
+                section.occlusion = None
+
+    def is_section_enclosed(self, chunk: Chunk, section: ChunkSection) -> bool:
+        """Returns True if 'section' and all six sections around it are opaque,
+        so no block in it can be visible.
+
+        """
+        if not section.is_opaque():
+            return False
+
+        for index in (section.index - 1, section.index + 1):
+            other = chunk.blocks.sections.get(index)
+            if other is None or not other.is_opaque():
+                return False
+
+        for offset in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            neighbor = chunk.neighbors.get(offset)
+            if neighbor is None:
+                return False
+
+            other = neighbor.blocks.sections.get(section.index)
+            if other is None or not other.is_opaque():
+                return False
+
+        return True
 
     def add_block(
         self,
@@ -306,7 +1140,7 @@ class World:
         block_type: type[AbstractBlock] | AbstractBlock | str,
         immediate=True,
         block_update=True,
-    ) -> AbstractBlock:
+    ) -> AbstractBlock | None:
         """Add a block with the given `texture` and `position` to the world.
 
         Parameters
@@ -318,6 +1152,9 @@ class World:
         immediate : bool
             Whether or not to draw the block immediately.
 
+        Returns the block instance (the shared one for STATELESS blocks),
+        or None if the block is only stored in the chunk palette for now
+        (see AbstractBlock.KEEP_INSTANCE)
         """
         chunk = self.get_or_create_chunk_by_position(position)
         return chunk.add_block(
@@ -342,110 +1179,208 @@ class World:
         immediate : bool
             Whether or not to immediately remove block from canvas.
 
+        Returns the removed block, or None if there is none or its chunk
+        is not loaded
         """
         if isinstance(position, AbstractBlock):
             position = position.position
-        chunk = self.get_or_create_chunk_by_position(position)
+        chunk = self.peek_chunk(position)
+        if chunk is None:
+            return None
         return chunk.remove_block(
             position, immediate=immediate, block_update=block_update
         )
 
-    def check_neighbors(self, position: tuple[int, int, int]):
-        """Check all blocks surrounding `position` and ensure their visual
-        state is current. This means hiding blocks that are not exposed and
-        ensuring that all exposed blocks are shown. Usually used after a block
-        is added or removed.
+    def mark_block_dirty(self, chunk: Chunk, position: tuple[int, int, int]):
+        """Marks the meshes which may change when the block at `position`
+        changes as dirty: the one of its section, and the ones of neighbouring
+        sections if the block is on the border of its section.
 
         """
         x, y, z = position
-        for dx, dy, dz in FACES:
-            key = (x + dx, y + dy, z + dz)
-            chunk = self.get_or_create_chunk_by_position(key)
-            if key not in chunk.blocks:
+        index = y >> 4
+        self.mark_section_dirty(chunk, index)
+
+        if y & 15 == 0:
+            self.mark_section_dirty(chunk, index - 1)
+        elif y & 15 == 15:
+            self.mark_section_dirty(chunk, index + 1)
+
+        for local, offset in ((x & 15, (1, 0)), (z & 15, (0, 1))):
+            if local == 0:
+                offset = -offset[0], -offset[1]
+            elif local != 15:
                 continue
-            instance = chunk.blocks[key]
-            if self.exposed(key):
-                if not instance.shown:
-                    self.show_block(instance)
-            else:
-                if instance.shown:
-                    self.hide_block(instance)
+
+            neighbor = chunk.neighbors.get(offset)
+            if neighbor is not None:
+                self.mark_section_dirty(neighbor, index)
+
+    def mark_section_dirty(self, chunk: Chunk, index: int):
+        if chunk.shown:
+            self.dirty_sections[chunk, index] = None
+
+    def rebuild_dirty_sections(self):
+        while self.dirty_sections:
+            chunk, index = next(iter(self.dirty_sections))
+            del self.dirty_sections[chunk, index]
+            self._show_section(chunk, index)
 
     def send_block_update(self, position: tuple[int, int, int]):
         x, y, z = position
         for dx, dy, dz in FACES:
             key = (x + dx, y + dy, z + dz)
-            chunk = self.get_or_create_chunk_by_position(key)
-            if key not in chunk.blocks:
+            chunk = self.peek_chunk(key)
+            if chunk is None:
                 continue
-            instance = chunk.blocks[key]
-            instance.on_block_updated()
+            entry = chunk.blocks.get_entry(key)
+            if entry is None or not entry.block_type.BLOCK_UPDATES:
+                continue
+            chunk.blocks[key].on_block_updated()
 
-    def show_block(self, instance: AbstractBlock, immediate=True):
-        """Show the block at the given `position`. This method assumes the
-        block has already been added with add_block()
+    def show_section(self, chunk: Chunk, index: int, immediate=True):
+        """(Re-)build the mesh of the section `index` of `chunk`.
 
         Parameters
         ----------
-        position : tuple of len 3
-            The (x, y, z) position of the block to show.
+        chunk:
+            The chunk the section is in
+        index : int
+            The y index of the section
         immediate : bool
-            Whether or not to show the block immediately.
+            Whether or not to build the mesh immediately. If not, the mesh
+            is built by the mesh workers if there are any.
 
         """
-        instance.shown = True
         if immediate:
-            self._show_block(instance)
+            self._show_section(chunk, index)
+        elif self.mesh_executor is not None:
+            self._enqueue(self._submit_section, chunk, index)
         else:
-            self._enqueue(self._show_block, instance)
+            self._enqueue(self._show_section, chunk, index)
+
+    def _prepare_section(self, chunk: Chunk, index: int) -> ChunkSection | None:
+        """Invalidates the meshes of the section in the making and returns
+        the section if a new mesh is needed for it.
+
+        """
+        chunk.mesh_revisions[index] = chunk.mesh_revisions.get(index, 0) + 1
+
+        if not chunk.shown:
+            # hidden again before we came around to show it
+            return
+
+        section = chunk.blocks.sections.get(index)
+        if section is None or self.is_section_enclosed(chunk, section):
+            vertex_lists = chunk.section_meshes.pop(index, None)
+            if vertex_lists is not None:
+                self._hide_section(vertex_lists)
+            return
 
-    def _show_block(self, instance: AbstractBlock):
-        """Private implementation of the `show_block()` method.
+        return section
+
+    def _show_section(self, chunk: Chunk, index: int):
+        """Private implementation of the `show_section()` method."""
+        section = self._prepare_section(chunk, index)
+        if section is not None:
+            self._upload_section(
+                chunk, index, build_section_mesh(SectionSnapshot(chunk, section))
+            )
+
+    def _submit_section(self, chunk: Chunk, index: int):
+        """Hands the mesh building for a section to the mesh workers"""
+        section = self._prepare_section(chunk, index)
+        if section is None:
+            return
+
+        future = self.mesh_executor.submit(
+            build_section_mesh, SectionSnapshot(chunk, section)
+        )
+        self.pending_meshes.append((chunk, index, chunk.mesh_revisions[index], future))
+
+    def _upload_section(
+        self, chunk: Chunk, index: int, meshes: tuple[MeshData, MeshData]
+    ):
+        """Replaces the vertex lists of a section by the ones of 'meshes'"""
+        vertex_lists = chunk.section_meshes.pop(index, None)
+        if vertex_lists is not None:
+            self._hide_section(vertex_lists)
+
+        opaque, translucent = meshes
+        chunk.section_meshes[index] = [
+            vertex_list
+            for vertex_list in (
+                opaque.create_vertex_list(self.batch),
+                translucent.create_vertex_list(self.alpha_batch),
+            )
+            if vertex_list is not None
+        ]
+
+    def upload_finished_meshes(self, deadline: float = None):
+        """Uploads the meshes the workers finished building, dropping the ones
+        for sections which changed or were hidden in the meantime.
 
         Parameters
         ----------
-        position : tuple of len 3
-            The (x, y, z) position of the block to show.
-        instance:
-            The block instance
+        deadline : float
+            time.perf_counter() value to stop uploading at, if any
 
         """
-        try:
-            instance.vertex_data = instance.STATE_FILE.create_vertex_list(
-                self.alpha_batch if instance.TRANSPARENT else self.batch,
-                instance.position,
-                instance.get_block_state(),
-                tint_colors=instance.get_tint_colors(),
-            )
-        except (KeyboardInterrupt, SystemExit):
-            raise
-        except:
-            print(instance, file=sys.stderr)
-            traceback.print_exc()
+        for _ in range(len(self.pending_meshes)):
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+
+            chunk, index, revision, future = self.pending_meshes.popleft()
+            if not future.done():
+                self.pending_meshes.append((chunk, index, revision, future))
+                continue
 
-    def hide_block(self, instance: AbstractBlock, immediate=True):
-        """Hide the block at the given `position`. Hiding does not remove the
-        block from the world.
+            if not chunk.shown or chunk.mesh_revisions.get(index) != revision:
+                continue
+
+            try:
+                meshes = future.result()
+            except (KeyboardInterrupt, SystemExit):
+                raise
+            except:
+                print(chunk, index, file=sys.stderr)
+                traceback.print_exc()
+                continue
+
+            self._upload_section(chunk, index, meshes)
+
+    def hide_section(self, chunk: Chunk, index: int, immediate=True):
+        """Remove the mesh of the section `index` of `chunk` from the canvas.
 
         Parameters
         ----------
-        position : tuple of len 3
-            The (x, y, z) position of the block to hide.
+        chunk:
+            The chunk the section is in
+        index : int
+            The y index of the section
         immediate : bool
-            Whether or not to immediately remove the block from the canvas.
+            Whether or not to immediately remove the mesh from the canvas.
 
         """
-        instance.shown = False
+        # meshes still being built for it are outdated now
+        chunk.mesh_revisions[index] = chunk.mesh_revisions.get(index, 0) + 1
+
+        vertex_lists = chunk.section_meshes.pop(index, None)
+        if vertex_lists is None:
+            return
+
         if immediate:
-            self._hide_block(instance)
+            self._hide_section(vertex_lists)
         else:
-            self._enqueue(self._hide_block, instance)
+            self._enqueue(self._hide_section, vertex_lists)
 
-    def _hide_block(self, instance: AbstractBlock):
-        """Private implementation of the 'hide_block()` method."""
-        for element in instance.vertex_data:
-            element.delete()
-        instance.vertex_data = None
+    def _hide_section(
+        self, vertex_lists: list[pyglet.graphics.vertexdomain.VertexList]
+    ):
+        """Private implementation of the `hide_section()` method."""
+        for vertex_list in vertex_lists:
+            vertex_list.delete()
+        vertex_lists.clear()
 
     def show_chunk(self, sector: tuple[int, int] | Chunk):
         """Ensure all blocks in the given sector that should be shown are
@@ -455,7 +1390,7 @@ class World:
         chunk = self.chunks.get(sector) if isinstance(sector, tuple) else sector
 
         if chunk is None and isinstance(sector, tuple):
-            chunk = self.chunks[sector] = Chunk(self, sector)
+            chunk = self._create_chunk(sector)
 
         chunk.show(immediate=False)
 
@@ -467,7 +1402,7 @@ class World:
         chunk = self.chunks.get(sector) if isinstance(sector, tuple) else sector
 
         if chunk is None and isinstance(sector, tuple):
-            chunk = self.chunks[sector] = Chunk(self, sector)
+            chunk = self._create_chunk(sector)
 
         chunk.hide(immediate=False)
 
@@ -492,15 +1427,27 @@ class World:
     def process_queue(self):
         """Process the entire queue while taking periodic breaks. This allows
         the game loop to run smoothly. The queue contains calls to
-        _show_block() and _hide_block() so this method should be called if
-        add_block() or remove_block() was called with immediate=False
+        _show_section(), _submit_section() and _hide_section() so this method
+        should be called if add_block() or remove_block() was called with
+        immediate=False. Also inserts the chunks generated by the worldgen
+        workers and uploads the meshes finished by the mesh workers.
 
         """
-        start = time.perf_counter()
-        while self.queue and time.perf_counter() - start < 1.0 / TICKS_PER_SEC:
+        self.rebuild_dirty_sections()
+
+        deadline = time.perf_counter() + 1.0 / TICKS_PER_SEC
+        self.worldgen.process(deadline)
+        self.upload_finished_meshes(deadline)
+        while self.queue and time.perf_counter() < deadline:
             self._dequeue()
 
     def process_entire_queue(self):
         """Process the entire queue with no breaks."""
+        self.worldgen.wait()
+        self.rebuild_dirty_sections()
+
         while self.queue:
             self._dequeue()
+
+        concurrent.futures.wait([future for *_, future in self.pending_meshes])
+        self.upload_finished_meshes()
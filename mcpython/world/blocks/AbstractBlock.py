@@ -3,7 +3,6 @@ from __future__ import annotations
 import abc
 import typing
 
-import pyglet.graphics.vertexdomain
 from pyglet.math import Vec3
 
 from mcpython.rendering.Models import BlockStateFile
@@ -38,12 +37,41 @@ class AbstractBlock(IRegisterAble, IBufferSerializableWithVersion, abc.ABC):
 
     HARDNESS = 8
 
+    # If the block has no per-instance state at all, and none of its hooks
+    # depend on 'position' or 'chunk'. All blocks of such a type in the same
+    # block state share one instance (with position and chunk set to None)
+    STATELESS = False
+    # If the chunk should keep an instance of this block for its whole lifetime.
+    # When False, the block is only stored as a palette entry in the chunk until
+    # something looks it up. Defaults to True for ticking blocks and blocks
+    # overriding on_block_added() / on_block_loaded()
+    KEEP_INSTANCE = False
+    # If the block does something on random ticks, set automatically
+    RANDOM_TICKS = False
+    # If the block does something on block updates, set automatically
+    BLOCK_UPDATES = False
+    # If full-block faces of this block may be merged with equal faces of
+    # neighbouring blocks into bigger quads in chunk meshes
+    GREEDY_MESHING = True
+
     @classmethod
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         if cls.NAME is not None and cls.STATE_FILE is None:
             cls.STATE_FILE = BlockStateFile.by_name(cls.NAME)
 
+        if cls.STATELESS:
+            cls.KEEP_INSTANCE = False
+        elif "KEEP_INSTANCE" not in cls.__dict__:
+            cls.KEEP_INSTANCE = (
+                cls.KEEP_INSTANCE
+                or cls.SHOULD_TICK
+                or cls.on_block_added is not AbstractBlock.on_block_added
+                or cls.on_block_loaded is not AbstractBlock.on_block_loaded
+            )
+        cls.RANDOM_TICKS = cls.on_random_update is not AbstractBlock.on_random_update
+        cls.BLOCK_UPDATES = cls.on_block_updated is not AbstractBlock.on_block_updated
+
     @classmethod
     def decode(cls, buffer: ReadBuffer):
         name = buffer.read_string()
@@ -54,7 +82,7 @@ class AbstractBlock(IRegisterAble, IBufferSerializableWithVersion, abc.ABC):
         block_type = typing.cast(
             AbstractBlock, BLOCK_REGISTRY.lookup(name, raise_on_error=True)
         )
-        obj = cls((0, 0, 0))
+        obj = block_type((0, 0, 0))
         buffer = block_type.decode_datafixable(buffer, obj)
         block_type.inner_decode(obj, buffer)
         return obj
@@ -69,8 +97,6 @@ class AbstractBlock(IRegisterAble, IBufferSerializableWithVersion, abc.ABC):
 
     def __init__(self, position: tuple[int, int, int]):
         self.position = position
-        self.shown = False
-        self.vertex_data: list[pyglet.graphics.vertexdomain.VertexList] = []
         self.chunk: Chunk = None
 
     def get_bounding_box(self) -> IAABB:
@@ -83,7 +109,7 @@ class AbstractBlock(IRegisterAble, IBufferSerializableWithVersion, abc.ABC):
 
     def inner_encode(self, buffer: WriteBuffer):
         state = self.get_block_state()
-        buffer.write_uint32(len(state))
+        buffer.write_uint16(len(state))
         for key, value in state.items():
             buffer.write_string(key)
             buffer.write_string(value)
@@ -98,12 +124,20 @@ class AbstractBlock(IRegisterAble, IBufferSerializableWithVersion, abc.ABC):
         pass
 
     def update_render_state(self):
-        if not self.shown:
+        if self.STATELESS:
+            return
+
+        self.chunk.blocks.refresh(self)
+        entry = self.chunk.blocks.get_entry(self.position)
+        self.chunk.heightmaps.update(self.position, entry)
+        self.chunk.world.update_occlusion(self.chunk, self.position, entry)
+
+        if not self.chunk.shown:
             return
 
         world = self.chunk.world
-        world.hide_block(self)
-        world.show_block(self)
+        world.mark_block_dirty(self.chunk, self.position)
+        world.rebuild_dirty_sections()
         world.window.invalidate_focused_block()
 
     def on_block_added(self):
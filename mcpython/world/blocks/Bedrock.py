@@ -7,3 +7,4 @@ from mcpython.world.blocks.AbstractBlock import BLOCK_REGISTRY, AbstractBlock
 class Bedrock(AbstractBlock):
     NAME = "minecraft:bedrock"
     BREAKABLE = False
+    STATELESS = True
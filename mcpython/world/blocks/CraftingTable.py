@@ -14,6 +14,7 @@ if typing.TYPE_CHECKING:
 class CraftingTable(AbstractBlock):
     NAME = "minecraft:crafting_table"
     CONTAINER = None
+    STATELESS = True
 
     def on_block_interaction(
         self, itemstack: ItemStack, button: int, modifiers: int
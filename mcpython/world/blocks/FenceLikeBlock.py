@@ -7,6 +7,7 @@ from mcpython.world.util import Facing
 
 
 class FenceLikeBlock(AbstractBlock):
+    KEEP_INSTANCE = True
     FACE_ORDER: list[Facing] = list(Facing)[2:]
     BLOCk_STATE_LISTING = [
         {
@@ -42,7 +43,7 @@ class FenceLikeBlock(AbstractBlock):
 
         for i, face in enumerate(self.FACE_ORDER):
             p = face.position_offset(pos)
-            block = self.chunk.world.get_or_create_chunk_by_position(p).blocks.get(p)
+            block = self.chunk.world.get_block(*p)
 
             if block and (
                 block.is_solid(face.opposite)
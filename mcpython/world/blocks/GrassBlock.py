@@ -6,6 +6,7 @@ from mcpython.world.blocks.AbstractBlock import BLOCK_REGISTRY, AbstractBlock
 @BLOCK_REGISTRY.register
 class GrassBlock(AbstractBlock):
     NAME = "minecraft:grass_block"
+    STATELESS = True
 
     def get_block_state(self) -> dict[str, str]:
         return {"snowy": "false"}
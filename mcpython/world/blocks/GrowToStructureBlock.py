@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import random
+
 from mcpython.world.blocks.AbstractBlock import AbstractBlock
 from mcpython.world.serialization.DataBuffer import WriteBuffer, ReadBuffer
 from mcpython.world.worldgen.WorldgenManager import Structure
@@ -8,6 +10,7 @@ from mcpython.world.worldgen.WorldgenManager import Structure
 class GrowToStructureBlock(AbstractBlock):
     STRUCTURE: Structure = None
     GROWTH_STAGES = 3
+    KEEP_INSTANCE = True
 
     def __init__(self, position: tuple[int, int, int]):
         super().__init__(position)
@@ -32,4 +35,8 @@ class GrowToStructureBlock(AbstractBlock):
 
     def grow(self):
         if self.STRUCTURE:
-            self.STRUCTURE.place(self.chunk.world, self.position)
+            # the blocks reaching into chunks not generated (or not loaded) yet
+            # are buffered until they are, instead of creating empty chunks
+            self.STRUCTURE.place(
+                self.chunk.world.worldgen.writer, self.position, random.Random()
+            )
@@ -8,6 +8,7 @@ from mcpython.world.blocks.AbstractBlock import BLOCK_REGISTRY, AbstractBlock
 class Sand(AbstractBlock):
     NAME = "minecraft:sand"
     STATE_FILE = BlockStateFile.by_name(NAME)
+    KEEP_INSTANCE = True
 
     def __init__(self, position):
         super().__init__(position)
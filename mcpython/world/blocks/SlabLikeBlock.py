@@ -67,7 +67,9 @@ class SlabLikeBlock(AbstractBlock):
         return {"type": self.half.name.lower()}
 
     def set_block_state(self, state: dict[str, str]):
-        self.half = SlabLikeBlock.SlabHalf[state.get("half", "top").upper()]
+        self.half = SlabLikeBlock.SlabHalf[
+            state.get("type", state.get("half", "top")).upper()
+        ]
 
     def is_solid(self, face: Facing) -> bool:
         return (
@@ -58,6 +58,7 @@ class PlayerEntity(AbstractEntity):
         )
 
         self.breaking_block: AbstractBlock | None = None
+        self.breaking_block_target: tuple[int, int, int] | None = None
         self.breaking_block_timer: float | None = None
         self.breaking_block_total_timer: float | None = None
         self.breaking_block_position: tuple[float, float, float] | None = None
@@ -232,10 +233,10 @@ class PlayerEntity(AbstractEntity):
             key = normalize((x, y, z))
 
             if key != previous:
-                block = self.world.get_or_create_chunk_by_position(key).blocks.get(key)
+                block = self.world.get_block(*key)
 
             if block and block.get_bounding_box().point_intersect(
-                Vec3(x, y, z) - Vec3(*block.position)
+                Vec3(x, y, z) - Vec3(*key)
             ):
                 return key, previous, (x, y, z), real_previous
 
@@ -254,15 +255,22 @@ class PlayerEntity(AbstractEntity):
         block, previous, block_raw, previous_real = self.hit_test(self.position, vector)
         if block is None:
             return
-        block_chunk = self.world.get_or_create_chunk_by_position(block)
+        block_chunk = self.world.peek_chunk(block)
+        if block_chunk is None:
+            return
 
         instance = block_chunk.blocks[block]
         self.breaking_block_position = block_raw
 
         if instance is None:
             self.breaking_block = None
-        elif instance != self.breaking_block or force_reset:
+        elif (
+            instance is not self.breaking_block
+            or block != self.breaking_block_target
+            or force_reset
+        ):
             self.breaking_block = instance
+            self.breaking_block_target = block
             self.breaking_block_timer = self.breaking_block_total_timer = (
                 instance.on_block_starting_to_break(stack, block_raw)
             )
@@ -279,7 +287,7 @@ class PlayerEntity(AbstractEntity):
                 self.breaking_block_position,
             )
             if state is None:
-                self.world.remove_block(self.breaking_block)
+                self.world.remove_block(self.breaking_block_target)
 
             if state is not False:
                 self.update_breaking_block()
@@ -326,9 +334,7 @@ class PlayerEntity(AbstractEntity):
                     op[1] -= dy
                     op[i] += face[i]
 
-                    block = self.world.get_or_create_chunk_by_position(op).blocks.get(
-                        tuple(op)
-                    )
+                    block = self.world.get_block(*op)
 
                     if block is None or block.NO_COLLISION:
                         continue
@@ -16,15 +16,22 @@ from mcpython.world.items.AbstractItem import (
     ITEM_REGISTRY,
 )
 from mcpython.world.util import Facing
+from mcpython.world.worldgen.WorldgenManager import OAK_TREE, Structure
 
 
 def add_wooden_set(
-    wood_name: str, namespace="minecraft", log=True, sapling=True, leaves=False
+    wood_name: str,
+    namespace="minecraft",
+    log=True,
+    sapling=True,
+    leaves=False,
+    tree: Structure = None,
 ):
 
     @BLOCK_REGISTRY.register
     class Planks(AbstractBlock):
         NAME = f"{namespace}:{wood_name}_planks"
+        STATELESS = True
 
     Log = StrippedLog = Wood = StrippedWood = None
     if log:
@@ -72,6 +79,7 @@ def add_wooden_set(
         class Leaves(AbstractBlock):
             NAME = f"{namespace}:{wood_name}_leaves"
             TRANSPARENT = True
+            STATELESS = True
 
             def is_solid(self, face: Facing) -> bool:
                 return False
@@ -85,6 +93,7 @@ def add_wooden_set(
         @BLOCK_REGISTRY.register
         class Sapling(GrowToStructureBlock):
             NAME = f"{namespace}:{wood_name}_sapling"
+            STRUCTURE = tree
             # todo: make tag
             GROWTH_SUPPORT = [
                 "minecraft:dirt",
@@ -139,6 +148,7 @@ def add_simple_block(name: str):
     @BLOCK_REGISTRY.register
     class SimpleBlock(AbstractBlock):
         NAME = name if ":" in name else f"minecraft:{name}"
+        STATELESS = True
 
     create_item_for_block(SimpleBlock)
 
@@ -149,6 +159,7 @@ def add_simple_block_set(name: str, base_name: str = None):
     @BLOCK_REGISTRY.register
     class Block(AbstractBlock):
         NAME = name if ":" in name else f"minecraft:{name}"
+        STATELESS = True
 
     @BLOCK_REGISTRY.register
     class Slab(SlabLikeBlock):
@@ -187,7 +198,7 @@ add_wooden_set("bamboo", log=False, sapling=False, leaves=False)
 add_wooden_set("birch")
 add_wooden_set("dark_oak")
 add_wooden_set("jungle")
-add_wooden_set("oak")
+add_wooden_set("oak", leaves=True, tree=OAK_TREE)
 add_wooden_set("spruce")
 add_wooden_set("mangrove", sapling=False)
 add_wooden_set("cherry")
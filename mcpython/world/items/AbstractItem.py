@@ -130,9 +130,8 @@ def create_item_for_block(
             from mcpython.rendering.Window import Window
 
             probe_block.position = pos = normalize(Window.INSTANCE.player.position)
-            probe_block.chunk = Window.INSTANCE.world.get_or_create_chunk_by_position(
-                pos
-            )
+            # None outside of the loaded area, the tint of the block alone is used
+            probe_block.chunk = Window.INSTANCE.world.peek_chunk(pos)
             return probe_block.get_tint_colors()
 
     return typing.cast(type[AbstractItem], BlockItem)
@@ -86,6 +86,14 @@ class ReadBuffer:
         size = size_item.unpack(self.source.read(size_item.size))[0]
         return self.source.read(size).decode(encoding)
 
+    def read_bytes(self, size: int) -> bytes:
+        data = self.source.read(size)
+        if len(data) < size:
+            raise IOError(
+                f"Stream ended when no end was expected: read {len(data)} byte(s), expected {size} byte(s)"
+            )
+        return data
+
     def read_remaining(self):
         return self.source.read()
 
@@ -143,13 +151,17 @@ class WriteBuffer:
         return self
 
     def write_string(
-        self, string: str, size_item: struct.Struct = _UINT32, encoding="utf8"
+        self, string: str, size_item: struct.Struct = _UINT16, encoding="utf8"
     ) -> typing.Self:
         d = string.encode(encoding)
         self.target.write(size_item.pack(len(d)))
         self.target.write(d)
         return self
 
+    def write_bytes(self, data: bytes) -> typing.Self:
+        self.target.write(data)
+        return self
+
     def get_data(self):
         return self.target.getvalue()
 
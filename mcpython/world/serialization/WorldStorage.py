@@ -2,9 +2,16 @@ from __future__ import annotations
 
 import os
 import pathlib
+import random
 import typing
 
+from mcpython import config
 from mcpython.world.serialization.DataBuffer import ReadBuffer, WriteBuffer
+from mcpython.world.worldgen.WorldgenManager import (
+    GENERATOR_VERSION,
+    ChunkStatus,
+    generate_terrain,
+)
 
 
 if typing.TYPE_CHECKING:
@@ -12,34 +19,100 @@ if typing.TYPE_CHECKING:
 
 
 class WorldStorage:
-    def __init__(self):
+    # version of the world.dat file
+    INFO_VERSION = 1
+
+    def __init__(self, seed: int = None, delta_chunks: bool = None):
         self.folder: pathlib.Path = None
         self.saved_chunks: set[tuple[int, int]] = set()
+        # the world seed, driving all of the world generation
+        self.seed = (random.getrandbits(64) if seed is None else seed) % 2**64
+        # if chunks are saved as their differences to the generated terrain
+        # ('.delta' files), which is regenerated when loading them. Chunks
+        # differing too much are still saved completely ('.chunk' files)
+        self.delta_chunks = (
+            config.DELTA_CHUNKS if delta_chunks is None else delta_chunks
+        )
 
     def load_world(self, folder: pathlib.Path):
         self.folder = folder
 
-        if folder.exists():
+        if (folder / "chunks").exists():
             for file in os.listdir(folder / "chunks"):
                 self.saved_chunks.add(
                     typing.cast(
                         tuple[int, int],
-                        tuple(map(int, file.removesuffix(".chunk").split("_"))),
+                        tuple(map(int, pathlib.PurePath(file).stem.split("_"))),
                     )
                 )
 
+        info = folder / "world.dat"
+        if info.exists():
+            buffer = ReadBuffer(info.read_bytes())
+            version = buffer.read_uint8()
+            if version != self.INFO_VERSION:
+                raise RuntimeError(f"unsupported world.dat version {version}")
+            self.seed = buffer.read_uint64()
+
+    def save_world(self, folder: pathlib.Path, chunks: typing.Iterable[Chunk]):
+        """Saves the world info and 'chunks' into 'folder'"""
+        self.folder = folder
+        folder.mkdir(exist_ok=True, parents=True)
+
+        writer = WriteBuffer()
+        writer.write_uint8(self.INFO_VERSION)
+        writer.write_uint64(self.seed)
+        (folder / "world.dat").write_bytes(writer.get_data())
+
+        for chunk in chunks:
+            self.save_chunk(chunk)
+
+    def get_chunk_file(
+        self, position: tuple[int, int], suffix=".chunk"
+    ) -> pathlib.Path:
+        return self.folder / "chunks" / "{}_{}{}".format(*position, suffix)
+
     def load_chunk(self, chunk: Chunk):
         if chunk.position not in self.saved_chunks:
             return
 
-        file = self.folder / "chunks" / "{}_{}.chunk".format(*chunk.position)
-        data = file.read_bytes()
-        chunk.decode_instance(ReadBuffer(data))
+        file = self.get_chunk_file(chunk.position, ".delta")
+        if not file.exists():
+            data = self.get_chunk_file(chunk.position).read_bytes()
+            chunk.decode_instance(ReadBuffer(data))
+            return
+
+        buffer = ReadBuffer(file.read_bytes())
+        version = buffer.read_uint16()
+        if version != GENERATOR_VERSION:
+            # the terrain it was saved against can't be generated anymore
+            raise RuntimeError(
+                f"chunk {chunk.position} was saved as difference to the terrain"
+                f" of generator version {version}, but this is version"
+                f" {GENERATOR_VERSION}"
+            )
+        terrain = generate_terrain(self.seed, *chunk.position)
+        chunk.decode_delta(buffer, terrain)
 
     def save_chunk(self, chunk: Chunk):
         self.saved_chunks.add(chunk.position)
-        file = self.folder / "chunks" / "{}_{}.chunk".format(*chunk.position)
+        file = self.get_chunk_file(chunk.position)
+        delta_file = self.get_chunk_file(chunk.position, ".delta")
         file.parent.mkdir(exist_ok=True, parents=True)
+
         writer = WriteBuffer()
+        if self.delta_chunks and chunk.status == ChunkStatus.FINALIZED:
+            # chunks loaded from full snapshots don't know their terrain yet
+            terrain = chunk.terrain or generate_terrain(self.seed, *chunk.position)
+
+            writer.write_uint16(GENERATOR_VERSION)
+            if chunk.encode_delta(writer, terrain):
+                chunk.terrain = terrain
+                delta_file.write_bytes(writer.get_data())
+                file.unlink(missing_ok=True)
+                return
+            writer = WriteBuffer()
+
         chunk.encode(writer)
         file.write_bytes(writer.get_data())
+        delta_file.unlink(missing_ok=True)
@@ -0,0 +1,69 @@
+"""
+Caves, carved into the terrain where two 3D noises are both close to zero,
+which forms long winding tunnels.
+
+The noise is sampled on a coarse grid and trilinearly interpolated, so a chunk
+costs a few hundred noise evaluations instead of one per block.
+"""
+
+from __future__ import annotations
+
+import numpy
+import opensimplex
+
+from mcpython.world.worldgen import VectorNoise
+
+# blocks between two samples of the grid, divides 16
+GRID_STEP = 4
+# the noise scale horizontally and vertically
+SCALE_XZ = 64
+SCALE_Y = 32
+# how close to zero both noises have to be for a cave
+WIDTH = 0.1
+# the lowest layer caves are carved into, keeping the bedrock floor intact
+MIN_Y = 5
+
+
+def upsample(samples: numpy.ndarray, step: int) -> numpy.ndarray:
+    """
+    Linearly interpolates 'samples' along every axis, 'step' values between two
+    samples, dropping the last sample of each axis
+    """
+    for axis in range(samples.ndim):
+        samples = numpy.moveaxis(samples, axis, 0)
+        weight = (numpy.arange(step) / step).reshape(
+            (1, step) + (1,) * (samples.ndim - 1)
+        )
+        low, high = samples[:-1, None], samples[1:, None]
+        samples = (low * (1 - weight) + high * weight).reshape(
+            (-1,) + samples.shape[1:]
+        )
+        samples = numpy.moveaxis(samples, 0, axis)
+    return samples
+
+
+class CaveCarver:
+    def __init__(
+        self, generator: opensimplex.OpenSimplex, generator2: opensimplex.OpenSimplex
+    ):
+        self.generator = generator
+        self.generator2 = generator2
+
+    def get_mask(self, cx: int, cz: int, height: int) -> numpy.ndarray:
+        """
+        Returns where chunk (cx, cz) has caves below 'height', indexed by local
+        [x, y, z]
+        """
+        top = -(-height // GRID_STEP) * GRID_STEP
+        x, y, z = numpy.meshgrid(
+            numpy.arange(cx * 16, cx * 16 + 17, GRID_STEP) / SCALE_XZ,
+            numpy.arange(0, top + 1, GRID_STEP) / SCALE_Y,
+            numpy.arange(cz * 16, cz * 16 + 17, GRID_STEP) / SCALE_XZ,
+            indexing="ij",
+        )
+        first = upsample(VectorNoise.noise3(self.generator, x, y, z), GRID_STEP)
+        second = upsample(VectorNoise.noise3(self.generator2, x, y, z), GRID_STEP)
+
+        mask = (numpy.abs(first) < WIDTH) & (numpy.abs(second) < WIDTH)
+        mask[:, :MIN_Y] = False
+        return mask[:, :height]
@@ -0,0 +1,95 @@
+"""
+Low frequency 2D noise ("climate" like height ranges and rivers), which changes
+so slowly that sampling it on a coarse grid and interpolating in between is
+indistinguishable from evaluating it for every column.
+"""
+
+from __future__ import annotations
+
+import collections
+
+import numpy
+import opensimplex
+
+from mcpython.world.worldgen import VectorNoise
+
+# blocks between two samples of the grid, divides 16
+GRID_STEP = 8
+# the samples are created and cached in regions of REGION_CHUNKS x REGION_CHUNKS chunks
+REGION_CHUNKS = 4
+# the number of regions kept per noise
+CACHE_SIZE = 256
+
+
+class ClimateNoise:
+    """
+    generator.noise2(x / scale, z / scale), sampled every GRID_STEP blocks and
+    bilinearly interpolated for the columns in between.
+
+    The samples are shared by all chunks of a region, the least recently used
+    regions are dropped when more than 'cache_size' are cached.
+    """
+
+    def __init__(
+        self,
+        generator: opensimplex.OpenSimplex,
+        scale: float,
+        cache_size: int = CACHE_SIZE,
+    ):
+        self.generator = generator
+        self.scale = scale
+        self.cache_size = cache_size
+        self.regions: collections.OrderedDict[tuple[int, int], numpy.ndarray] = (
+            collections.OrderedDict()
+        )
+
+    def get_samples(self, rx: int, rz: int) -> numpy.ndarray:
+        """Returns the grid samples of region (rx, rz), including its far border"""
+        samples = self.regions.get((rx, rz))
+        if samples is not None:
+            self.regions.move_to_end((rx, rz))
+            return samples
+
+        size = REGION_CHUNKS * 16
+        x, z = numpy.meshgrid(
+            numpy.arange(rx * size, rx * size + size + 1, GRID_STEP),
+            numpy.arange(rz * size, rz * size + size + 1, GRID_STEP),
+            indexing="ij",
+        )
+        samples = self.regions[rx, rz] = VectorNoise.noise2(
+            self.generator, x / self.scale, z / self.scale
+        )
+
+        if len(self.regions) > self.cache_size:
+            self.regions.popitem(last=False)
+        return samples
+
+    def get_chunk(self, cx: int, cz: int) -> numpy.ndarray:
+        """Returns the noise of the columns of chunk (cx, cz), indexed [dx, dz]"""
+        rx, ox = divmod(cx, REGION_CHUNKS)
+        rz, oz = divmod(cz, REGION_CHUNKS)
+        samples = self.get_samples(rx, rz)
+
+        nodes = 16 // GRID_STEP + 1
+        x0, z0 = ox * 16 // GRID_STEP, oz * 16 // GRID_STEP
+        samples = samples[x0 : x0 + nodes, z0 : z0 + nodes]
+
+        # x runs along the first axis, z along the second
+        x, z = _CELL[:, None], _CELL[None, :]
+        x_low, x_high = _WEIGHTS[0][:, None], _WEIGHTS[1][:, None]
+        z_low, z_high = _WEIGHTS
+        return (
+            samples[x, z] * x_low * z_low
+            + samples[x + 1, z] * x_high * z_low
+            + samples[x, z + 1] * x_low * z_high
+            + samples[x + 1, z + 1] * x_high * z_high
+        )
+
+
+# for each local coordinate in a chunk the grid cell it is in, and the
+# interpolation weights of the lower and upper sample of that cell
+_CELL = numpy.arange(16) // GRID_STEP
+_WEIGHTS = (
+    1 - (numpy.arange(16) % GRID_STEP) / GRID_STEP,
+    (numpy.arange(16) % GRID_STEP) / GRID_STEP,
+)
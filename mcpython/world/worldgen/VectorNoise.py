@@ -0,0 +1,619 @@
+"""
+NumPy versions of OpenSimplex.noise2() and OpenSimplex.noise3() evaluating
+whole arrays of arbitrary points at once.
+
+The calculations are the ones of opensimplex (version 0.4.5), done in the same
+order, so the results are bit-identical to calling the generator per point.
+Branches of the original become numpy.select() / numpy.where() over all points,
+and contributions are only added where the original adds them.
+"""
+
+from __future__ import annotations
+
+import numpy
+import opensimplex
+from opensimplex.constants import (
+    GRADIENTS2,
+    GRADIENTS3,
+    NORM_CONSTANT2,
+    NORM_CONSTANT3,
+    SQUISH_CONSTANT2,
+    SQUISH_CONSTANT3,
+    STRETCH_CONSTANT2,
+    STRETCH_CONSTANT3,
+)
+
+
+def noise2(
+    generator: opensimplex.OpenSimplex, x: numpy.ndarray, y: numpy.ndarray
+) -> numpy.ndarray:
+    """Returns generator.noise2() of each point of the broadcast arrays 'x' and 'y'"""
+    x, y = numpy.broadcast_arrays(
+        numpy.asarray(x, dtype=numpy.float64), numpy.asarray(y, dtype=numpy.float64)
+    )
+    shape = x.shape
+    x, y = x.ravel(), y.ravel()
+    perm = generator._perm
+
+    # Place input coordinates onto grid.
+    stretch_offset = (x + y) * STRETCH_CONSTANT2
+    xs = x + stretch_offset
+    ys = y + stretch_offset
+
+    # Floor to get grid coordinates of rhombus (stretched square) super-cell origin.
+    xsb = numpy.floor(xs)
+    ysb = numpy.floor(ys)
+
+    # Skew out to get actual coordinates of rhombus origin.
+    squish_offset = (xsb + ysb) * SQUISH_CONSTANT2
+    xb = xsb + squish_offset
+    yb = ysb + squish_offset
+
+    # Compute grid coordinates relative to rhombus origin.
+    xins = xs - xsb
+    yins = ys - ysb
+    in_sum = xins + yins
+
+    # Positions relative to origin point.
+    dx0 = x - xb
+    dy0 = y - yb
+
+    xsb = xsb.astype(numpy.int64)
+    ysb = ysb.astype(numpy.int64)
+    value = numpy.zeros(x.shape)
+
+    # Contribution (1,0)
+    dx1 = dx0 - 1 - SQUISH_CONSTANT2
+    dy1 = dy0 - 0 - SQUISH_CONSTANT2
+    _contribute2(value, perm, xsb + 1, ysb + 0, dx1, dy1)
+
+    # Contribution (0,1)
+    dx2 = dx0 - 0 - SQUISH_CONSTANT2
+    dy2 = dy0 - 1 - SQUISH_CONSTANT2
+    _contribute2(value, perm, xsb + 0, ysb + 1, dx2, dy2)
+
+    low = in_sum <= 1
+    x_larger = xins > yins
+
+    # inside the triangle at (0,0)
+    zins = 1 - in_sum
+    low_closest = (zins > xins) | (zins > yins)
+    low_cases = [low_closest & x_larger, low_closest]
+
+    # inside the triangle at (1,1)
+    zins = 2 - in_sum
+    high_closest = (zins < xins) | (zins < yins)
+    high_cases = [high_closest & x_larger, high_closest]
+
+    xsv_ext = numpy.where(
+        low,
+        numpy.select(low_cases, [xsb + 1, xsb - 1], xsb + 1),
+        numpy.select(high_cases, [xsb + 2, xsb + 0], xsb),
+    )
+    ysv_ext = numpy.where(
+        low,
+        numpy.select(low_cases, [ysb - 1, ysb + 1], ysb + 1),
+        numpy.select(high_cases, [ysb + 0, ysb + 2], ysb),
+    )
+    dx_ext = numpy.where(
+        low,
+        numpy.select(low_cases, [dx0 - 1, dx0 + 1], dx0 - 1 - 2 * SQUISH_CONSTANT2),
+        numpy.select(
+            high_cases,
+            [dx0 - 2 - 2 * SQUISH_CONSTANT2, dx0 + 0 - 2 * SQUISH_CONSTANT2],
+            dx0,
+        ),
+    )
+    dy_ext = numpy.where(
+        low,
+        numpy.select(low_cases, [dy0 + 1, dy0 - 1], dy0 - 1 - 2 * SQUISH_CONSTANT2),
+        numpy.select(
+            high_cases,
+            [dy0 + 0 - 2 * SQUISH_CONSTANT2, dy0 - 2 - 2 * SQUISH_CONSTANT2],
+            dy0,
+        ),
+    )
+
+    # Contribution (0,0) or (1,1)
+    xsb = numpy.where(low, xsb, xsb + 1)
+    ysb = numpy.where(low, ysb, ysb + 1)
+    dx0 = numpy.where(low, dx0, dx0 - 1 - 2 * SQUISH_CONSTANT2)
+    dy0 = numpy.where(low, dy0, dy0 - 1 - 2 * SQUISH_CONSTANT2)
+    _contribute2(value, perm, xsb, ysb, dx0, dy0)
+
+    # Extra Vertex
+    _contribute2(value, perm, xsv_ext, ysv_ext, dx_ext, dy_ext)
+
+    return (value / NORM_CONSTANT2).reshape(shape)
+
+
+def _contribute2(
+    value: numpy.ndarray,
+    perm: numpy.ndarray,
+    xsb: numpy.ndarray,
+    ysb: numpy.ndarray,
+    dx: numpy.ndarray,
+    dy: numpy.ndarray,
+):
+    attn = 2 - dx * dx - dy * dy
+    mask = attn > 0
+    attn = attn * attn
+
+    index = perm[(perm[xsb & 0xFF] + ysb) & 0xFF] & 0x0E
+    extrapolation = GRADIENTS2[index] * dx + GRADIENTS2[index + 1] * dy
+    numpy.add(value, attn * attn * extrapolation, out=value, where=mask)
+
+
+def noise3(
+    generator: opensimplex.OpenSimplex,
+    x: numpy.ndarray,
+    y: numpy.ndarray,
+    z: numpy.ndarray,
+) -> numpy.ndarray:
+    """Returns generator.noise3() of each point of the broadcast arrays 'x', 'y' and 'z'"""
+    x, y, z = numpy.broadcast_arrays(
+        numpy.asarray(x, dtype=numpy.float64),
+        numpy.asarray(y, dtype=numpy.float64),
+        numpy.asarray(z, dtype=numpy.float64),
+    )
+    shape = x.shape
+    x, y, z = x.ravel(), y.ravel(), z.ravel()
+
+    # Place input coordinates on simplectic honeycomb.
+    stretch_offset = (x + y + z) * STRETCH_CONSTANT3
+    xs = x + stretch_offset
+    ys = y + stretch_offset
+    zs = z + stretch_offset
+
+    # Floor to get simplectic honeycomb coordinates of rhombohedron (stretched cube) super-cell origin.
+    xsb = numpy.floor(xs)
+    ysb = numpy.floor(ys)
+    zsb = numpy.floor(zs)
+
+    # Skew out to get actual coordinates of rhombohedron origin.
+    squish_offset = (xsb + ysb + zsb) * SQUISH_CONSTANT3
+    xb = xsb + squish_offset
+    yb = ysb + squish_offset
+    zb = zsb + squish_offset
+
+    # Compute simplectic honeycomb coordinates relative to rhombohedral origin.
+    xins = xs - xsb
+    yins = ys - ysb
+    zins = zs - zsb
+    in_sum = xins + yins + zins
+
+    # Positions relative to origin point.
+    dx0 = x - xb
+    dy0 = y - yb
+    dz0 = z - zb
+
+    point = (
+        xsb.astype(numpy.int64),
+        ysb.astype(numpy.int64),
+        zsb.astype(numpy.int64),
+        xins,
+        yins,
+        zins,
+        in_sum,
+        dx0,
+        dy0,
+        dz0,
+    )
+
+    value = numpy.zeros(x.shape)
+    low = in_sum <= 1
+    high = ~low & (in_sum >= 2)
+    for region, function in (
+        (low, _noise3_low),
+        (high, _noise3_high),
+        (~low & ~high, _noise3_middle),
+    ):
+        indices = numpy.flatnonzero(region)
+        if indices.size:
+            value[indices] = function(generator, *(array[indices] for array in point))
+
+    return (value / NORM_CONSTANT3).reshape(shape)
+
+
+def _contribute3(
+    generator: opensimplex.OpenSimplex,
+    value: numpy.ndarray,
+    xsb: numpy.ndarray,
+    ysb: numpy.ndarray,
+    zsb: numpy.ndarray,
+    dx: numpy.ndarray,
+    dy: numpy.ndarray,
+    dz: numpy.ndarray,
+):
+    attn = 2 - dx * dx - dy * dy - dz * dz
+    mask = attn > 0
+    attn = attn * attn
+
+    perm = generator._perm
+    index = generator._perm_grad_index3[
+        (perm[(perm[xsb & 0xFF] + ysb) & 0xFF] + zsb) & 0xFF
+    ]
+    extrapolation = (
+        GRADIENTS3[index] * dx + GRADIENTS3[index + 1] * dy + GRADIENTS3[index + 2] * dz
+    )
+    numpy.add(value, attn * attn * extrapolation, out=value, where=mask)
+
+
+def _noise3_low(generator, xsb, ysb, zsb, xins, yins, zins, in_sum, dx0, dy0, dz0):
+    """The part of noise3() inside the tetrahedron at (0,0,0)"""
+    # Determine which two of (0,0,1), (0,1,0), (1,0,0) are closest.
+    replace_b = (xins >= yins) & (zins > yins)
+    replace_a = ~replace_b & (xins < yins) & (zins > xins)
+    a_point = numpy.where(replace_a, 0x04, 0x01)
+    a_score = numpy.where(replace_a, zins, xins)
+    b_point = numpy.where(replace_b, 0x04, 0x02)
+    b_score = numpy.where(replace_b, zins, yins)
+
+    # Now we determine the two lattice points not part of the tetrahedron that may contribute.
+    wins = 1 - in_sum
+    # (0,0,0) is one of the closest two tetrahedral vertices
+    closest = (wins > a_score) | (wins > b_score)
+    c = numpy.where(
+        closest, numpy.where(b_score > a_score, b_point, a_point), a_point | b_point
+    )
+    no_x, no_y, no_z = (c & 0x01) == 0, (c & 0x02) == 0, (c & 0x04) == 0
+
+    far = SQUISH_CONSTANT3
+    xsv_ext0 = numpy.where(
+        closest, numpy.where(no_x, xsb - 1, xsb + 1), numpy.where(no_x, xsb, xsb + 1)
+    )
+    xsv_ext1 = numpy.where(no_x, numpy.where(closest, xsb, xsb - 1), xsb + 1)
+    dx_ext0 = numpy.where(
+        closest,
+        numpy.where(no_x, dx0 + 1, dx0 - 1),
+        numpy.where(no_x, dx0 - 2 * far, dx0 - 1 - 2 * far),
+    )
+    dx_ext1 = numpy.where(
+        closest,
+        numpy.where(no_x, dx0, dx0 - 1),
+        numpy.where(no_x, dx0 + 1 - far, dx0 - 1 - far),
+    )
+
+    ysv_ext0 = numpy.where(
+        closest,
+        numpy.where(no_y, numpy.where(no_x, ysb, ysb - 1), ysb + 1),
+        numpy.where(no_y, ysb, ysb + 1),
+    )
+    ysv_ext1 = numpy.where(
+        closest,
+        numpy.where(no_y, numpy.where(no_x, ysb - 1, ysb), ysb + 1),
+        numpy.where(no_y, ysb - 1, ysb + 1),
+    )
+    dy_ext0 = numpy.where(
+        closest,
+        numpy.where(no_y, numpy.where(no_x, dy0, dy0 + 1), dy0 - 1),
+        numpy.where(no_y, dy0 - 2 * far, dy0 - 1 - 2 * far),
+    )
+    dy_ext1 = numpy.where(
+        closest,
+        numpy.where(no_y, numpy.where(no_x, dy0 + 1, dy0), dy0 - 1),
+        numpy.where(no_y, dy0 + 1 - far, dy0 - 1 - far),
+    )
+
+    zsv_ext0 = numpy.where(no_z, zsb, zsb + 1)
+    zsv_ext1 = numpy.where(no_z, zsb - 1, zsb + 1)
+    dz_ext0 = numpy.where(
+        closest,
+        numpy.where(no_z, dz0, dz0 - 1),
+        numpy.where(no_z, dz0 - 2 * far, dz0 - 1 - 2 * far),
+    )
+    dz_ext1 = numpy.where(
+        closest,
+        numpy.where(no_z, dz0 + 1, dz0 - 1),
+        numpy.where(no_z, dz0 + 1 - far, dz0 - 1 - far),
+    )
+
+    value = numpy.zeros(xsb.shape)
+
+    # Contribution (0,0,0)
+    _contribute3(generator, value, xsb + 0, ysb + 0, zsb + 0, dx0, dy0, dz0)
+
+    # Contribution (1,0,0)
+    dx1 = dx0 - 1 - SQUISH_CONSTANT3
+    dy1 = dy0 - 0 - SQUISH_CONSTANT3
+    dz1 = dz0 - 0 - SQUISH_CONSTANT3
+    _contribute3(generator, value, xsb + 1, ysb + 0, zsb + 0, dx1, dy1, dz1)
+
+    # Contribution (0,1,0)
+    dx2 = dx0 - 0 - SQUISH_CONSTANT3
+    dy2 = dy0 - 1 - SQUISH_CONSTANT3
+    dz2 = dz1
+    _contribute3(generator, value, xsb + 0, ysb + 1, zsb + 0, dx2, dy2, dz2)
+
+    # Contribution (0,0,1)
+    dx3 = dx2
+    dy3 = dy1
+    dz3 = dz0 - 1 - SQUISH_CONSTANT3
+    _contribute3(generator, value, xsb + 0, ysb + 0, zsb + 1, dx3, dy3, dz3)
+
+    _contribute3(
+        generator, value, xsv_ext0, ysv_ext0, zsv_ext0, dx_ext0, dy_ext0, dz_ext0
+    )
+    _contribute3(
+        generator, value, xsv_ext1, ysv_ext1, zsv_ext1, dx_ext1, dy_ext1, dz_ext1
+    )
+    return value
+
+
+def _noise3_high(generator, xsb, ysb, zsb, xins, yins, zins, in_sum, dx0, dy0, dz0):
+    """The part of noise3() inside the tetrahedron at (1,1,1)"""
+    # Determine which two tetrahedral vertices are the closest, out of (1,1,0), (1,0,1), (0,1,1) but not (1,1,1).
+    replace_b = (xins <= yins) & (zins < yins)
+    replace_a = ~replace_b & (xins > yins) & (zins < xins)
+    a_point = numpy.where(replace_a, 0x03, 0x06)
+    a_score = numpy.where(replace_a, zins, xins)
+    b_point = numpy.where(replace_b, 0x03, 0x05)
+    b_score = numpy.where(replace_b, zins, yins)
+
+    # Now we determine the two lattice points not part of the tetrahedron that may contribute.
+    wins = 3 - in_sum
+    # (1,1,1) is one of the closest two tetrahedral vertices
+    closest = (wins < a_score) | (wins < b_score)
+    c = numpy.where(
+        closest, numpy.where(b_score < a_score, b_point, a_point), a_point & b_point
+    )
+    has_x, has_y, has_z = (c & 0x01) != 0, (c & 0x02) != 0, (c & 0x04) != 0
+
+    far = SQUISH_CONSTANT3
+    xsv_ext0 = numpy.where(has_x, numpy.where(closest, xsb + 2, xsb + 1), xsb)
+    xsv_ext1 = numpy.where(has_x, numpy.where(closest, xsb + 1, xsb + 2), xsb)
+    dx_ext0 = numpy.where(
+        closest,
+        numpy.where(has_x, dx0 - 2 - 3 * far, dx0 - 3 * far),
+        numpy.where(has_x, dx0 - 1 - far, dx0 - far),
+    )
+    dx_ext1 = numpy.where(
+        closest,
+        numpy.where(has_x, dx0 - 1 - 3 * far, dx0 - 3 * far),
+        numpy.where(has_x, dx0 - 2 - 2 * far, dx0 - 2 * far),
+    )
+
+    # for 'closest', (c & 0x01) decides which extra vertex moves one more step
+    dy_closest = dy0 - 1 - 3 * far
+    ysv_ext0 = numpy.where(
+        has_y,
+        numpy.where(closest & ~has_x, ysb + 2, ysb + 1),
+        ysb,
+    )
+    ysv_ext1 = numpy.where(
+        has_y,
+        numpy.where(closest & ~has_x, ysb + 1, ysb + 2),
+        ysb,
+    )
+    dy_ext0 = numpy.where(
+        closest,
+        numpy.where(
+            has_y, numpy.where(has_x, dy_closest, dy_closest - 1), dy0 - 3 * far
+        ),
+        numpy.where(has_y, dy0 - 1 - far, dy0 - far),
+    )
+    dy_ext1 = numpy.where(
+        closest,
+        numpy.where(
+            has_y, numpy.where(has_x, dy_closest - 1, dy_closest), dy0 - 3 * far
+        ),
+        numpy.where(has_y, dy0 - 2 - 2 * far, dy0 - 2 * far),
+    )
+
+    zsv_ext0 = numpy.where(has_z, zsb + 1, zsb)
+    zsv_ext1 = numpy.where(has_z, zsb + 2, zsb)
+    dz_ext0 = numpy.where(
+        closest,
+        numpy.where(has_z, dz0 - 1 - 3 * far, dz0 - 3 * far),
+        numpy.where(has_z, dz0 - 1 - far, dz0 - far),
+    )
+    dz_ext1 = numpy.where(
+        closest,
+        numpy.where(has_z, dz0 - 2 - 3 * far, dz0 - 3 * far),
+        numpy.where(has_z, dz0 - 2 - 2 * far, dz0 - 2 * far),
+    )
+
+    value = numpy.zeros(xsb.shape)
+
+    # Contribution (1,1,0)
+    dx3 = dx0 - 1 - 2 * SQUISH_CONSTANT3
+    dy3 = dy0 - 1 - 2 * SQUISH_CONSTANT3
+    dz3 = dz0 - 0 - 2 * SQUISH_CONSTANT3
+    _contribute3(generator, value, xsb + 1, ysb + 1, zsb + 0, dx3, dy3, dz3)
+
+    # Contribution (1,0,1)
+    dx2 = dx3
+    dy2 = dy0 - 0 - 2 * SQUISH_CONSTANT3
+    dz2 = dz0 - 1 - 2 * SQUISH_CONSTANT3
+    _contribute3(generator, value, xsb + 1, ysb + 0, zsb + 1, dx2, dy2, dz2)
+
+    # Contribution (0,1,1)
+    dx1 = dx0 - 0 - 2 * SQUISH_CONSTANT3
+    dy1 = dy3
+    dz1 = dz2
+    _contribute3(generator, value, xsb + 0, ysb + 1, zsb + 1, dx1, dy1, dz1)
+
+    # Contribution (1,1,1)
+    dx0 = dx0 - 1 - 3 * SQUISH_CONSTANT3
+    dy0 = dy0 - 1 - 3 * SQUISH_CONSTANT3
+    dz0 = dz0 - 1 - 3 * SQUISH_CONSTANT3
+    _contribute3(generator, value, xsb + 1, ysb + 1, zsb + 1, dx0, dy0, dz0)
+
+    _contribute3(
+        generator, value, xsv_ext0, ysv_ext0, zsv_ext0, dx_ext0, dy_ext0, dz_ext0
+    )
+    _contribute3(
+        generator, value, xsv_ext1, ysv_ext1, zsv_ext1, dx_ext1, dy_ext1, dz_ext1
+    )
+    return value
+
+
+def _noise3_middle(generator, xsb, ysb, zsb, xins, yins, zins, in_sum, dx0, dy0, dz0):
+    """The part of noise3() inside the octahedron between the two tetrahedrons"""
+    # Decide between point (0,0,1) and (1,1,0) as closest
+    p1 = xins + yins
+    a_is_further_side = p1 > 1
+    a_score = numpy.where(a_is_further_side, p1 - 1, 1 - p1)
+    a_point = numpy.where(a_is_further_side, 0x03, 0x04)
+
+    # Decide between point (0,1,0) and (1,0,1) as closest
+    p2 = xins + zins
+    b_is_further_side = p2 > 1
+    b_score = numpy.where(b_is_further_side, p2 - 1, 1 - p2)
+    b_point = numpy.where(b_is_further_side, 0x05, 0x02)
+
+    # The closest out of the two (1,0,0) and (0,1,1) will replace the furthest
+    # out of the two decided above, if closer.
+    p3 = yins + zins
+    further = p3 > 1
+    score = numpy.where(further, p3 - 1, 1 - p3)
+    replace_a = (a_score <= b_score) & (a_score < score)
+    replace_b = ~replace_a & (a_score > b_score) & (b_score < score)
+    point = numpy.where(further, 0x06, 0x01)
+    a_point = numpy.where(replace_a, point, a_point)
+    a_is_further_side = numpy.where(replace_a, further, a_is_further_side)
+    b_point = numpy.where(replace_b, point, b_point)
+    b_is_further_side = numpy.where(replace_b, further, b_is_further_side)
+
+    # Where each of the two closest points are determines how the extra two vertices are calculated.
+    both_further = a_is_further_side & b_is_further_side
+    both_closer = ~a_is_further_side & ~b_is_further_side
+    mixed = a_is_further_side != b_is_further_side
+
+    # a permutation of (1,1,-1), picked by the axis missing in 'c'
+    def permutation_11m1(c):
+        cases = [(c & 0x01) == 0, (c & 0x02) == 0]
+        return (
+            numpy.select(cases, [xsb - 1, xsb + 1], xsb + 1),
+            numpy.select(cases, [ysb + 1, ysb - 1], ysb + 1),
+            numpy.select(cases, [zsb + 1, zsb + 1], zsb - 1),
+            numpy.select(
+                cases,
+                [dx0 + 1 - SQUISH_CONSTANT3, dx0 - 1 - SQUISH_CONSTANT3],
+                dx0 - 1 - SQUISH_CONSTANT3,
+            ),
+            numpy.select(
+                cases,
+                [dy0 - 1 - SQUISH_CONSTANT3, dy0 + 1 - SQUISH_CONSTANT3],
+                dy0 - 1 - SQUISH_CONSTANT3,
+            ),
+            numpy.select(
+                cases,
+                [dz0 - 1 - SQUISH_CONSTANT3, dz0 - 1 - SQUISH_CONSTANT3],
+                dz0 + 1 - SQUISH_CONSTANT3,
+            ),
+        )
+
+    # both closest points on the (1,1,1) side: (1,1,1) and one based on the shared axis
+    c = a_point & b_point
+    cases = [(c & 0x01) != 0, (c & 0x02) != 0]
+    further_ext0 = (
+        xsb + 1,
+        ysb + 1,
+        zsb + 1,
+        dx0 - 1 - 3 * SQUISH_CONSTANT3,
+        dy0 - 1 - 3 * SQUISH_CONSTANT3,
+        dz0 - 1 - 3 * SQUISH_CONSTANT3,
+    )
+    further_ext1 = (
+        numpy.select(cases, [xsb + 2, xsb], xsb),
+        numpy.select(cases, [ysb, ysb + 2], ysb),
+        numpy.select(cases, [zsb, zsb], zsb + 2),
+        numpy.select(
+            cases,
+            [dx0 - 2 - 2 * SQUISH_CONSTANT3, dx0 - 2 * SQUISH_CONSTANT3],
+            dx0 - 2 * SQUISH_CONSTANT3,
+        ),
+        numpy.select(
+            cases,
+            [dy0 - 2 * SQUISH_CONSTANT3, dy0 - 2 - 2 * SQUISH_CONSTANT3],
+            dy0 - 2 * SQUISH_CONSTANT3,
+        ),
+        numpy.select(
+            cases,
+            [dz0 - 2 * SQUISH_CONSTANT3, dz0 - 2 * SQUISH_CONSTANT3],
+            dz0 - 2 - 2 * SQUISH_CONSTANT3,
+        ),
+    )
+
+    # both closest points on the (0,0,0) side: (0,0,0) and one based on the omitted axis
+    closer_ext0 = (xsb, ysb, zsb, dx0, dy0, dz0)
+    closer_ext1 = permutation_11m1(a_point | b_point)
+
+    # one point on each side: a permutation of (1,1,-1) and one of (0,0,2)
+    c1 = numpy.where(a_is_further_side, a_point, b_point)
+    c2 = numpy.where(a_is_further_side, b_point, a_point)
+    mixed_ext0 = permutation_11m1(c1)
+    cases = [(c2 & 0x01) != 0, (c2 & 0x02) != 0]
+    mixed_ext1 = (
+        numpy.select(cases, [xsb + 2, xsb], xsb),
+        numpy.select(cases, [ysb, ysb + 2], ysb),
+        numpy.select(cases, [zsb, zsb], zsb + 2),
+        numpy.select(
+            cases,
+            [dx0 - 2 * SQUISH_CONSTANT3 - 2, dx0 - 2 * SQUISH_CONSTANT3],
+            dx0 - 2 * SQUISH_CONSTANT3,
+        ),
+        numpy.select(
+            cases,
+            [dy0 - 2 * SQUISH_CONSTANT3, dy0 - 2 * SQUISH_CONSTANT3 - 2],
+            dy0 - 2 * SQUISH_CONSTANT3,
+        ),
+        numpy.select(
+            cases,
+            [dz0 - 2 * SQUISH_CONSTANT3, dz0 - 2 * SQUISH_CONSTANT3],
+            dz0 - 2 * SQUISH_CONSTANT3 - 2,
+        ),
+    )
+
+    regions = [both_further, both_closer, mixed]
+    ext0 = [
+        numpy.select(regions, values)
+        for values in zip(further_ext0, closer_ext0, mixed_ext0)
+    ]
+    ext1 = [
+        numpy.select(regions, values)
+        for values in zip(further_ext1, closer_ext1, mixed_ext1)
+    ]
+
+    value = numpy.zeros(xsb.shape)
+
+    # Contribution (1,0,0)
+    dx1 = dx0 - 1 - SQUISH_CONSTANT3
+    dy1 = dy0 - 0 - SQUISH_CONSTANT3
+    dz1 = dz0 - 0 - SQUISH_CONSTANT3
+    _contribute3(generator, value, xsb + 1, ysb + 0, zsb + 0, dx1, dy1, dz1)
+
+    # Contribution (0,1,0)
+    dx2 = dx0 - 0 - SQUISH_CONSTANT3
+    dy2 = dy0 - 1 - SQUISH_CONSTANT3
+    dz2 = dz1
+    _contribute3(generator, value, xsb + 0, ysb + 1, zsb + 0, dx2, dy2, dz2)
+
+    # Contribution (0,0,1)
+    dx3 = dx2
+    dy3 = dy1
+    dz3 = dz0 - 1 - SQUISH_CONSTANT3
+    _contribute3(generator, value, xsb + 0, ysb + 0, zsb + 1, dx3, dy3, dz3)
+
+    # Contribution (1,1,0)
+    dx4 = dx0 - 1 - 2 * SQUISH_CONSTANT3
+    dy4 = dy0 - 1 - 2 * SQUISH_CONSTANT3
+    dz4 = dz0 - 0 - 2 * SQUISH_CONSTANT3
+    _contribute3(generator, value, xsb + 1, ysb + 1, zsb + 0, dx4, dy4, dz4)
+
+    # Contribution (1,0,1)
+    dx5 = dx4
+    dy5 = dy0 - 0 - 2 * SQUISH_CONSTANT3
+    dz5 = dz0 - 1 - 2 * SQUISH_CONSTANT3
+    _contribute3(generator, value, xsb + 1, ysb + 0, zsb + 1, dx5, dy5, dz5)
+
+    # Contribution (0,1,1)
+    dx6 = dx0 - 0 - 2 * SQUISH_CONSTANT3
+    dy6 = dy4
+    dz6 = dz5
+    _contribute3(generator, value, xsb + 0, ysb + 1, zsb + 1, dx6, dy6, dz6)
+
+    _contribute3(generator, value, *ext0)
+    _contribute3(generator, value, *ext1)
+    return value
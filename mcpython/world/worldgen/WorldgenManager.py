@@ -1,56 +1,344 @@
 from __future__ import annotations
 
+import concurrent.futures
+import enum
 import itertools
+import multiprocessing
 import random
+import sys
+import time
+import traceback
 import typing
 import math
 import cProfile
+import zlib
 
+import numpy
 import opensimplex
 
+from mcpython import config
+from mcpython.world.worldgen import VectorNoise
+from mcpython.world.worldgen.CaveCarver import CaveCarver
+from mcpython.world.worldgen.ClimateNoise import ClimateNoise
+
 if typing.TYPE_CHECKING:
     from mcpython.world.World import Chunk, World
 
 
-# base height noise
-noise = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-# height noise modifier
-noise2 = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-# height noise range modifier
-noise3 = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-# height noise offset modifier
-noise4 = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-# river depth noise
-noise5 = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-# river creation modifier
-noise6 = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-# river base influence modifier
-noise7 = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-
-bedrock_noise = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-
-dirt_height_noise = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-grass_noise = opensimplex.OpenSimplex(random.randint(0, 1 << 256))
-
-
-ORES = [
-    "minecraft:coal_ore",
-    "minecraft:iron_ore",
-    "minecraft:diamond_ore",
-    "minecraft:gold_ore",
-    "minecraft:lapis_ore",
+# bumped whenever generate_terrain() creates other blocks for the same seed, as
+# chunks saved as difference to the terrain (see Chunk.encode_delta()) can only
+# be loaded by the same version
+GENERATOR_VERSION = 1
+
+
+class ChunkStatus(enum.IntEnum):
+    """How far the generation of a chunk got, see WorldgenService"""
+
+    # nothing generated yet, e.g. chunks of the debug world
+    EMPTY = 0
+    # the terrain shape (stone, bedrock, caves and ores)
+    TERRAIN = 1
+    # the surface blocks on top of the terrain; generate_terrain() creates
+    # both, so chunks get from EMPTY to SURFACE in one step
+    SURFACE = 2
+    # the structures (trees etc.) are being placed
+    FEATURES = 3
+    # completely generated (or loaded from disk)
+    FINALIZED = 4
+
+
+class TerrainNoise:
+    """The noise generators of the terrain, all derived from one world seed"""
+
+    def __init__(self, seed: int):
+        r = random.Random(seed)
+
+        # base height noise
+        self.noise = opensimplex.OpenSimplex(r.getrandbits(64))
+        # height noise modifier
+        self.noise2 = opensimplex.OpenSimplex(r.getrandbits(64))
+        # height noise range modifier
+        self.noise3 = opensimplex.OpenSimplex(r.getrandbits(64))
+        # height noise offset modifier
+        self.noise4 = opensimplex.OpenSimplex(r.getrandbits(64))
+        # river depth noise
+        self.noise5 = opensimplex.OpenSimplex(r.getrandbits(64))
+        # river creation modifier
+        self.noise6 = opensimplex.OpenSimplex(r.getrandbits(64))
+        # river base influence modifier
+        self.noise7 = opensimplex.OpenSimplex(r.getrandbits(64))
+
+        self.bedrock_noise = opensimplex.OpenSimplex(r.getrandbits(64))
+
+        self.dirt_height_noise = opensimplex.OpenSimplex(r.getrandbits(64))
+        self.grass_noise = opensimplex.OpenSimplex(r.getrandbits(64))
+
+        # the low frequency noises, read from a cached coarse grid
+        self.height_range = ClimateNoise(self.noise3, 200)
+        self.height_offset = ClimateNoise(self.noise4, 200)
+        self.river_depth = ClimateNoise(self.noise5, 400)
+        self.river_creation = ClimateNoise(self.noise6, 200)
+        self.river_influence = ClimateNoise(self.noise7, 200)
+
+        self.caves = CaveCarver(
+            opensimplex.OpenSimplex(r.getrandbits(64)),
+            opensimplex.OpenSimplex(r.getrandbits(64)),
+        )
+
+
+_TERRAIN_NOISE: dict[int, TerrainNoise] = {}
+
+
+def get_terrain_noise(seed: int) -> TerrainNoise:
+    noise = _TERRAIN_NOISE.get(seed)
+    if noise is None:
+        noise = _TERRAIN_NOISE[seed] = TerrainNoise(seed)
+    return noise
+
+
+def chunk_random(seed: int, cx: int, cz: int, stage: str = "") -> random.Random:
+    """
+    Returns the random generator for a generation 'stage' of chunk (cx, cz),
+    which is the same in every run and every process for the same 'seed'
+    """
+    return random.Random(f"{seed}/{cx}/{cz}/{stage}")
+
+
+def chunk_rng(seed: int, cx: int, cz: int, stage: str = "") -> numpy.random.Generator:
+    """Like chunk_random(), but a NumPy generator for drawing whole arrays at once"""
+    return numpy.random.default_rng(
+        [seed % 2**64, cx % 2**32, cz % 2**32, zlib.crc32(stage.encode())]
+    )
+
+
+class OreVein(typing.NamedTuple):
+    block: str
+    # the expected number of veins per chunk
+    count: float
+    # the blocks within this distance of the vein center may become ore
+    radius: int
+    # the chance of each of these blocks being ore
+    density: float
+    # the layers the vein centers are in
+    min_y: int
+    max_y: int
+
+
+ORE_VEINS = [
+    OreVein("minecraft:coal_ore", 16, 1, 0.7, 5, 64),
+    OreVein("minecraft:iron_ore", 10, 1, 0.6, 5, 64),
+    OreVein("minecraft:diamond_ore", 1, 1, 0.5, 5, 16),
+    OreVein("minecraft:gold_ore", 2, 1, 0.5, 5, 32),
+    OreVein("minecraft:lapis_ore", 1.5, 1, 0.5, 5, 32),
 ]
+ORES = [vein.block for vein in ORE_VEINS]
+
+# the chance of each grass covered column getting short grass or a tree
+SHORT_GRASS_CHANCE = 1 / 3
+TREE_CHANCE = 1 / 1024
 
 
 # PROFILE = cProfile.Profile()
 
 
+class FeatureWriter:
+    """
+    Where structures place their blocks.
+
+    During world generation ('buffered' is given) writes into chunks without
+    terrain are kept in 'buffered' per chunk, until the chunk reaches
+    ChunkStatus.FEATURES and apply_buffered() places them, so the terrain
+    generated later doesn't overwrite them.
+
+    Blocks set with replace=False only go where no solid block is, so it does
+    not matter in which order overlapping structures are placed.
+
+    Structures reach at most into the chunks next to the one they are placed
+    in, so the blocks buffered for a chunk are dropped by on_chunk_unloaded()
+    once neither it nor any chunk around it is loaded.
+    """
+
+    def __init__(
+        self,
+        world: World,
+        buffered: dict[tuple[int, int], list[tuple[typing.Callable, tuple]]] = None,
+    ):
+        self.world = world
+        self.buffered = buffered
+
+    def set_block(self, position: tuple[int, int, int], block: str, replace=True):
+        self._write(
+            position[0] >> 4, position[2] >> 4, _set_block, position, block, replace
+        )
+
+    def place_template(
+        self, template: StructureTemplate, position: tuple[int, int, int]
+    ):
+        """Places 'template' at 'position', with one bulk write per chunk"""
+        positions = template.offsets + numpy.asarray(position)
+        inside = (0 <= positions[:, 1]) & (positions[:, 1] < 256)
+        positions = positions[inside]
+        blocks = template.blocks[inside]
+        replace = template.replace[inside]
+
+        coords, chunk_indices = numpy.unique(
+            positions[:, [0, 2]] >> 4, axis=0, return_inverse=True
+        )
+        for i, (cx, cz) in enumerate(coords.tolist()):
+            selected = chunk_indices.reshape(-1) == i
+            self._write(
+                cx,
+                cz,
+                _set_blocks,
+                positions[selected],
+                template.palette,
+                blocks[selected],
+                replace[selected],
+            )
+
+    def _write(self, cx: int, cz: int, function: typing.Callable, *args):
+        coord = cx, cz
+        chunk = self.world.chunks.get(coord)
+
+        if self.buffered is not None and (
+            chunk is None or chunk.status < ChunkStatus.FEATURES
+        ):
+            self.buffered.setdefault(coord, []).append((function, args))
+            return
+
+        if chunk is None:
+            chunk = self.world.get_or_create_chunk_by_coord(coord)
+        function(chunk, *args)
+
+    def apply_buffered(self, chunk: Chunk):
+        """Places the blocks buffered for 'chunk'"""
+        for function, args in self.buffered.pop(chunk.position, ()):
+            function(chunk, *args)
+
+    def on_chunk_unloaded(self, coord: tuple[int, int]):
+        """
+        Drops the blocks buffered for the chunk at 'coord', removed from the
+        world, and for the chunks around it no loaded chunk is next to any more
+        """
+        if not self.buffered:
+            return
+
+        self.buffered.pop(coord, None)
+        for around in _chunks_around(coord):
+            if around in self.buffered and not any(
+                other in self.world.chunks for other in _chunks_around(around)
+            ):
+                del self.buffered[around]
+
+
+def _chunks_around(coord: tuple[int, int]) -> list[tuple[int, int]]:
+    """The chunk at 'coord' and the eight chunks around it"""
+    cx, cz = coord
+    return [(cx + dx, cz + dz) for dx in (-1, 0, 1) for dz in (-1, 0, 1)]
+
+
+def _set_block(chunk: Chunk, position: tuple[int, int, int], block: str, replace: bool):
+    if not replace:
+        entry = chunk.blocks.get_entry(position)
+        if entry is not None and entry.solid_faces:
+            return
+
+    chunk.add_block(position, block, immediate=False, block_update=False)
+
+
+def _set_blocks(
+    chunk: Chunk,
+    positions: numpy.ndarray,
+    palette: tuple[str, ...],
+    blocks: numpy.ndarray,
+    replace: numpy.ndarray,
+):
+    chunk.set_blocks(positions, palette, blocks, replace)
+
+
 class Structure:
-    def place(self, world: World, position: tuple[int, int, int], rng: random.Random):
+    def place(
+        self, writer: FeatureWriter, position: tuple[int, int, int], rng: random.Random
+    ):
         raise NotImplementedError
 
 
-class OakTree:
+class StructureTemplate(Structure):
+    """
+    A structure compiled into arrays: the offsets of its blocks from the
+    position it is placed at, their index into 'palette', and if they replace
+    solid blocks (see FeatureWriter.set_block()).
+
+    Rotated and mirrored variants are created once and cached. Only the
+    positions are transformed, block states (e.g. the axis of logs) are kept.
+    """
+
+    def __init__(
+        self,
+        palette: tuple[str, ...],
+        offsets: numpy.ndarray,
+        blocks: numpy.ndarray,
+        replace: numpy.ndarray,
+        rotatable=False,
+    ):
+        self.palette = palette
+        self.offsets = offsets
+        self.blocks = blocks
+        self.replace = replace
+        # if place() picks a random variant
+        self.rotatable = rotatable
+        self.variants: dict[tuple[int, bool], StructureTemplate] = {(0, False): self}
+
+    @classmethod
+    def compile(
+        cls, blocks: dict[tuple[int, int, int], tuple[str, bool]], rotatable=False
+    ) -> StructureTemplate:
+        """Creates a template from (block, replace) by offset"""
+        palette = tuple(dict.fromkeys(block for block, _ in blocks.values()))
+        return cls(
+            palette,
+            numpy.array(list(blocks), dtype=numpy.int64).reshape(-1, 3),
+            numpy.array(
+                [palette.index(block) for block, _ in blocks.values()],
+                dtype=numpy.uint16,
+            ),
+            numpy.array([replace for _, replace in blocks.values()], dtype=bool),
+            rotatable,
+        )
+
+    def get_variant(self, rotation: int, mirror=False) -> StructureTemplate:
+        """
+        Returns this template mirrored along the x axis if 'mirror' is set,
+        and then rotated by 'rotation' quarter turns around the y axis
+        """
+        key = rotation % 4, mirror
+        variant = self.variants.get(key)
+        if variant is None:
+            x, y, z = self.offsets.T
+            if mirror:
+                x = -x
+            for _ in range(key[0]):
+                x, z = -z, x
+
+            variant = self.variants[key] = StructureTemplate(
+                self.palette,
+                numpy.stack([x, y, z], axis=1),
+                self.blocks,
+                self.replace,
+            )
+            variant.variants = self.variants
+        return variant
+
+    def place(
+        self, writer: FeatureWriter, position: tuple[int, int, int], rng: random.Random
+    ):
+        template = self
+        if self.rotatable:
+            template = self.get_variant(rng.randrange(4), rng.random() < 0.5)
+        writer.place_template(template, position)
+
+
+class OakTree(Structure):
     def __init__(
         self,
         stem: str,
@@ -66,9 +354,12 @@ class OakTree:
         self.leave_height_range = leave_height_range
         self.leave_height_offset = leave_height_offset
         self.leave_size = leave_size
+        # the compiled trees, by their shape
+        self.templates: dict[tuple[int, int, int, int], StructureTemplate] = {}
 
-    def place(self, world: World, position: tuple[int, int, int], rng: random.Random):
-        x, y, z = position
+    def place(
+        self, writer: FeatureWriter, position: tuple[int, int, int], rng: random.Random
+    ):
         height = rng.randrange(self.stem_range.start, self.stem_range.stop + 1)
 
         leave_height = rng.randrange(
@@ -79,23 +370,30 @@ class OakTree:
         )
         leave_size = rng.randrange(self.leave_size.start, self.leave_size.stop + 1)
 
+        template = self.get_template(height, leave_height, leave_offset, leave_size)
+        writer.place_template(template, position)
+
+    def get_template(
+        self, height: int, leave_height: int, leave_offset: int, leave_size: int
+    ) -> StructureTemplate:
+        """Returns the tree of the given shape, the stem starting at (0, 0, 0)"""
+        key = height, leave_height, leave_offset, leave_size
+        if key in self.templates:
+            return self.templates[key]
+
+        blocks = {}
         for dy in range(leave_height):
-            ry = y + dy - leave_offset + height
+            y = dy - leave_offset + height
             for dx in range(-leave_size, leave_size + 1):
                 for dz in range(-leave_size, leave_size + 1):
-                    if dx * dx + dz * dz + dy * dy > leave_size * leave_size:
-                        continue
-                    world.add_block(
-                        (x + dx, ry, z + dz),
-                        self.leaves,
-                        immediate=False,
-                        block_update=False,
-                    )
-
-        for dy in range(height):
-            world.add_block(
-                (x, y + dy, z), self.stem, immediate=False, block_update=False
-            )
+                    if dx * dx + dz * dz + dy * dy <= leave_size * leave_size:
+                        blocks[dx, y, dz] = self.leaves, False
+
+        for y in range(height):
+            blocks[0, y, 0] = self.stem, True
+
+        template = self.templates[key] = StructureTemplate.compile(blocks)
+        return template
 
 
 OAK_TREE = OakTree("minecraft:oak_log", "minecraft:oak_leaves")
@@ -126,6 +424,8 @@ def setup_debug_world_registry():
 
 
 def generate_debug_world_chunk(chunk: Chunk):
+    from mcpython.world.blocks.AbstractBlock import BLOCK_REGISTRY
+
     cx, cz = chunk.position
 
     for dx, dz in itertools.product(range(16), range(16)):
@@ -135,101 +435,311 @@ def generate_debug_world_chunk(chunk: Chunk):
         block, state = DEBUG_WORLD_MAPPING.get((x, z), (None, None))
 
         if block:
-            instance = chunk.add_block((x, 0, z), block)
+            block_type = BLOCK_REGISTRY.lookup(block, raise_on_error=True)
+            instance = block_type((x, 0, z))
             instance.set_block_state(state)
-            instance.update_render_state()
+            chunk.add_block((x, 0, z), instance)
 
+    # structures (like grown saplings) reaching into it are placed right away
+    chunk.status = ChunkStatus.FINALIZED
 
-def generate_chunk(chunk: Chunk):
-    #     PROFILE.enable()
-    #     _generate_chunk(chunk)
-    #     PROFILE.disable()
-    #     PROFILE.print_stats("cumulative")
-    #
-    #
-    # def _generate_chunk(chunk: Chunk):
-    cx, cz = chunk.position
-    heightmap: dict[tuple[int, int], int] = {}
 
-    r = random.Random(random.randint(1, 1 << 256))
+# the blocks generate_terrain() places, by their index in ChunkTerrain.blocks
+TERRAIN_PALETTE = (
+    None,
+    "minecraft:bedrock",
+    "minecraft:stone",
+    "minecraft:dirt",
+    "minecraft:grass_block",
+    "minecraft:short_grass",
+    *ORES,
+)
+_BEDROCK, _STONE, _DIRT, _GRASS_BLOCK, _SHORT_GRASS = range(1, 6)
+_ORE_START = 6
 
-    for dx, dz in itertools.product(range(16), range(16)):
-        x = cx * 16 + dx
-        z = cz * 16 + dz
 
-        hn: float = noise.noise3(
-            x / 60,
-            z / 60,
-            x * z * noise2.noise2(x / 1000, z / 1000) / 100,
-        )
-        bn: float = noise3.noise2(
-            x / 200,
-            z / 200,
-        )
-        vn: float = noise4.noise2(
-            x / 200,
-            z / 200,
-        )
-        rd: float = noise5.noise2(x / 400, z / 400)
-        h = (hn / 2 + 0.5) * (15 + bn * 3) + (30 + vn * 5)
-        if 0.3 <= rd <= 0.35:
-            q = noise6.noise2(x / 200, z / 200)
-            if q >= 0:
-                q = min(q * 10, 1)
-                # Carve a revine at most 16 blocks deep, deepest in the middle
-                rd = (0.5 - abs((rd - 0.3) * 20 - 0.5)) * 2 * 16
-                v = (noise7.noise2(x / 200, z / 200) / 2 + 0.5) / 2 + 0.25
-                h = (
-                    (h - rd) * v + ((15 + bn * 3) + (30 + vn * 5) - 10) * (1 - v)
-                ) * q + h * (1 - q)
-
-        h = int(h)
-        heightmap[x, z] = h
-
-        chunk.add_block(
-            (x, 0, z), "minecraft:bedrock", immediate=False, block_update=False
+class ChunkTerrain:
+    """
+    The result of generate_terrain(): the blocks of a chunk as indices into
+    TERRAIN_PALETTE, indexed by local [x, y, z] from y = 0 upwards, and the
+    local (x, y, z) positions to grow trees at
+    """
+
+    def __init__(
+        self, position: tuple[int, int], blocks: numpy.ndarray, trees: numpy.ndarray
+    ):
+        self.position = position
+        self.blocks = blocks
+        self.trees = trees
+
+
+def _ball(radius: int) -> list[tuple[int, int, int]]:
+    """The offsets within 'radius' of (0, 0, 0)"""
+    return [
+        offset
+        for offset in itertools.product(range(-radius, radius + 1), repeat=3)
+        if sum(d * d for d in offset) <= radius * radius
+    ]
+
+
+def _dilate(mask: numpy.ndarray, radius: int) -> numpy.ndarray:
+    """
+    Grows the set entries of 'mask' into balls of 'radius', which costs the same
+    no matter how many entries are set
+    """
+    result = mask.copy()
+    for offset in _ball(radius):
+        target, source = [], []
+        for d, size in zip(offset, mask.shape):
+            target.append(slice(max(d, 0), size + min(d, 0)))
+            source.append(slice(max(-d, 0), size - max(d, 0)))
+        result[tuple(target)] |= mask[tuple(source)]
+    return result
+
+
+def generate_terrain(seed: int, cx: int, cz: int) -> ChunkTerrain:
+    """
+    Generates the terrain and ores of chunk (cx, cz) without touching any world,
+    so this can run in a worker process
+    """
+    noises = get_terrain_noise(seed)
+    blocks = numpy.zeros((16, 256, 16), dtype=numpy.uint16)
+
+    # the block coordinates of all columns, indexed [dx, dz]
+    x, z = numpy.meshgrid(
+        numpy.arange(16) + cx * 16, numpy.arange(16) + cz * 16, indexing="ij"
+    )
+
+    hn = VectorNoise.noise3(
+        noises.noise,
+        x / 60,
+        z / 60,
+        x * z * VectorNoise.noise2(noises.noise2, x / 1000, z / 1000) / 100,
+    )
+    bn = noises.height_range.get_chunk(cx, cz)
+    vn = noises.height_offset.get_chunk(cx, cz)
+    rd = noises.river_depth.get_chunk(cx, cz)
+    h = (hn / 2 + 0.5) * (15 + bn * 3) + (30 + vn * 5)
+
+    q = noises.river_creation.get_chunk(cx, cz)
+    river = (0.3 <= rd) & (rd <= 0.35) & (q >= 0)
+    if river.any():
+        q = numpy.minimum(q * 10, 1)
+        # Carve a revine at most 16 blocks deep, deepest in the middle
+        rd = (0.5 - numpy.abs((rd - 0.3) * 20 - 0.5)) * 2 * 16
+        v = (noises.river_influence.get_chunk(cx, cz) / 2 + 0.5) / 2 + 0.25
+        carved = (
+            (h - rd) * v + ((15 + bn * 3) + (30 + vn * 5) - 10) * (1 - v)
+        ) * q + h * (1 - q)
+        h = numpy.where(river, carved, h)
+
+    h = numpy.trunc(h).astype(numpy.int64)
+    dirt_height = VectorNoise.noise2(noises.dirt_height_noise, x / 20, z / 20)
+    dirt_start = h - 6 - numpy.trunc(2 * dirt_height).astype(numpy.int64)
+
+    # fill all columns at once, layer y of column [dx, dz] is [dx, y, dz]
+    y = numpy.arange(256)[None, :, None]
+    h = h[:, None, :]
+    dirt_start = dirt_start[:, None, :]
+
+    blocks[:, 0] = _BEDROCK
+    blocks[(1 <= y) & (y < numpy.maximum(h - 4, 1))] = _STONE
+    blocks[(numpy.maximum(dirt_start, 0) <= y) & (y < h)] = _DIRT
+    blocks[y == h] = _GRASS_BLOCK
+
+    bedrock = (
+        VectorNoise.noise3(
+            noises.bedrock_noise, x[:, None, :], y[:, 1:4], z[:, None, :]
         )
+        >= 0
+    )
+    blocks[:, 1:4][bedrock] = _BEDROCK
+
+    # caves only go through stone, so they stay below the dirt
+    top = int(h.max()) - 4
+    layers = blocks[:, :top]
+    layers[noises.caves.get_mask(cx, cz, top) & (layers == _STONE)] = 0
+
+    # the vein centers are drawn per block, so the cost depends on the volume
+    # only and not on how many veins there are
+    rng = chunk_rng(seed, cx, cz, "ores")
+    for i, vein in enumerate(ORE_VEINS):
+        layers = blocks[:, vein.min_y : vein.max_y]
+        centers = rng.random(layers.shape) < vein.count / layers.size
+        ore = _dilate(centers, vein.radius)
+        ore &= rng.random(layers.shape) < vein.density
+        ore &= layers == _STONE
+        layers[ore] = _ORE_START + i
+
+    rng = chunk_rng(seed, cx, cz, "surface")
+    grass = VectorNoise.noise2(noises.grass_noise, x / 10, z / 10) < 0.3
+    grass &= rng.random(grass.shape) < SHORT_GRASS_CHANCE
+    tree = ~grass & (rng.random(grass.shape) < TREE_CHANCE)
+
+    h = h[:, 0, :]
+    gx, gz = numpy.nonzero(grass)
+    blocks[gx, h[gx, gz] + 1, gz] = _SHORT_GRASS
+    tx, tz = numpy.nonzero(tree)
+    trees = numpy.stack([tx, h[tx, tz] + 1, tz], axis=1)
+
+    # only ship the layers containing blocks
+    height = int(numpy.flatnonzero(blocks.any(axis=(0, 2)))[-1]) + 1
+    return ChunkTerrain((cx, cz), blocks[:, :height].copy(), trees)
+
+
+def insert_terrain(chunk: Chunk, terrain: ChunkTerrain):
+    """Replaces the blocks of 'chunk' with the generated 'terrain'"""
+    # the whole height, so the sections above the terrain are cleared as well
+    blocks = numpy.zeros((16, 256, 16), dtype=numpy.uint16)
+    blocks[:, : terrain.blocks.shape[1]] = terrain.blocks
+    chunk.set_section_array(TERRAIN_PALETTE, blocks)
+    chunk.terrain = terrain
+    chunk.status = ChunkStatus.SURFACE
+
+
+def decorate_chunk(
+    chunk: Chunk, seed: int, terrain: ChunkTerrain, writer: FeatureWriter
+):
+    """Places the structures of 'chunk', which may reach into the chunks around it"""
+    cx, cz = chunk.position
+    r = chunk_random(seed, cx, cz, "structures")
 
-        for y in range(1, h - 4):
-            chunk.add_block(
-                (x, y, z), "minecraft:stone", immediate=False, block_update=False
-            )
+    for x, y, z in terrain.trees.tolist():
+        OAK_TREE.place(writer, (cx * 16 + x, y, cz * 16 + z), r)
 
-        for y in range(h - 6 - int(2 * dirt_height_noise.noise2(x / 20, z / 20)), h):
-            chunk.add_block(
-                (x, y, z), "minecraft:dirt", immediate=False, block_update=False
-            )
 
-        chunk.add_block(
-            (x, h, z), "minecraft:grass_block", immediate=False, block_update=False
+def finish_chunk(chunk: Chunk, seed: int, terrain: ChunkTerrain, writer: FeatureWriter):
+    """Runs the generation stages of 'chunk' after generate_terrain()"""
+    insert_terrain(chunk, terrain)
+
+    chunk.status = ChunkStatus.FEATURES
+    decorate_chunk(chunk, seed, terrain, writer)
+    # the structures of the chunks around reaching into this one
+    if writer.buffered is not None:
+        writer.apply_buffered(chunk)
+
+    chunk.status = ChunkStatus.FINALIZED
+
+
+def generate_chunk(chunk: Chunk):
+    """
+    Generates 'chunk' completely on the calling thread.
+    Structures reaching into chunks around are placed right away, see
+    WorldgenService for generating many chunks independent of their order.
+    """
+    #     PROFILE.enable()
+    #     _generate_chunk(chunk)
+    #     PROFILE.disable()
+    #     PROFILE.print_stats("cumulative")
+    seed = chunk.world.storage.seed
+    terrain = generate_terrain(seed, *chunk.position)
+    finish_chunk(chunk, seed, terrain, FeatureWriter(chunk.world))
+
+
+class WorldgenService:
+    """
+    Generates chunks with the terrain stage running in a pool of worker
+    processes (config.WORLDGEN_WORKERS, 0 generates on the calling thread).
+
+    request() schedules a chunk, process() inserts the finished terrain into
+    the world and places the structures on the main thread.
+
+    Structure blocks reaching into chunks not generated yet are buffered until
+    those chunks reach ChunkStatus.FEATURES (see FeatureWriter), so the result
+    does not depend on the order the chunks finish in.
+    """
+
+    def __init__(self, world: World, workers: int = None):
+        self.world = world
+        self.workers = config.WORLDGEN_WORKERS if workers is None else workers
+        self.executor = self._create_executor()
+        # the seed each chunk is generated with and its terrain
+        self.pending: dict[tuple[int, int], tuple[int, concurrent.futures.Future]] = {}
+        self.writer = FeatureWriter(world, {})
+
+    def _create_executor(self) -> concurrent.futures.ProcessPoolExecutor | None:
+        if self.workers <= 0:
+            return None
+
+        return concurrent.futures.ProcessPoolExecutor(
+            self.workers,
+            # forking a process with a GL context and running threads is unsafe
+            mp_context=multiprocessing.get_context("spawn"),
         )
 
-        if grass_noise.noise2(x / 10, z / 10) < 0.3 and r.randint(1, 3) == 1:
-            chunk.add_block(
-                (x, h + 1, z),
-                "minecraft:short_grass",
-                immediate=False,
-                block_update=False,
-            )
+    def request(self, chunk: Chunk):
+        """Schedules the generation of 'chunk'"""
+        if chunk.position in self.pending:
+            return
 
-        for y in range(1, 4):
-            if bedrock_noise.noise3(x, y, z) >= 0:
-                chunk.add_block(
-                    (x, y, z), "minecraft:bedrock", immediate=False, block_update=False
-                )
-
-    for _ in range(r.randint(200, 800)):
-        ore = r.choice(ORES)
-        pos = (
-            r.randrange(cx * 16, cx * 16 + 16),
-            r.randrange(0, 256),
-            r.randrange(cz * 16, cz * 16 + 16),
+        chunk.status = ChunkStatus.EMPTY
+        seed = self.world.storage.seed
+        if self.executor is None:
+            terrain = generate_terrain(seed, *chunk.position)
+            finish_chunk(chunk, seed, terrain, self.writer)
+            return
+
+        self.pending[chunk.position] = seed, self.executor.submit(
+            generate_terrain, seed, *chunk.position
         )
-        block = chunk.blocks.get(pos)
-        if block and block.NAME == "minecraft:stone":
-            chunk.add_block(pos, ore, immediate=False, block_update=False)
-
-    while r.random() <= 0.2:
-        x, z = r.randrange(cx * 16, cx * 16 + 16), r.randrange(cz * 16, cz * 16 + 16)
-        y = heightmap[x, z]
-        OAK_TREE.place(chunk.world, (x, y + 1, z), r)
+
+    def process(self, deadline: float = None):
+        """
+        Finishes the chunks whose terrain is ready
+
+        :param deadline: time.perf_counter() value to stop at, if any
+        """
+        for position, (seed, future) in list(self.pending.items()):
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if not future.done():
+                continue
+
+            del self.pending[position]
+            chunk = self.world.chunks.get(position)
+            if chunk is None:
+                # unloaded in the meantime
+                continue
+
+            try:
+                terrain = future.result()
+            except (KeyboardInterrupt, SystemExit):
+                raise
+            except:
+                # the chunk stays EMPTY, so it can be requested again
+                print("failed to generate chunk", position, file=sys.stderr)
+                traceback.print_exc()
+                if isinstance(future.exception(), concurrent.futures.BrokenExecutor):
+                    self._restart_executor()
+                    return
+                continue
+
+            finish_chunk(chunk, seed, terrain, self.writer)
+
+    def _restart_executor(self):
+        """
+        Replaces the pool broken by a crashed worker. The chunks still pending
+        in it never finish, they stay EMPTY and can be requested again
+        """
+        failed = [
+            position
+            for position, (_, future) in self.pending.items()
+            if not future.done() or future.exception() is not None
+        ]
+        for position in failed:
+            del self.pending[position]
+        if failed:
+            print("chunks not generated:", failed, file=sys.stderr)
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._create_executor()
+
+    def wait(self):
+        """Finishes all requested chunks"""
+        concurrent.futures.wait([future for _, future in self.pending.values()])
+        self.process()
+
+    def shutdown(self):
+        """Stops the worker processes, the pending chunks are not finished"""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)